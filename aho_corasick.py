@@ -0,0 +1,75 @@
+from collections import deque
+
+class Automaton:
+    """
+    Aho-Corasick multi-pattern matcher. Add all keywords, call build(), then search() reports
+    every keyword occurring in a text in a single left-to-right pass.
+    """
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        # Outputs including those inherited along fail links; filled in by build()
+        self.all_out = []
+        self.built = False
+
+    def add(self, word, value):
+        """
+        Registers `word`; `value` is reported whenever the word is found.
+        """
+        if not word:
+            return
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(value)
+        self.built = False
+
+    def build(self):
+        self.all_out = [list(o) for o in self.out]
+        queue = deque()
+        for child in self.goto[0].values():
+            self.fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                fallback = self.goto[f].get(ch, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                # Inherit the outputs of the longest proper suffix
+                self.all_out[child] = self.all_out[child] + self.all_out[self.fail[child]]
+        self.built = True
+        return self
+
+    def search(self, text):
+        """
+        Yields (end_index, value) for every keyword occurrence in `text`.
+        """
+        if not self.built:
+            self.build()
+        goto, fail, out = self.goto, self.fail, self.all_out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for value in out[node]:
+                    yield i, value
+
+    def matches(self, text):
+        """
+        Returns the set of values whose keywords occur in `text`.
+        """
+        return {value for _, value in self.search(text)}
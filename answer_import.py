@@ -0,0 +1,332 @@
+"""
+Imports answer sets in the format written by db_utils.export_questions_to_json:
+
+    {"name": "<product> <category> Question Answer set", "questionsAndAnswers": [{"question": ..., "answer": ...}, ...]}
+
+Files are read with an incremental JSON decoder, one questionsAndAnswers entry at a time, so
+memory does not depend on file size. Category and product come from the set name (or, failing
+that, the export file name). Questions already in the database (same normalized text) are not
+inserted again; they only take the set's category, SAP and answer where they have none yet.
+"""
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import csv_chunks
+import db_cache
+import db_utils
+import metrics
+from db_utils import CATEGORIES, CATEGORY_CODES, get_connection, get_sap_id
+
+# Rows written per transaction
+BATCH_ROWS = 5000
+READ_CHARS = 1 << 20
+# Files at least this large are streamed batch by batch instead of parsed whole on the process pool
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+SET_NAME_SUFFIX = " Question Answer set"
+# Exports name products that have no SAP "Unknown"
+UNKNOWN_PRODUCT = "Unknown"
+# Family used for the SAP of an imported product that matches no SAP in this database
+IMPORT_FAMILY = "Imported"
+
+# Join condition matching an imported row to existing questions; the expression must match
+# idx_questions_normalized (db_utils.NORMALIZED_QUESTION) so each lookup is an index probe.
+# Joins are written as CROSS JOIN to keep the (small) staged batch as the outer loop.
+_SAME_QUESTION = "LOWER(TRIM(q.question)) = a.norm"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+# Between array items and object members; stray commas are tolerated
+_SEPARATORS = re.compile(r"[ \t\r\n,]*")
+
+def parse_set_name(name):
+    """
+    (product, category) from "<product> <category> Question Answer set".
+    """
+    stem = name[:-len(SET_NAME_SUFFIX)] if name.endswith(SET_NAME_SUFFIX) else name
+    for category in sorted(CATEGORIES, key=len, reverse=True):
+        if stem == category or stem.endswith(" " + category):
+            return stem[:-len(category)].strip() or UNKNOWN_PRODUCT, category
+    raise ValueError(f"No known category in answer set name {name!r}")
+
+def _safe(text):
+    # Same mangling as export_questions_to_json uses for file names
+    return text.lower().replace("+", "_").replace(" ", "_").replace("/", "_")
+
+def parse_file_name(path):
+    """
+    (product, category) from export_<product>_<category>.json, for sets without a name. The
+    product comes back in the file name's lowercase form.
+    """
+    stem = Path(path).stem
+    stem = stem[len("export_"):] if stem.startswith("export_") else stem
+    for category in sorted(CATEGORIES, key=len, reverse=True):
+        if stem.endswith("_" + _safe(category)):
+            return stem[:-len(category) - 1] or UNKNOWN_PRODUCT, category
+    raise ValueError(f"No set name and no known category in the file name {Path(path).name}")
+
+class _Reader:
+    """
+    Decodes one JSON value at a time from a text file, keeping only a window of it in memory.
+    """
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.f.read(READ_CHARS)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self, skip=_WHITESPACE):
+        while True:
+            self.pos = skip.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of file")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value runs past the end of the window
+                if self.fill():
+                    continue
+                raise
+            # A number can end exactly at the window's edge and continue in the next read
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_answer_set(path, batch_rows=BATCH_ROWS):
+    """
+    Yields (set name, [(question, answer), ...]) batches from an answer-set file. Questions are
+    normalized like CSV imports and empty ones dropped. The name is None for batches read before
+    the "name" key (it normally comes first).
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        reader = _Reader(f)
+        name = None
+        reader.expect("{")
+        while reader.peek(_SEPARATORS) != "}":
+            key = reader.value()
+            reader.expect(":")
+            if key == "name":
+                name = reader.value()
+            elif key == "questionsAndAnswers":
+                reader.expect("[")
+                batch = []
+                while reader.peek(_SEPARATORS) != "]":
+                    item = reader.value()
+                    if not isinstance(item, dict):
+                        continue
+                    question = csv_chunks.normalize_question(str(item.get("question") or ""))
+                    if question:
+                        batch.append((question, str(item.get("answer") or "")))
+                    if len(batch) >= batch_rows:
+                        yield name, batch
+                        batch = []
+                reader.pos += 1
+                if batch:
+                    yield name, batch
+            else:
+                reader.value()
+
+def parse_answer_file(path):
+    """
+    Reads a whole (small) answer-set file. Runs in a worker process; returns (path, name, rows).
+    """
+    name = None
+    rows = []
+    for name, batch in iter_answer_set(path):
+        rows.extend(batch)
+    return path, name, rows
+
+def sap_for_product(c, product):
+    """
+    SAPFullPath for an exported product: the first SAP of that product in this database, else
+    IMPORT_FAMILY/<product>. None for products exported without a SAP.
+    """
+    if not product or product == UNKNOWN_PRODUCT:
+        return None
+    c.execute("SELECT full_path FROM saps WHERE product = ? ORDER BY id LIMIT 1", (product,))
+    row = c.fetchone()
+    return row[0] if row else f"{IMPORT_FAMILY}/{product}"
+
+def write_answers(c, rows, category, sap_full_path):
+    """
+    Writes one batch of (question, answer) rows with set-based statements. Existing questions
+    (matched through idx_questions_normalized) only get a category, SAP or answer they lack;
+    the rest are inserted once. Returns the number of questions inserted.
+    """
+    # norm is untyped: a TEXT column would give the comparison an affinity the expression index lacks
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS answer_rows (norm PRIMARY KEY, question TEXT, answer TEXT, guid TEXT)")
+    c.execute("DELETE FROM temp.answer_rows")
+    # Duplicates within the batch collapse; a non-empty answer beats an empty one
+    c.executemany("""
+        INSERT INTO temp.answer_rows (norm, question, answer, guid) VALUES (LOWER(TRIM(?1)), ?1, ?2, ?3)
+        ON CONFLICT(norm) DO UPDATE SET answer = excluded.answer WHERE answer = ''
+    """, ((question, answer, str(uuid.uuid4())) for question, answer in rows))
+    category_id = CATEGORY_CODES[category]
+    sap_id = get_sap_id(c, sap_full_path)
+    now = int(time.time())
+    c.execute(f"""
+        UPDATE question_rows SET
+            category_id = COALESCE(category_id, ?),
+            sap_id = COALESCE(sap_id, ?),
+            updated_at = CASE WHEN category_id IS NULL THEN ? ELSE updated_at END,
+            lease_owner = CASE WHEN category_id IS NULL THEN NULL ELSE lease_owner END,
+            lease_expires = CASE WHEN category_id IS NULL THEN NULL ELSE lease_expires END
+        WHERE id IN (SELECT q.id FROM temp.answer_rows a CROSS JOIN question_rows q ON {_SAME_QUESTION}) AND (category_id IS NULL OR (sap_id IS NULL AND ? IS NOT NULL))
+    """, (category_id, sap_id, now, sap_id))
+    c.execute(f"""
+        INSERT INTO question_rows (guid, question, category_id, sap_id, updated_at)
+        SELECT a.guid, a.question, ?, ?, ? FROM temp.answer_rows a
+        WHERE NOT EXISTS (SELECT 1 FROM question_rows q WHERE {_SAME_QUESTION})
+    """, (category_id, sap_id, now))
+    inserted = c.rowcount
+    c.execute(f"""
+        INSERT INTO question_extras (question_id, aI_response)
+        SELECT q.id, a.answer FROM temp.answer_rows a
+        CROSS JOIN question_rows q ON {_SAME_QUESTION}
+        WHERE a.answer != ''
+        ON CONFLICT(question_id) DO UPDATE SET aI_response = excluded.aI_response WHERE aI_response IS NULL
+    """)
+    c.execute("DELETE FROM temp.answer_rows")
+    return inserted
+
+class AnswerImportResult:
+    def __init__(self):
+        # path -> (rows, inserted); rows - inserted were already in the database
+        self.files = {}
+        self.errors = {}
+        self.seconds = 0.0
+
+    @property
+    def rows(self):
+        return sum(rows for rows, _ in self.files.values())
+
+    @property
+    def inserted(self):
+        return sum(inserted for _, inserted in self.files.values())
+
+def answer_set_files(paths):
+    """
+    Expands directories to the *.json files in them, sorted by name.
+    """
+    files = []
+    for path in paths:
+        path = Path(path)
+        files.extend(sorted(path.glob("*.json")) if path.is_dir() else [path])
+    return [str(path) for path in files]
+
+def _set_info(c, path, name):
+    product, category = parse_set_name(name) if name else parse_file_name(path)
+    return category, sap_for_product(c, product)
+
+def import_batches(conn, c, path, batches, result):
+    """
+    Writes one file's (set name, rows) batches, one transaction per batch, and records the outcome
+    in `result`. A file that fails part-way keeps the batches committed before the error; its entry
+    in result.errors says how many answers that was (importing the file again is safe: answers
+    already present are updated, not duplicated). Returns True if the whole file was imported.
+    """
+    rows = inserted = 0
+    info = None
+    try:
+        for name, batch in batches:
+            if info is None:
+                info = _set_info(c, path, name)
+            inserted += write_answers(c, batch, *info)
+            conn.commit()
+            rows += len(batch)
+            metrics.increment("answer_import.rows", len(batch))
+    except Exception as e:
+        conn.rollback()
+        result.errors[path] = f"{e} ({rows} answers were committed before the error)" if rows else str(e)
+        return False
+    result.files[path] = (rows, inserted)
+    return True
+
+@metrics.timed("answer_import.import_answer_sets")
+@db_cache.invalidates("questions")
+def import_answer_sets(paths, workers=None, progress=None):
+    """
+    Imports answer-set files, and every *.json file in directories among `paths`. Small files are
+    parsed concurrently on a process pool while this thread, the only writer, writes them; large
+    ones are streamed afterwards. Either way a file is committed BATCH_ROWS rows at a time (see
+    import_batches). `progress(path, result)` is called after each imported file. Returns an
+    AnswerImportResult.
+    """
+    start = time.perf_counter()
+    result = AnswerImportResult()
+    files = answer_set_files(paths)
+    large = [path for path in files if os.path.getsize(path) >= STREAM_THRESHOLD_BYTES]
+    small = [path for path in files if path not in large]
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        if small:
+            with ProcessPoolExecutor(max_workers=min(len(small), workers or os.cpu_count() or 1)) as pool:
+                futures = {pool.submit(parse_answer_file, path): path for path in small}
+                for future in as_completed(futures):
+                    path = futures.pop(future)
+                    try:
+                        _, name, rows = future.result()
+                    except Exception as e:
+                        result.errors[path] = str(e)
+                        continue
+                    batches = ((name, rows[i:i + BATCH_ROWS]) for i in range(0, len(rows), BATCH_ROWS))
+                    if import_batches(conn, c, path, batches, result) and progress:
+                        progress(path, result)
+        for path in large:
+            if import_batches(conn, c, path, iter_answer_set(path, BATCH_ROWS), result) and progress:
+                progress(path, result)
+    finally:
+        conn.close()
+    result.seconds = round(time.perf_counter() - start, 3)
+    return result
+
+def format_summary(result):
+    errors = f", {len(result.errors)} failed" if result.errors else ""
+    return (
+        f"Imported {len(result.files)} answer sets in {result.seconds}s: {result.rows} answers, "
+        f"{result.inserted} new questions, {result.rows - result.inserted} already present{errors}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Import exported answer-set JSON files.")
+    parser.add_argument("paths", nargs="+", help="Answer-set files or directories of them")
+    parser.add_argument("--db", default=db_utils.DB_FILE, help="Database to import into")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    db_utils.DB_FILE = args.db
+    db_utils.init_db()
+    result = import_answer_sets(args.paths, workers=args.workers, progress=lambda path, r: print(f"  {path}: {r.files[path][0]} answers"))
+    print(format_summary(result))
+    for path, error in result.errors.items():
+        print(f"  {path}: {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Awaitable database access for the Textual screens, so event handlers never block the event loop.
+
+    rules = await async_db.run(get_rules)
+    await async_db.run(add_rule, pattern, category)
+    total, page = await async_db.read_many(partial(count_questions), partial(get_questions_page, limit=200))
+
+Writes (functions decorated with db_cache.invalidates, plus WRITE_FUNCTIONS) run one at a time on a
+single writer thread, in the order run() was called, so the app never contends with itself for
+SQLite's write lock and e.g. an undo can never overtake the save it undoes. Reads run on a small
+pool of reader threads; the database is in WAL mode, so they go on while a write is in progress.
+run() queues the call immediately and returns an awaitable; awaiting it is optional.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import metrics
+
+READER_THREADS = 4
+# Writers that invalidate no cached read, so db_cache.invalidates does not mark them
+WRITE_FUNCTIONS = {"renew_leases", "release_leases"}
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="db-reader")
+
+def is_write(func):
+    func = getattr(func, "func", func)
+    return hasattr(func, "invalidates_tables") or getattr(func, "__name__", None) in WRITE_FUNCTIONS
+
+def _submit(executor, kind, call):
+    queued = time.perf_counter()
+
+    def timed_call():
+        metrics.observe(f"async_db.{kind}_wait", (time.perf_counter() - queued) * 1000)
+        with metrics.timer(f"async_db.{kind}"):
+            return call()
+    return asyncio.get_running_loop().run_in_executor(executor, timed_call)
+
+def run(func, *args, **kwargs):
+    """
+    Runs `func(*args, **kwargs)` on the writer thread if it writes, otherwise on a reader thread.
+    Must be called from the event loop. A write that was queued is applied even if the
+    awaiting worker is cancelled; a read that has not started yet is dropped.
+    """
+    call = partial(func, *args, **kwargs)
+    if is_write(func):
+        return asyncio.shield(_submit(_writer, "write", call))
+    return _submit(_readers, "read", call)
+
+def read_many(*calls):
+    """
+    Runs several reads (zero-argument callables such as functools.partial) back to back on one
+    reader thread, a single round trip through the event loop. Resolves to the list of results.
+    """
+    writes = [c for c in calls if is_write(c)]
+    if writes:
+        raise ValueError(f"read_many() only takes reads, got {writes}")
+    return _submit(_readers, "read", lambda: [c() for c in calls])
+
+def shutdown(wait=True):
+    """
+    Stops the threads; with `wait`, queued writes are applied first.
+    """
+    _readers.shutdown(wait=wait, cancel_futures=True)
+    _writer.shutdown(wait=wait)
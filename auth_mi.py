@@ -6,19 +6,67 @@
 # pip install "msal[broker]>=1.20,<2"
 
 
+import os
 import requests
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 from msal import PublicClientApplication
-from process_response import extract_all_questions
+from process_response import extract_all_questions, extract_answer
+import db_utils
+import metrics
+import response_archive
+from request_scheduler import RequestScheduler, INTERACTIVE, BACKGROUND
 
 EXPERIMENT_ID = 'b36535ca-2bfa-41f5-99a2-4db38ea639c9'
-API_URL = 'https://zebra-ai-api-prd.azurewebsites.net/'  # prod
+API_URL = os.environ.get('ZEBRA_AI_API_URL', 'https://zebra-ai-api-prd.azurewebsites.net/')  # prod unless overridden
 CLIENT_ID = 'ef17d154-cefa-4bb9-8d0e-6127c992f7ce'
 AUTHORITY = 'https://login.microsoftonline.com/72f988bf-86f1-41af-91ab-2d7cd011db47'
 SCOPE = ['api://9021b3a5-1f0d-4fb7-ad3f-d6989f0432d8/.default']
+# Endpoint that answers a single question (POST {"messages": [{"role": "user", "content": ...}]})
+ANSWER_PATH = os.environ.get('ZEBRA_AI_ANSWER_PATH', 'chat')
+# Questions being answered at once by answer_questions; the scheduler still enforces the rate limit
+ANSWER_CONCURRENCY = int(os.environ.get('ZEBRA_AI_ANSWER_CONCURRENCY', '4'))
+# Answers committed per transaction
+ANSWER_BATCH_SIZE = 25
 
+# Optional callable returning an access token. The load-test harness sets this
+# to bypass interactive MSAL login.
+token_provider = None
+
+# Every API call goes through this scheduler (rate limit, adaptive concurrency, priority lanes)
+scheduler = RequestScheduler(
+    rate=float(os.environ.get('ZEBRA_AI_RATE', '2')),
+    burst=int(os.environ.get('ZEBRA_AI_BURST', '4')),
+    max_limit=int(os.environ.get('ZEBRA_AI_MAX_CONCURRENCY', '8')),
+)
+_lane = threading.local()
+
+@contextmanager
+def background():
+    """
+    Sends the API calls made inside the block (on this thread) in the background lane,
+    behind any interactive fetches.
+    """
+    previous = getattr(_lane, 'value', INTERACTIVE)
+    _lane.value = BACKGROUND
+    try:
+        yield
+    finally:
+        _lane.value = previous
+
+def send_request(method, url, **kwargs):
+    lane = getattr(_lane, 'value', INTERACTIVE)
+    # Latency is judged per endpoint: an experiment run is far slower than a version check
+    return scheduler.send(lambda: requests.request(method, url, **kwargs), lane=lane, kind=f"{method} {urlsplit(url).path}")
+
+@metrics.timed("auth.get_access_token")
 def get_access_token():
+    if token_provider is not None:
+        return token_provider()
     app = PublicClientApplication(
         client_id=CLIENT_ID,
         authority=AUTHORITY,
@@ -29,19 +77,27 @@ def get_access_token():
         return result['access_token']
     raise Exception('Failed to get access token')
 
+@metrics.timed("http.version")
 def call_version_api(access_token):
     headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json', 'Accept': 'application/json'}
-    response = requests.get(f'{API_URL}version', headers=headers)
+    response = send_request('GET', f'{API_URL}version', headers=headers)
+    metrics.increment(f"http.status.{response.status_code}")
     response.raise_for_status()
     return response.json()
 
+@metrics.timed("http.whoami")
 def call_whoami_api(access_token):
     headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json', 'Accept': 'application/json'}
-    response = requests.get(f'{API_URL}test/whoami', headers=headers)
+    response = send_request('GET', f'{API_URL}test/whoami', headers=headers)
+    metrics.increment(f"http.status.{response.status_code}")
     response.raise_for_status()
     return response.json()
 
-def call_experiment_api(access_token, experiment_id=EXPERIMENT_ID, filter_str="SAPFullPath eq 'Azure/DDOS Protection/Configuration and setup'", max_rows=10):
+@metrics.timed("http.experiment")
+def request_experiment(access_token, experiment_id=EXPERIMENT_ID, filter_str="SAPFullPath eq 'Azure/DDOS Protection/Configuration and setup'", max_rows=10):
+    """
+    Posts one experiment run and returns the successful requests.Response.
+    """
     headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json', 'Accept': 'application/json'}
     run_model = {
         "DataSearchOptions": {
@@ -55,18 +111,151 @@ def call_experiment_api(access_token, experiment_id=EXPERIMENT_ID, filter_str="S
     logging.basicConfig(filename="zebra_ai_api.log", level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     logging.info("API Request: URL=%s, Headers=%s, Payload=%s", f'{API_URL}experiment/{experiment_id}', headers, json.dumps(run_model))
 
-    response = requests.post(f'{API_URL}experiment/{experiment_id}', headers=headers, data=json.dumps(run_model))
-    logging.info("API Response: Status=%s, Content=%s", response.status_code, response.text)
+    response = send_request('POST', f'{API_URL}experiment/{experiment_id}', headers=headers, data=json.dumps(run_model))
+    metrics.increment(f"http.status.{response.status_code}")
+    metrics.increment("http.response_bytes", len(response.content))
+    if not response.ok:
+        logging.info("API Response: Status=%s, Content=%s", response.status_code, response.text)
     response.raise_for_status()
+    return response
+
+def archive_experiment_response(response, experiment_id, filter_str, max_rows, questions_extracted=None):
+    """
+    Keeps the raw response so improved extractors can be re-run without re-fetching (see response_archive.reprocess).
+    """
+    try:
+        archive_id = response_archive.archive_response(response.content, experiment_id, filter_str, max_rows, questions_extracted)
+        logging.info("API Response: Status=%s, Bytes=%s, Archived as %s", response.status_code, len(response.content), archive_id)
+    except Exception as e:
+        logging.warning("API Response: Status=%s, could not archive response: %s", response.status_code, e)
+
+def call_experiment_api(access_token, experiment_id=EXPERIMENT_ID, filter_str="SAPFullPath eq 'Azure/DDOS Protection/Configuration and setup'", max_rows=10, archive=True):
+    """
+    Runs the experiment and extracts its questions. With `archive` (the default) the raw response
+    is also kept in the response archive; test harnesses pass archive=False.
+    """
+    response = request_experiment(access_token, experiment_id=experiment_id, filter_str=filter_str, max_rows=max_rows)
     data = response.json()
     questions = extract_all_questions(data)
+    if archive:
+        archive_experiment_response(response, experiment_id, filter_str, max_rows, len(questions))
     return {"response": data, "questions": questions}
 
+@metrics.timed("http.answer")
+def request_answer(access_token, question):
+    """
+    Asks ZebraAI one question and returns the answer text.
+    """
+    headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json', 'Accept': 'application/json'}
+    payload = {"messages": [{"role": "user", "content": question}]}
+    response = send_request('POST', f'{API_URL}{ANSWER_PATH}', headers=headers, data=json.dumps(payload))
+    metrics.increment(f"http.status.{response.status_code}")
+    response.raise_for_status()
+    return extract_answer(response.json())
+
+class AnswerResult:
+    def __init__(self):
+        self.asked = 0
+        # Questions answered from answer_cache instead of the API
+        self.cached = 0
+        # Questions whose aI_response was filled (duplicates of an answered question included)
+        self.saved = 0
+        self.failed = 0
+        self.last_error = None
+
+    def summary(self):
+        errors = f", {self.failed} failed ({self.last_error})" if self.failed else ""
+        return f"{self.asked} questions sent to ZebraAI, {self.cached} answered from the cache, {self.saved} answers saved{errors}"
+
+@metrics.timed("answers.answer_questions")
+def answer_questions(access_token=None, categories=None, concurrency=ANSWER_CONCURRENCY, batch_size=ANSWER_BATCH_SIZE,
+                     progress=None, stop=None):
+    """
+    Fills aI_response for categorized questions (db_utils.EXPORT_CATEGORIES by default) that have
+    none. Up to `concurrency` questions are in flight at once, in the scheduler's background lane;
+    answers are cached by normalized question, so each distinct question is asked once, and are
+    committed every `batch_size` answers. Only unanswered questions are selected, so an interrupted
+    run resumes by being started again. `progress(result)` is called after each commit; setting
+    `stop` (a threading.Event) ends the run after the answers in flight are saved.
+    """
+    db_utils.init_answers_db()
+    access_token = access_token or get_access_token()
+    result = AnswerResult()
+    pending = {}
+    answers = []
+    # Normalized questions asked, answered or saved in this run. Saved ones stay in the set: a later
+    # row of a page whose cache lookup predates the save would otherwise be asked again
+    handled = set()
+
+    def ask(question):
+        with background():
+            return request_answer(access_token, question)
+
+    def flush():
+        if answers:
+            result.saved += db_utils.save_answers(answers)
+            answers.clear()
+            if progress:
+                progress(result)
+
+    def collect():
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            norm = pending.pop(future)
+            try:
+                answer = future.result()
+            except Exception as e:
+                handled.discard(norm)
+                result.failed += 1
+                result.last_error = str(e)
+                metrics.increment("answers.failed")
+                continue
+            if answer:
+                answers.append((norm, answer))
+            else:
+                handled.discard(norm)
+        if len(answers) >= batch_size:
+            flush()
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="answer")
+    try:
+        after_id = 0
+        while not (stop and stop.is_set()):
+            rows = db_utils.get_unanswered_questions(after_id, limit=max(200, batch_size), categories=categories)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            cached = db_utils.get_cached_answers({norm for _, _, norm in rows})
+            for _, question, norm in rows:
+                # save_answers fills every question with the same text, so each is handled once
+                if norm in handled:
+                    continue
+                handled.add(norm)
+                if norm in cached:
+                    answers.append((norm, cached[norm]))
+                    result.cached += 1
+                    metrics.increment("answers.cached")
+                else:
+                    pending[pool.submit(ask, question)] = norm
+                    result.asked += 1
+                    while len(pending) >= 2 * concurrency:
+                        collect()
+                if stop and stop.is_set():
+                    break
+            if len(answers) >= batch_size:
+                flush()
+        while pending:
+            collect()
+        flush()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return result
+
 def pretty_print_json(data):
     print(json.dumps(data, indent=4, sort_keys=True))
 
 # Example usage as a callable module:
-def run_zebra_ai_client(sap_full_path="Azure/DDOS Protection/Configuration and setup", number_of_cases=3):
+def run_zebra_ai_client(sap_full_path="Azure/DDOS Protection/Configuration and setup", number_of_cases=3, archive=True):
    # import urllib.parse
     print('Zebra AI Sample Python Client')
     access_token = get_access_token()
@@ -74,7 +263,7 @@ def run_zebra_ai_client(sap_full_path="Azure/DDOS Protection/Configuration and s
     whoami_info = call_whoami_api(access_token)
     #encoded_sap_full_path = urllib.parse.quote(sap_full_path, safe="")
     filter_str = f"SAPFullPath eq '{sap_full_path}'"
-    experiment_result = call_experiment_api(access_token, filter_str=filter_str, max_rows=number_of_cases)
+    experiment_result = call_experiment_api(access_token, filter_str=filter_str, max_rows=number_of_cases, archive=archive)
     #print("API Version Info:")
     #pretty_print_json(version_info)
     #print("\nWhoAmI Info:")
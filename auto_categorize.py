@@ -0,0 +1,128 @@
+import re
+import time
+from aho_corasick import Automaton
+from db_utils import CATEGORY_CODES, get_connection, get_rules, lease_owner
+import metrics
+import db_cache
+
+CHUNK_SIZE = 2000
+PREVIEW_LIMIT = 200
+
+class RuleSet:
+    """
+    Compiled form of the rules table. Keyword rules share one Aho-Corasick automaton so every
+    keyword is tested in a single pass over the (case-folded) question; regex rules are only
+    tried when they could beat the best keyword match found so far.
+    """
+    def __init__(self, rules):
+        # rules: (id, pattern, is_regex, category, sap, enabled) in priority order
+        self.rules = {}
+        self.automaton = Automaton()
+        self.regexes = []
+        for rule_id, pattern, is_regex, category, sap, enabled in rules:
+            if not enabled or not pattern:
+                continue
+            self.rules[rule_id] = (pattern, category, sap or None)
+            if is_regex:
+                self.regexes.append((rule_id, re.compile(pattern, re.IGNORECASE)))
+            else:
+                self.automaton.add(pattern.casefold(), rule_id)
+        self.automaton.build()
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, question, sap):
+        """
+        Returns the id of the highest-priority (lowest id) rule matching the question within its SAP scope, or None.
+        """
+        best = None
+        for rule_id in self.automaton.matches(question.casefold()):
+            scope = self.rules[rule_id][2]
+            if (scope is None or scope == sap) and (best is None or rule_id < best):
+                best = rule_id
+        for rule_id, regex in self.regexes:
+            if best is not None and rule_id > best:
+                break
+            scope = self.rules[rule_id][2]
+            if (scope is None or scope == sap) and regex.search(question):
+                best = rule_id
+                break
+        return best
+
+    def category(self, rule_id):
+        return self.rules[rule_id][1]
+
+    def pattern(self, rule_id):
+        return self.rules[rule_id][0]
+
+class AutoCategorizeResult:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.matched = 0
+        self.hits = {}
+        # (question, sap, category, rule_id) samples for the dry-run preview
+        self.preview = []
+
+@metrics.timed("rules.run_rules")
+def run_rules(dry_run=True, chunk_size=CHUNK_SIZE, progress=None, rules=None):
+    """
+    Applies the enabled rules to every uncategorized question that no other analyst holds an
+    unexpired lease on (their save would overwrite the rule's category). Rows are read in id-ordered
+    chunks and, unless dry_run is set, each chunk's assignments are written in its own transaction.
+    `progress(result)` is called after every chunk. Returns an AutoCategorizeResult.
+    """
+    ruleset = RuleSet(rules if rules is not None else get_rules(enabled_only=True))
+    result = AutoCategorizeResult(dry_run)
+    if not ruleset:
+        return result
+    owner = lease_owner()
+    conn = get_connection()
+    c = conn.cursor()
+    last_id = 0
+    try:
+        while True:
+            c.execute(
+                """
+                SELECT q.id, q.question, s.full_path FROM question_rows q LEFT JOIN saps s ON s.id = q.sap_id
+                WHERE q.category_id IS NULL AND q.id > ?
+                  AND (q.lease_owner IS NULL OR q.lease_owner = ? OR q.lease_expires < ?)
+                ORDER BY q.id LIMIT ?
+                """,
+                (last_id, owner, time.time(), chunk_size)
+            )
+            rows = c.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = []
+            for row_id, question, sap in rows:
+                rule_id = ruleset.match(question or "", sap)
+                if rule_id is None:
+                    continue
+                category = ruleset.category(rule_id)
+                result.hits[rule_id] = result.hits.get(rule_id, 0) + 1
+                updates.append((category, row_id))
+                if len(result.preview) < PREVIEW_LIMIT:
+                    result.preview.append((question, sap, category, rule_id))
+            result.scanned += len(rows)
+            result.matched += len(updates)
+            if updates and not dry_run:
+                now = time.time()
+                c.executemany(
+                    """
+                    UPDATE question_rows SET category_id = ?, updated_at = ?, lease_owner = NULL, lease_expires = NULL
+                    WHERE id = ? AND category_id IS NULL AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)
+                    """,
+                    [(CATEGORY_CODES[category], int(now), row_id, owner, now) for category, row_id in updates]
+                )
+                conn.commit()
+            if progress:
+                progress(result)
+    finally:
+        conn.close()
+        if not dry_run:
+            db_cache.invalidate("questions")
+    metrics.increment("rules.matched", result.matched)
+    return result
@@ -0,0 +1,250 @@
+import argparse
+import datetime
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import db_utils
+import metrics
+from db_utils import get_connection
+
+BACKUP_DIR = "backups"
+# Number of snapshots kept; older ones are deleted after each successful backup
+BACKUP_KEEP = 7
+BACKUP_INTERVAL_HOURS = 24
+# Pages copied per backup step, and the pause after each step during which the app can write
+PAGES_PER_STEP = 256
+STEP_PAUSE_SECONDS = 0.01
+# A .partial or lock file not written to for this long was left behind by an interrupted backup
+STALE_PARTIAL_SECONDS = 3600
+LOCK_NAME = "backup.lock"
+
+def init_backup_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS backup_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ran_at TEXT,
+            path TEXT,
+            bytes INTEGER,
+            compressed INTEGER,
+            sha256 TEXT,
+            integrity TEXT,
+            seconds REAL
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def check_database(path):
+    """
+    Runs an integrity check on a database file and makes sure the questions table is readable.
+    Returns "ok" or a description of the problems.
+    """
+    conn = sqlite3.connect(f"file:{Path(path).resolve().as_posix()}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check").fetchall()]
+        if problems != ["ok"]:
+            return "; ".join(problems[:20])
+        conn.execute("SELECT COUNT(*) FROM questions").fetchone()
+        return "ok"
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+
+def verify_backup(path):
+    """
+    Checks a backup file (plain or .gz); compressed backups are unpacked to a temporary file first.
+    """
+    path = Path(path)
+    if path.suffix != ".gz":
+        return check_database(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Path(tmp) / path.stem
+        with gzip.open(path, "rb") as src, open(plain, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        return check_database(plain)
+
+def list_backups(dest_dir=BACKUP_DIR):
+    """
+    Completed backup files in `dest_dir`, newest first.
+    """
+    return sorted((p for p in Path(dest_dir).glob("questions-*.db*") if p.suffix != ".partial"), reverse=True)
+
+def prune_backups(dest_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """
+    Deletes completed backups beyond the newest `keep`, and .partial files left by interrupted
+    backups (ones untouched for STALE_PARTIAL_SECONDS, so a backup still being written is spared).
+    """
+    removed = list_backups(dest_dir)[keep:]
+    cutoff = time.time() - STALE_PARTIAL_SECONDS
+    removed += [p for p in Path(dest_dir).glob("questions-*.partial") if p.stat().st_mtime < cutoff]
+    for path in removed:
+        path.unlink()
+    return removed
+
+class BackupRunning(Exception):
+    """
+    Raised when another backup (another process, or the app's scheduled one) is writing to the same directory.
+    """
+
+@contextmanager
+def backup_lock(dest_dir=BACKUP_DIR):
+    """
+    Holds `dest_dir`/backup.lock for the duration of one backup. A lock not touched for
+    STALE_PARTIAL_SECONDS was left by a backup that died and is taken over.
+    """
+    lock = Path(dest_dir) / LOCK_NAME
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime < STALE_PARTIAL_SECONDS:
+                    raise BackupRunning(f"Another backup is already running in {dest_dir}")
+                lock.unlink()
+            except FileNotFoundError:
+                pass
+    else:
+        raise BackupRunning(f"Another backup is already running in {dest_dir}")
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    try:
+        yield lock
+    finally:
+        lock.unlink(missing_ok=True)
+
+@metrics.timed("backup.backup_database")
+def backup_database(dest_dir=BACKUP_DIR, keep=BACKUP_KEEP, compress=False, pages=PAGES_PER_STEP, progress=None):
+    """
+    Snapshots the live database with SQLite's online backup API, `pages` pages per step with a short
+    pause between steps, so the app keeps reading and writing throughout (the database is in WAL mode;
+    see init_db). Raises BackupRunning if another backup is writing to `dest_dir`.
+    The copy is integrity-checked before it is (optionally) gzipped and moved into place, then
+    backups beyond the newest `keep` are deleted. `progress(copied_pages, total_pages)` is called
+    after each step. Returns a dict describing the backup.
+    """
+    init_backup_db()
+    start = time.perf_counter()
+    Path(dest_dir).mkdir(parents=True, exist_ok=True)
+    with backup_lock(dest_dir) as lock:
+        # Microseconds keep names unique (and sortable) for backups started within the same second
+        name = f"questions-{datetime.datetime.now():%Y%m%d-%H%M%S-%f}.db"
+        partial = Path(dest_dir) / f"{name}.partial"
+
+        def step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+            os.utime(lock)
+            time.sleep(STEP_PAUSE_SECONDS)
+
+        src = get_connection()
+        dst = sqlite3.connect(partial)
+        try:
+            # An open read transaction pins a WAL snapshot: the app's commits go on between steps without
+            # restarting the copy, and the backup is exactly the database as of this point
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            src.backup(dst, pages=pages, progress=step)
+            src.rollback()
+            # The snapshot is a standalone file; it should not expect a -wal next to it
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+            src.close()
+        try:
+            integrity = check_database(partial)
+            if integrity != "ok":
+                raise sqlite3.DatabaseError(f"Backup failed verification: {integrity}")
+            sha256 = _sha256(partial)
+            if compress:
+                final = Path(dest_dir) / f"{name}.gz"
+                with open(partial, "rb") as f, gzip.open(f"{final}.partial", "wb", compresslevel=6) as gz:
+                    shutil.copyfileobj(f, gz, 1 << 20)
+                os.replace(f"{final}.partial", final)
+                partial.unlink()
+            else:
+                final = Path(dest_dir) / name
+                os.replace(partial, final)
+        except Exception:
+            for leftover in (partial, Path(f"{Path(dest_dir) / name}.gz.partial")):
+                if leftover.exists():
+                    leftover.unlink()
+            raise
+        removed = prune_backups(dest_dir, keep)
+        size = final.stat().st_size
+        seconds = time.perf_counter() - start
+        conn = get_connection()
+        conn.execute(
+            "INSERT INTO backup_log (ran_at, path, bytes, compressed, sha256, integrity, seconds) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (datetime.datetime.now().isoformat(), str(final), size, int(compress), sha256, integrity, seconds)
+        )
+        conn.commit()
+        conn.close()
+        return {
+            "path": str(final),
+            "bytes": size,
+            "compressed": compress,
+            "sha256": sha256,
+            "integrity": integrity,
+            "removed": [str(p) for p in removed],
+            "seconds": round(seconds, 3),
+        }
+
+def last_backup_time():
+    init_backup_db()
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT MAX(ran_at) FROM backup_log")
+    ran_at = c.fetchone()[0]
+    conn.close()
+    return datetime.datetime.fromisoformat(ran_at) if ran_at else None
+
+def backup_due(interval_hours=BACKUP_INTERVAL_HOURS):
+    last = last_backup_time()
+    return last is None or datetime.datetime.now() - last >= datetime.timedelta(hours=interval_hours)
+
+def format_report(report):
+    removed = f", {len(report['removed'])} old backup(s) removed" if report["removed"] else ""
+    return (
+        f"Backup written to {report['path']} ({report['bytes'] / (1024 * 1024):.1f} MB) in {report['seconds']}s, "
+        f"integrity {report['integrity']}{removed}"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online backup of the questions database")
+    parser.add_argument("--db", default=db_utils.DB_FILE, help="Database to back up")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="Backup directory")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Number of backups to keep")
+    parser.add_argument("--compress", action="store_true", help="Gzip the backup")
+    parser.add_argument("--verify", metavar="PATH", help="Only verify an existing backup file")
+    parser.add_argument("--list", action="store_true", help="List existing backups")
+    args = parser.parse_args()
+    if args.verify:
+        print(f"{args.verify}: {verify_backup(args.verify)}")
+    elif args.list:
+        for path in list_backups(args.dir):
+            print(f"{path}  {path.stat().st_size / (1024 * 1024):.1f} MB")
+    else:
+        db_utils.DB_FILE = args.db
+        try:
+            report = backup_database(args.dir, args.keep, args.compress)
+        except BackupRunning as e:
+            sys.exit(str(e))
+        print(format_report(report))
@@ -0,0 +1,355 @@
+"""
+Data-layer benchmark suite.
+
+Builds synthetic questions.db files with synthetic_data.py and times every db_utils entry point,
+the response extractor and the JSON export, and measures the categorizer queue's memory. The schema
+benchmark compares file size and scan times of the original wide questions table with the compact
+layout it is migrated to. Results are written to JSON; when a baseline results
+file is given, any operation slower than baseline * (1 + tolerance) is flagged and the run exits 1.
+
+    python benchmark.py --sizes 10000,100000,1000000 --output bench_results.json
+    python benchmark.py --baseline bench_results.json --tolerance 0.25
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import db_cache
+import db_utils
+import synthetic_data
+from process_response import extract_all_questions
+
+DATA_DIR = Path("bench_data")
+
+def timed_call(func, *args, repeat=1):
+    """
+    Runs func(*args) `repeat` times and returns (best_seconds, last_result).
+    The read cache is cleared before every run so the database cost is what gets measured.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        db_cache.clear()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def fresh_copy(source, work_dir, name):
+    target = Path(work_dir) / name
+    shutil.copyfile(source, target)
+    return target
+
+def bench_size(rows, work_dir, batch, repeat, regenerate=False):
+    """
+    Runs every data-layer benchmark against a database with `rows` questions.
+    Write benchmarks each get their own copy of the database so they do not affect each other.
+    """
+    DATA_DIR.mkdir(exist_ok=True)
+    source = DATA_DIR / f"questions_{rows}.db"
+    saps_file = DATA_DIR / f"questions_{rows}.saps.json"
+    if regenerate or not source.exists() or not saps_file.exists():
+        print(f"  generating {rows} rows...", flush=True)
+        saps = synthetic_data.generate_questions_db(source, rows)
+        saps_file.write_text(json.dumps(saps))
+    saps = json.loads(saps_file.read_text())
+    rnd = random.Random(rows)
+    results = {}
+
+    def record(name, seconds, ops):
+        results[name] = {"seconds": round(seconds, 6), "ops": ops, "per_op_ms": round(seconds * 1000 / max(ops, 1), 4)}
+        print(f"  {name:40s} {seconds:10.4f}s  ({ops} ops)", flush=True)
+
+    previous = db_utils.DB_FILE
+    try:
+        # Read-only benchmarks share one copy
+        db_utils.DB_FILE = str(fresh_copy(source, work_dir, "read.db"))
+        sample_saps = [rnd.choice(saps) for _ in range(20)]
+        seconds, _ = timed_call(lambda: [db_utils.count_questions_for_sap(s) for s in sample_saps], repeat=repeat)
+        record("count_questions_for_sap", seconds, len(sample_saps))
+        seconds, _ = timed_call(db_utils.get_uncategorized_questions_from_db, repeat=repeat)
+        record("get_uncategorized_questions_from_db", seconds, 1)
+        export_dir = Path(work_dir) / "export"
+        export_dir.mkdir(exist_ok=True)
+        seconds, _ = timed_call(db_utils.export_questions_to_json, str(export_dir), repeat=repeat)
+        record("export_questions_to_json", seconds, 1)
+
+        # save_to_db: categorize a batch of uncategorized rows, one call per row like the categorizer
+        db_utils.DB_FILE = str(fresh_copy(source, work_dir, "save.db"))
+        targets = db_utils.get_uncategorized_questions_from_db()[:batch]
+        now = datetime.datetime.now().isoformat()
+        rows_to_save = [[q.guid, q.question, rnd.choice(db_utils.CATEGORIES), "", "", "", "", "", now] for q in targets]
+        seconds, _ = timed_call(lambda: [db_utils.save_to_db(r) for r in rows_to_save])
+        record("save_to_db", seconds, len(rows_to_save))
+
+        # CSV import with a mix of new and existing questions
+        db_utils.DB_FILE = str(fresh_copy(source, work_dir, "import_csv.db"))
+        csv_file = Path(work_dir) / "import.csv"
+        synthetic_data.generate_questions_csv(csv_file, batch, existing_db=db_utils.DB_FILE)
+        seconds, _ = timed_call(db_utils.import_questions_to_db_with_sap, str(csv_file), saps[0])
+        record("import_questions_to_db_with_sap", seconds, batch)
+
+        db_utils.DB_FILE = str(fresh_copy(source, work_dir, "import_list.db"))
+        questions = synthetic_data.generate_questions_csv(Path(work_dir) / "import_list.csv", batch, existing_db=db_utils.DB_FILE, seed=3)
+        seconds, _ = timed_call(db_utils.import_questions_list_to_db, questions, saps[1])
+        record("import_questions_list_to_db", seconds, batch)
+
+        db_utils.DB_FILE = str(fresh_copy(source, work_dir, "delete.db"))
+        seconds, deleted = timed_call(db_utils.delete_questions_for_sap, saps[2])
+        record("delete_questions_for_sap", seconds, deleted)
+    finally:
+        db_utils.DB_FILE = previous
+    return results
+
+def bench_extractor(repeat):
+    results = {}
+    for messages in (20, 200):
+        response = synthetic_data.generate_api_response(messages=messages)
+        seconds, questions = timed_call(extract_all_questions, response, repeat=repeat)
+        name = f"extract_all_questions_{messages}_messages"
+        results[name] = {"seconds": round(seconds, 6), "ops": len(questions), "per_op_ms": round(seconds * 1000 / max(len(questions), 1), 4)}
+        print(f"  {name:40s} {seconds:10.4f}s  ({len(questions)} questions)", flush=True)
+    return results
+
+def measure_queue_memory(db_file):
+    """
+    Compares the memory held by the categorizer queue built as per-row dicts (the old format)
+    versus QuestionRecord objects, both fetched fresh from `db_file`.
+    """
+    def fetch():
+        conn = sqlite3.connect(db_file)
+        rows = conn.execute("SELECT guid, question, SAPFullPath FROM questions WHERE category IS NULL OR category = ''").fetchall()
+        conn.close()
+        return rows
+
+    def build_dicts():
+        return [{"guid": row[0], "question": row[1], "sap": row[2], "category": ""} for row in fetch()]
+
+    def build_records():
+        return [db_utils.QuestionRecord(row[0], row[1], row[2]) for row in fetch()]
+
+    sizes = {}
+    for name, build in (("dicts", build_dicts), ("records", build_records)):
+        tracemalloc.start()
+        queue = build()
+        sizes[name], _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sizes["rows"] = len(queue)
+        del queue
+    rows = max(sizes["rows"], 1)
+    result = {
+        "rows": sizes["rows"],
+        "dict_bytes": sizes["dicts"],
+        "record_bytes": sizes["records"],
+        "dict_bytes_per_row": round(sizes["dicts"] / rows, 1),
+        "record_bytes_per_row": round(sizes["records"] / rows, 1),
+        "reduction": round(1 - sizes["records"] / sizes["dicts"], 3) if sizes["dicts"] else 0.0,
+    }
+    print(f"  queue memory: dicts {result['dict_bytes_per_row']} B/row, records {result['record_bytes_per_row']} B/row "
+          f"({result['reduction']:.0%} less)", flush=True)
+    return result
+
+# The questions table as it was before the compact schema: every column on every row, empty
+# strings for unset values and ISO text timestamps
+LEGACY_QUESTIONS_TABLE = """
+    CREATE TABLE questions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guid TEXT UNIQUE,
+        question TEXT,
+        category TEXT,
+        aI_response TEXT,
+        evaluation_text TEXT,
+        extra_column1 TEXT,
+        extra_column2 TEXT,
+        extra_column3 TEXT,
+        SAPFullPath TEXT,
+        timestamp TEXT,
+        lease_owner TEXT,
+        lease_expires REAL
+    )
+"""
+LEGACY_INDEXES = [
+    "CREATE INDEX idx_questions_category ON questions(category)",
+    "CREATE INDEX idx_questions_sap ON questions(SAPFullPath)",
+    f"CREATE INDEX idx_questions_normalized ON questions({db_utils.NORMALIZED_QUESTION})",
+]
+# name -> (query through the questions view / legacy table, equivalent query on the compact tables)
+SCHEMA_SCANS = {
+    "category_counts": (
+        "SELECT category, COUNT(*) FROM questions GROUP BY category",
+        "SELECT category_id, COUNT(*) FROM question_rows GROUP BY category_id",
+    ),
+    "uncategorized": (
+        "SELECT guid, question, SAPFullPath FROM questions WHERE category IS NULL OR category = ''",
+        "SELECT q.guid, q.question, s.full_path FROM question_rows q LEFT JOIN saps s ON s.id = q.sap_id WHERE q.category_id IS NULL",
+    ),
+    "sap_counts": (
+        "SELECT SAPFullPath, COUNT(*) FROM questions GROUP BY SAPFullPath",
+        "SELECT sap_id, COUNT(*) FROM question_rows GROUP BY sap_id",
+    ),
+    "text_search": (
+        "SELECT COUNT(*) FROM questions WHERE question LIKE '%error%'",
+        "SELECT COUNT(*) FROM question_rows WHERE question LIKE '%error%'",
+    ),
+    "full_rows": (
+        "SELECT * FROM questions",
+        "SELECT * FROM question_rows",
+    ),
+}
+
+def build_legacy_db(source, target):
+    """
+    Rebuilds the questions of `source` in the original wide layout, as the app used to write them.
+    """
+    conn = sqlite3.connect(target)
+    conn.execute(LEGACY_QUESTIONS_TABLE)
+    for index in LEGACY_INDEXES:
+        conn.execute(index)
+    conn.execute("ATTACH DATABASE ? AS src", (str(source),))
+    conn.execute("""
+        INSERT INTO questions
+        SELECT id, guid, question, COALESCE(category, ''), COALESCE(aI_response, ''), COALESCE(evaluation_text, ''),
+               COALESCE(extra_column1, ''), COALESCE(extra_column2, ''), COALESCE(extra_column3, ''),
+               COALESCE(SAPFullPath, ''), COALESCE(timestamp, ''), lease_owner, lease_expires
+        FROM src.questions ORDER BY id
+    """)
+    conn.commit()
+    conn.execute("DETACH DATABASE src")
+    conn.close()
+
+def time_scans(db_file, which, repeat):
+    conn = sqlite3.connect(db_file)
+    timings = {}
+    for name, queries in SCHEMA_SCANS.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(queries[which]).fetchall()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = round(best, 6)
+    conn.close()
+    return timings
+
+def file_bytes(db_file):
+    conn = sqlite3.connect(db_file)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.close()
+    return page_size * pages
+
+def bench_schema(source, work_dir, repeat):
+    """
+    Size and scan times of the legacy wide table versus the compact schema it migrates to
+    (queried both through the compatibility view and natively).
+    """
+    legacy = Path(work_dir) / "legacy.db"
+    if legacy.exists():
+        legacy.unlink()
+    build_legacy_db(source, legacy)
+    before_bytes = file_bytes(legacy)
+    before = time_scans(legacy, 0, repeat)
+    previous = db_utils.DB_FILE
+    db_utils.DB_FILE = str(legacy)
+    try:
+        start = time.perf_counter()
+        db_utils.init_db()
+        migrate_seconds = time.perf_counter() - start
+    finally:
+        db_utils.DB_FILE = previous
+    after_bytes = file_bytes(legacy)
+    view = time_scans(legacy, 0, repeat)
+    native = time_scans(legacy, 1, repeat)
+    result = {
+        "bytes_before": before_bytes,
+        "bytes_after": after_bytes,
+        "size_reduction": round(1 - after_bytes / before_bytes, 3) if before_bytes else 0.0,
+        "migrate_seconds": round(migrate_seconds, 3),
+        "scans": {name: {"before": before[name], "view": view[name], "native": native[name]} for name in SCHEMA_SCANS},
+    }
+    print(f"  schema: {before_bytes / 1e6:.1f} MB -> {after_bytes / 1e6:.1f} MB ({result['size_reduction']:.0%} smaller), "
+          f"migration {result['migrate_seconds']}s", flush=True)
+    for name, t in result["scans"].items():
+        print(f"    {name:20s} before {t['before']:.4f}s  view {t['view']:.4f}s  native {t['native']:.4f}s", flush=True)
+    return result
+
+def apply_baseline(results, baseline, tolerance):
+    """
+    Annotates each result with its baseline and threshold and returns the list of regressions.
+    """
+    regressions = []
+    for group, ops in results.items():
+        for name, result in ops.items():
+            base = baseline.get("results", {}).get(group, {}).get(name)
+            if not base:
+                continue
+            threshold = base["seconds"] * (1 + tolerance)
+            result["baseline_seconds"] = base["seconds"]
+            result["threshold_seconds"] = round(threshold, 6)
+            result["regressed"] = result["seconds"] > threshold
+            if result["regressed"]:
+                regressions.append(f"{group}/{name}: {result['seconds']:.4f}s > {threshold:.4f}s")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the questions.db data layer")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated database sizes")
+    parser.add_argument("--batch", type=int, default=500, help="Rows per import/save benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats for read-only benchmarks (best time kept)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over baseline (0.25 = 25%%)")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild cached synthetic databases")
+    args = parser.parse_args(argv)
+
+    results = {}
+    memory = {}
+    schema = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"{size} rows:")
+            results[str(size)] = bench_size(size, work_dir, args.batch, args.repeat, args.regenerate)
+            memory[str(size)] = measure_queue_memory(DATA_DIR / f"questions_{size}.db")
+            schema[str(size)] = bench_schema(DATA_DIR / f"questions_{size}.db", work_dir, args.repeat)
+    print("extractor:")
+    results["extractor"] = bench_extractor(args.repeat)
+
+    report = {
+        "generated": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "batch": args.batch,
+        "results": results,
+        "queue_memory": memory,
+        "schema": schema,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = apply_baseline(results, baseline, args.tolerance)
+        report["baseline"] = args.baseline
+        report["tolerance"] = args.tolerance
+        report["regressions"] = regressions
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if regressions:
+        print("Regressions:")
+        for r in regressions:
+            print("  " + r)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+import db_utils
+import jobs
+import import_manifest
+import backup
+from main_app import MainApp
+from question_categorizer_screen import QuestionCategorizerScreen
+
+class TestCategorizerActivity(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.db_file = db_utils.DB_FILE
+        db_utils.DB_FILE = os.path.join(self.tmp.name, "questions.db")
+        db_utils.init_db()
+        db_utils.init_config_db()
+        db_utils.init_rules_db()
+        jobs.init_jobs_db()
+        import_manifest.init_manifest_db()
+        backup.init_backup_db()
+        db_utils.save_config("tester", "A/B/C/D", "T/U/V/W", "")
+        db_utils.import_questions_list_to_db([f"question {i}?" for i in range(5)], "A/B/C/D")
+
+    def tearDown(self):
+        db_utils.DB_FILE = self.db_file
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    async def test_hotkeys_count_as_input(self):
+        app = MainApp()
+        async with app.run_test() as pilot:
+            for _ in range(50):
+                if isinstance(app.screen, QuestionCategorizerScreen):
+                    break
+                await pilot.pause(0.1)
+            self.assertIsInstance(app.screen, QuestionCategorizerScreen)
+            app.last_input = 0
+            await pilot.press("1")
+            self.assertGreater(app.last_input, 0)
+            self.assertEqual(app.screen.categorized, 1)
+            app.last_input = 0
+            await pilot.press("backspace")
+            self.assertGreater(app.last_input, 0)
+            self.assertEqual(app.screen.categorized, 0)
+
+if __name__ == "__main__":
+    unittest.main()
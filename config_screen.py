@@ -2,6 +2,7 @@ from textual.screen import Screen
 from textual.widgets import Static, Button, Header, Footer, Input
 from textual.containers import Container
 from textual import events
+import async_db
 from db_utils import save_config
 
 class ConfigScreen(Screen):
@@ -48,7 +49,7 @@ class ConfigScreen(Screen):
             advisory_sap = self.query_one("#advisory_input", Input).value
             technical_sap = self.query_one("#technical_input", Input).value
             advisory_resource_sap = self.query_one("#advisory_resource_input", Input).value
-            save_config(alias, advisory_sap, technical_sap, advisory_resource_sap)
+            await async_db.run(save_config, alias, advisory_sap, technical_sap, advisory_resource_sap)
             from menu_screen import MenuScreen
             self.app.push_screen(MenuScreen())
 
@@ -0,0 +1,92 @@
+"""
+Parallel parser for very large question CSVs.
+
+The file is memory-mapped and cut into chunks of about CHUNK_BYTES that end on a record boundary:
+a newline with an even number of quote characters before it, so quoted fields containing newlines
+are never split. Chunks are parsed with csv.reader on a process pool and handed back in file order,
+with only a bounded number of chunks in flight, so memory stays constant whatever the file size.
+
+    for batch in iter_question_batches("dump.csv"):
+        ...
+"""
+import csv
+import io
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_BYTES = 16 * 1024 * 1024
+UTF8_BOM = b"\xef\xbb\xbf"
+
+def normalize_question(text):
+    """
+    Trims the question the way the per-row CSV import always has (str.strip). Internal whitespace is
+    kept: questions are matched on LOWER(TRIM(question)), so collapsing it here would let a re-import
+    insert near-duplicates of rows saved before.
+    """
+    return text.strip()
+
+def chunk_ranges(mm, chunk_bytes=CHUNK_BYTES, digest=None):
+    """
+    Yields (start, end) byte ranges of `mm` that each hold whole CSV records. When `digest` (a
+    hashlib object) is given it is fed every byte in order, so the file is hashed in the same pass.
+    """
+    size = len(mm)
+    start = len(UTF8_BOM) if mm[:len(UTF8_BOM)] == UTF8_BOM else 0
+    if digest is not None and start:
+        digest.update(mm[:start])
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        quotes = mm[start:end].count(b'"')
+        # Extend to the first newline that is outside a quoted field
+        while end < size:
+            newline = mm.find(b"\n", end)
+            if newline == -1:
+                end = size
+                break
+            quotes += mm[end:newline].count(b'"')
+            end = newline + 1
+            if quotes % 2 == 0:
+                break
+        if digest is not None:
+            digest.update(mm[start:end])
+        yield start, end
+        start = end
+
+def parse_chunk(path, start, end):
+    """
+    Parses one chunk in a worker process and returns its normalized, non-empty first-column values.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8", errors="replace")
+    questions = []
+    for row in csv.reader(io.StringIO(text, newline="")):
+        if row:
+            question = normalize_question(row[0])
+            if question:
+                questions.append(question)
+    return questions
+
+def iter_question_batches(path, chunk_bytes=CHUNK_BYTES, workers=None, digest=None):
+    """
+    Yields one list of questions per chunk, in file order. At most two chunks per worker are
+    parsed ahead of the consumer.
+    """
+    workers = workers or os.cpu_count() or 1
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = chunk_ranges(mm, chunk_bytes, digest)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start, end in ranges:
+                pending.append(pool.submit(parse_chunk, path, start, end))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+def iter_questions(path, chunk_bytes=CHUNK_BYTES, workers=None):
+    for batch in iter_question_batches(path, chunk_bytes, workers):
+        yield from batch
@@ -1,58 +1,86 @@
 from textual.screen import Screen
-from textual.widgets import Static, Button, Header, Footer, Select
+from textual.widgets import Static, Button, Header, Footer, Select, SelectionList, Checkbox
 from textual.containers import Container, Horizontal
-from textual import events
-from pathlib import Path
-from db_utils import get_saps_from_config, import_questions_to_db_with_sap, get_uncategorized_questions_from_db
+from textual import events, work
+from db_utils import get_saps_from_config, claim_questions, lease_owner
+import async_db
+import import_manifest
 
 class CsvImportScreen(Screen):
     def compose(self):
-        csv_files = [f for f in Path('.').glob('*.csv')]
-        saps = get_saps_from_config()
         yield Header()
         yield Container(
             Static("CSV Import", classes="title", id="csv_import_title"),
             Static(
-                "If you want to stop being asked to import CSV files, then remove CSV files from the project directory.",
+                "Files are only offered at startup when they are new or changed since their last import. "
+                "If you want to stop being asked, remove CSV files from the project directory.",
                 id="csv_info",
             ),
-            Static("Select a CSV file to import questions:", id="csv_label"),
-            Select(
-                options=[(f.name, f.name) for f in csv_files],
-                prompt="Choose CSV file",
-                id="csv_select"
-            ),
+            Static("Select the CSV files to import (new and changed files are pre-selected):", id="csv_label"),
+            SelectionList(id="csv_select"),
+            Checkbox("Re-import unchanged files", id="force_import"),
             Static("Select SAP to associate with these questions:", id="sap_label"),
-            Select(
-                options=[
-                    (f"Advisory SAP: {saps.get('advisory_sap', '')}", saps.get("advisory_sap", "")),
-                    (f"Technical SAP: {saps.get('technical_sap', '')}", saps.get("technical_sap", "")),
-                    (f"Advisory w/ Resource Awareness SAP: {saps.get('advisory_resource_sap', '')}", saps.get("advisory_resource_sap", ""))
-                ],
-                prompt="Choose SAP",
-                id="sap_select"
-            ),
+            Select(options=[], prompt="Choose SAP", id="sap_select"),
             Horizontal(
-                Button("Import", id="import_btn", variant="success", disabled=not bool(csv_files)),
+                Button("Import", id="import_btn", variant="success", disabled=True),
                 Button("Back to Menu", id="back_to_menu", variant="primary"),
                 id="csv_import_buttons"
             ),
+            Static("", id="csv_output"),
             id="csv_import_container"
         )
         yield Footer()
 
+    async def on_mount(self):
+        # Checking the files against the manifest may hash some of them
+        csv_files, saps = await async_db.read_many(import_manifest.csv_files_with_status, get_saps_from_config)
+        self.query_one("#csv_select", SelectionList).add_options(
+            [(f"{path.name} ({status})", str(path), status != import_manifest.UNCHANGED) for path, status in csv_files]
+        )
+        self.query_one("#sap_select", Select).set_options([
+            (f"Advisory SAP: {saps.get('advisory_sap', '')}", saps.get("advisory_sap", "")),
+            (f"Technical SAP: {saps.get('technical_sap', '')}", saps.get("technical_sap", "")),
+            (f"Advisory w/ Resource Awareness SAP: {saps.get('advisory_resource_sap', '')}", saps.get("advisory_resource_sap", ""))
+        ])
+        self.query_one("#import_btn", Button).disabled = not csv_files
+
     async def on_button_pressed(self, event: Button.Pressed):
         if event.button.id == "back_to_menu":
             from menu_screen import MenuScreen
             self.app.push_screen(MenuScreen())
         elif event.button.id == "import_btn":
-            csv_filename = self.query_one("#csv_select", Select).value
-            sap_full_path = self.query_one("#sap_select", Select).value
-            if csv_filename and sap_full_path:
-                import_questions_to_db_with_sap(csv_filename, sap_full_path)
-            from question_categorizer_screen import QuestionCategorizerScreen
-            uncategorized = get_uncategorized_questions_from_db()
-            self.app.push_screen(QuestionCategorizerScreen(uncategorized))
+            csv_filenames = self.query_one("#csv_select", SelectionList).selected
+            sap_select = self.query_one("#sap_select", Select)
+            if csv_filenames and not sap_select.is_blank() and sap_select.value:
+                event.button.disabled = True
+                self.query_one("#csv_output", Static).update(f"[yellow]Importing {len(csv_filenames)} files...[/yellow]")
+                self.import_files(csv_filenames, sap_select.value, self.query_one("#force_import", Checkbox).value)
+            else:
+                await self.show_categorizer()
+
+    @work(thread=True, exclusive=True, group="csv_import")
+    def import_files(self, paths, sap_full_path, force):
+        output = self.query_one("#csv_output", Static)
+
+        def progress(path, result):
+            self.app.call_from_thread(output.update, f"[yellow]Imported {len(result.files)} of {len(paths)} files...[/yellow]")
+        try:
+            result = import_manifest.import_csv_files(paths, sap_full_path, force=force, progress=progress)
+        except Exception as e:
+            self.app.call_from_thread(output.update, f"[red]Import failed: {e}[/red]")
+            return
+        if result.errors:
+            lines = [f"[red]{path}: {error}[/red]" for path, error in result.errors.items()]
+            self.app.call_from_thread(output.update, "\n".join(lines))
+            return
+        uncategorized = claim_questions(lease_owner())
+        self.app.call_from_thread(self.show_categorizer, uncategorized)
+
+    async def show_categorizer(self, uncategorized=None):
+        from question_categorizer_screen import QuestionCategorizerScreen
+        if uncategorized is None:
+            uncategorized = await async_db.run(claim_questions, lease_owner())
+        self.app.push_screen(QuestionCategorizerScreen(uncategorized))
 
     async def on_key(self, event: events.Key):
         if event.key == "ctrl+c":
@@ -72,6 +100,10 @@ class CsvImportScreen(Screen):
         margin-top: 1;
         margin-bottom: 0;
     }
+    #csv_select {
+        height: auto;
+        max-height: 12;
+    }
     #csv_import_buttons {
         align: center middle;
         margin-top: 1;
@@ -85,4 +117,4 @@ class CsvImportScreen(Screen):
         min-width: 10;
         padding: 0 1;
     }
-    """
\ No newline at end of file
+    """
@@ -0,0 +1,95 @@
+import copy
+import threading
+import time
+from functools import wraps
+import metrics
+
+_lock = threading.Lock()
+# table name -> generation counter, bumped by every write that touches the table
+_generations = {}
+# cache key -> (generations snapshot, stored_at, value)
+_entries = {}
+# function name -> [hits, misses]
+_stats = {}
+# Callable returning a value that partitions the cache, e.g. the current database file
+_scope = lambda: None
+
+def set_scope(func):
+    global _scope
+    _scope = func
+
+def _snapshot(tables):
+    return tuple(_generations.get(t, 0) for t in tables)
+
+def invalidate(*tables):
+    """
+    Marks every cached read that depends on any of `tables` as stale.
+    """
+    with _lock:
+        for t in tables:
+            _generations[t] = _generations.get(t, 0) + 1
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _stats.clear()
+
+def cached(*tables, ttl=None):
+    """
+    Caches a read function's result until one of `tables` is written through an @invalidates
+    function, or for at most `ttl` seconds when given (for data other processes may change).
+    Results are only stored if no write happened while they were being read, so a slow read racing
+    a write on another thread can never plant a stale value.
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, _scope(), args, tuple(sorted(kwargs.items())))
+            with _lock:
+                snap = _snapshot(tables)
+                entry = _entries.get(key)
+                counts = _stats.setdefault(name, [0, 0])
+                if entry and entry[0] == snap and (ttl is None or time.monotonic() - entry[1] < ttl):
+                    counts[0] += 1
+                    value = entry[2]
+                    hit = True
+                else:
+                    counts[1] += 1
+                    hit = False
+            if hit:
+                metrics.increment(f"cache.{name}.hit")
+                return copy.copy(value)
+            metrics.increment(f"cache.{name}.miss")
+            value = func(*args, **kwargs)
+            with _lock:
+                if _snapshot(tables) == snap:
+                    _entries[key] = (snap, time.monotonic(), value)
+            return copy.copy(value)
+        wrapper.cache_tables = tables
+        return wrapper
+    return decorator
+
+def invalidates(*tables):
+    """
+    Decorator for write functions: bumps the generation of `tables` once the write returns
+    (or fails, since a partial write may have been committed).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                invalidate(*tables)
+        wrapper.invalidates_tables = tables
+        return wrapper
+    return decorator
+
+def stats():
+    with _lock:
+        return {
+            name: {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 3) if h + m else 0.0}
+            for name, (h, m) in sorted(_stats.items())
+        }
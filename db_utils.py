@@ -1,33 +1,45 @@
-def count_questions_for_sap(sap_full_path):
-    """
-    Returns the number of questions in the database for the given SAP full path.
-    """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM questions WHERE SAPFullPath = ?", (sap_full_path,))
-    count = c.fetchone()[0]
-    conn.close()
-    return count
-def delete_questions_for_sap(sap_full_path):
-    """
-    Deletes all questions from the database for the given SAP full path.
-    Returns the number of deleted questions.
-    """
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM questions WHERE SAPFullPath = ?", (sap_full_path,))
-    count = c.fetchone()[0]
-    c.execute("DELETE FROM questions WHERE SAPFullPath = ?", (sap_full_path,))
-    conn.commit()
-    conn.close()
-    return count
 import csv
+import json
+import os
+import socket
+import getpass
+import time
 import sqlite3
+import sys
 import datetime
+import itertools
 import uuid
 from pathlib import Path
+from metrics import timed
+import query_tracer
+import db_cache
+import csv_chunks
 
 DB_FILE = "questions.db"
+AUTO_VACUUM_INCREMENTAL = 2
+# Rows removed per transaction by delete_questions_for_sap
+DELETE_CHUNK_SIZE = 5000
+# Counts can also change through other processes sharing the database, so they expire
+COUNT_CACHE_TTL = 30
+# Seconds to wait for another analyst's write lock before failing
+DB_TIMEOUT = 30
+# Question leasing for concurrent categorization from a shared database
+LEASE_SECONDS = 600
+LEASE_BATCH_SIZE = 50
+# How questions are compared for duplicates; must match idx_questions_normalized for lookups to use it
+NORMALIZED_QUESTION = "LOWER(TRIM(question))"
+
+def get_connection():
+    """
+    Opens a connection to DB_FILE. All database access should go through here so that
+    opt-in tooling such as the query tracer sees every statement.
+    """
+    if query_tracer.is_enabled():
+        return query_tracer.connect(DB_FILE, timeout=DB_TIMEOUT)
+    return sqlite3.connect(DB_FILE, timeout=DB_TIMEOUT)
+
+# Cached reads are kept per database file
+db_cache.set_scope(lambda: DB_FILE)
 
 CATEGORIES = [
     "Scoping",
@@ -39,58 +51,476 @@ CATEGORIES = [
     "Another Product",
     "N/A"
 ]
+CATEGORY_CODES = {cat: i for i, cat in enumerate(CATEGORIES)}
+UNCATEGORIZED = -1
+
+class QuestionRecord:
+    """
+    Compact in-memory question row used by the categorizer queue.
+    The SAP string is interned so all rows of one SAP share a single object, and the
+    category is stored as an index into CATEGORIES (UNCATEGORIZED when not set).
+    """
+    __slots__ = ("guid", "question", "sap", "category_code")
+
+    def __init__(self, guid, question, sap, category_code=UNCATEGORIZED):
+        self.guid = guid
+        self.question = question
+        self.sap = sys.intern(sap) if sap else ""
+        self.category_code = category_code
+
+    @property
+    def category(self):
+        return CATEGORIES[self.category_code] if self.category_code != UNCATEGORIZED else ""
+
+    @category.setter
+    def category(self, value):
+        self.category_code = CATEGORY_CODES.get(value, UNCATEGORIZED) if value else UNCATEGORIZED
+
+    def __repr__(self):
+        return f"QuestionRecord({self.guid!r}, {self.question!r}, {self.sap!r}, {self.category_code})"
+
+# Columns that moved from every questions row into question_extras (rows only exist when one is set)
+EXTRA_COLUMNS = ["aI_response", "evaluation_text", "extra_column1", "extra_column2", "extra_column3"]
+
+# Levels of the SAP hierarchy ("Azure/Virtual Machines/Networking/DNS") kept as columns of saps
+SAP_LEVELS = ["family", "product", "subcategory", "topic"]
+
+def _path_segment_sql(n):
+    """
+    SQL for the n-th (1-based) trimmed segment of saps.full_path, NULL when the path is shorter.
+    """
+    rest = "full_path || '/'"
+    for _ in range(n - 1):
+        rest = f"substr({rest}, instr({rest}, '/') + 1)"
+    return f"NULLIF(TRIM(substr({rest}, 1, instr({rest}, '/') - 1)), '')"
+
+# SAP dimension: one row per distinct SAPFullPath, its hierarchy levels derived by SQLite itself
+# (stored generated columns), so every writer only has to insert the path
+SAPS_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS saps (
+        id INTEGER PRIMARY KEY,
+        full_path TEXT NOT NULL UNIQUE,
+        {", ".join(f"{level} TEXT GENERATED ALWAYS AS ({_path_segment_sql(n)}) STORED" for n, level in enumerate(SAP_LEVELS, 1))}
+    )
+"""
+
+# Compatibility view: the original questions layout on top of the compact tables. Reads work
+# unchanged; writes go through the INSTEAD OF triggers below. Empty strings become NULL and the
+# ISO timestamp is stored as integer epoch seconds (shown back in local time).
+QUESTIONS_VIEW = """
+    CREATE VIEW IF NOT EXISTS questions AS
+    SELECT q.id AS id, q.guid AS guid, q.question AS question, c.name AS category,
+           x.aI_response AS aI_response, x.evaluation_text AS evaluation_text,
+           x.extra_column1 AS extra_column1, x.extra_column2 AS extra_column2, x.extra_column3 AS extra_column3,
+           s.full_path AS SAPFullPath,
+           strftime('%Y-%m-%dT%H:%M:%S', q.updated_at, 'unixepoch', 'localtime') AS timestamp,
+           q.lease_owner AS lease_owner, q.lease_expires AS lease_expires
+    FROM question_rows q
+    LEFT JOIN categories c ON c.id = q.category_id
+    LEFT JOIN question_extras x ON x.question_id = q.id
+    LEFT JOIN saps s ON s.id = q.sap_id
+"""
+_EXTRAS_SET = " OR ".join(f"NULLIF(NEW.{col}, '') IS NOT NULL" for col in EXTRA_COLUMNS)
+_EXTRAS_VALUES = ", ".join(f"NULLIF(NEW.{col}, '')" for col in EXTRA_COLUMNS)
+_SAP_ID = "(SELECT id FROM saps WHERE full_path = NEW.SAPFullPath)"
+_ADD_SAP = "INSERT OR IGNORE INTO saps (full_path) SELECT NEW.SAPFullPath WHERE NULLIF(NEW.SAPFullPath, '') IS NOT NULL;"
+_EPOCH = "CAST(strftime('%s', NULLIF(NEW.timestamp, ''), 'utc') AS INTEGER)"
+QUESTIONS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_insert INSTEAD OF INSERT ON questions
+    BEGIN
+        INSERT OR IGNORE INTO categories (name) SELECT NEW.category WHERE NULLIF(NEW.category, '') IS NOT NULL;
+        {_ADD_SAP}
+        INSERT INTO question_rows (id, guid, question, category_id, sap_id, updated_at, lease_owner, lease_expires)
+        VALUES (NEW.id, NEW.guid, NEW.question, (SELECT id FROM categories WHERE name = NEW.category),
+                {_SAP_ID}, {_EPOCH}, NEW.lease_owner, NEW.lease_expires);
+        INSERT INTO question_extras (question_id, {", ".join(EXTRA_COLUMNS)})
+        SELECT last_insert_rowid(), {_EXTRAS_VALUES} WHERE {_EXTRAS_SET};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_update INSTEAD OF UPDATE ON questions
+    BEGIN
+        INSERT OR IGNORE INTO categories (name) SELECT NEW.category WHERE NULLIF(NEW.category, '') IS NOT NULL;
+        {_ADD_SAP}
+        UPDATE question_rows SET
+            guid = NEW.guid, question = NEW.question,
+            category_id = (SELECT id FROM categories WHERE name = NEW.category),
+            sap_id = {_SAP_ID},
+            updated_at = CASE WHEN NEW.timestamp IS OLD.timestamp THEN updated_at ELSE {_EPOCH} END,
+            lease_owner = NEW.lease_owner, lease_expires = NEW.lease_expires
+        WHERE id = OLD.id;
+        DELETE FROM question_extras WHERE question_id = OLD.id;
+        INSERT INTO question_extras (question_id, {", ".join(EXTRA_COLUMNS)})
+        SELECT OLD.id, {_EXTRAS_VALUES} WHERE {_EXTRAS_SET};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_delete INSTEAD OF DELETE ON questions
+    BEGIN
+        DELETE FROM question_extras WHERE question_id = OLD.id;
+        DELETE FROM question_rows WHERE id = OLD.id;
+    END
+    """,
+]
+
+@timed("db.init_db")
+@db_cache.invalidates("questions")
+def db_needs_vacuum():
+    """
+    True if init_db will run the one-off VACUUM that switches an existing database to incremental auto-vacuum.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("PRAGMA auto_vacuum")
+    needed = c.fetchone()[0] != AUTO_VACUUM_INCREMENTAL
+    if needed:
+        c.execute("SELECT COUNT(*) FROM sqlite_master")
+        needed = c.fetchone()[0] > 0
+    conn.close()
+    return needed
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
+    # Incremental auto-vacuum lets maintenance hand freed pages back to the filesystem.
+    # New databases pick it up before the first table is created; existing ones need a one-off VACUUM.
+    c.execute("PRAGMA auto_vacuum")
+    if c.fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        c.execute("SELECT COUNT(*) FROM sqlite_master")
+        if c.fetchone()[0]:
+            c.execute("VACUUM")
+    # WAL lets several analysts read while one of them commits
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("SELECT type FROM sqlite_master WHERE name = 'questions'")
+    existing = c.fetchone()
+    if existing and existing[0] == "table":
+        migrate_questions_table(conn)
+    else:
+        c.execute("PRAGMA table_info(question_rows)")
+        columns = [col[1] for col in c.fetchall()]
+        if columns and "sap_id" not in columns:
+            add_sap_dimension(conn)
+        _create_question_schema(c)
+    conn.commit()
+    conn.close()
+
+def _create_question_schema(c):
     c.execute("""
-        CREATE TABLE IF NOT EXISTS questions (
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    # Ids of the built-in categories match CATEGORY_CODES (and QuestionRecord.category_code)
+    c.executemany("INSERT OR IGNORE INTO categories (id, name) VALUES (?, ?)", list(enumerate(CATEGORIES)))
+    c.execute(SAPS_TABLE)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_saps_product ON saps(product, subcategory)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_saps_family ON saps(family)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS question_rows (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             guid TEXT UNIQUE,
             question TEXT,
-            category TEXT,
-            aI_response TEXT,
-            evaluation_text TEXT,
-            extra_column1 TEXT,
-            extra_column2 TEXT,
-            extra_column3 TEXT,
-            SAPFullPath TEXT,
-            timestamp TEXT
+            category_id INTEGER REFERENCES categories(id),
+            sap_id INTEGER REFERENCES saps(id),
+            updated_at INTEGER,
+            lease_owner TEXT,
+            lease_expires REAL
         )
     """)
-    c.execute("PRAGMA table_info(questions)")
-    columns = [col[1] for col in c.fetchall()]
-    if "SAPFullPath" not in columns:
-        c.execute("ALTER TABLE questions ADD COLUMN SAPFullPath TEXT")
-    conn.commit()
-    conn.close()
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS question_extras (
+            question_id INTEGER PRIMARY KEY REFERENCES question_rows(id),
+            {", ".join(f"{col} TEXT" for col in EXTRA_COLUMNS)}
+        )
+    """)
+    # Indexes backing server-side filtering in the question browser and per-SAP counts
+    c.execute("CREATE INDEX IF NOT EXISTS idx_questions_category ON question_rows(category_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_questions_sap ON question_rows(sap_id)")
+    # Expression index for case/whitespace-insensitive duplicate checks (imports and merges)
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_questions_normalized ON question_rows({NORMALIZED_QUESTION})")
+    c.execute(QUESTIONS_VIEW)
+    for trigger in QUESTIONS_TRIGGERS:
+        c.execute(trigger)
+
+def migrate_questions_table(conn):
+    """
+    One-off migration of a database still holding the original wide questions table to the compact
+    layout (question_rows + categories + question_extras behind the questions view), in one transaction.
+    """
+    conn.isolation_level = None
+    c = conn.cursor()
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("PRAGMA table_info(questions)")
+        columns = [col[1] for col in c.fetchall()]
+        for column, kind in (("SAPFullPath", "TEXT"), ("lease_owner", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:
+                c.execute(f"ALTER TABLE questions ADD COLUMN {column} {kind}")
+        c.execute("ALTER TABLE questions RENAME TO questions_legacy")
+        for index in ("idx_questions_category", "idx_questions_sap", "idx_questions_normalized"):
+            c.execute(f"DROP INDEX IF EXISTS {index}")
+        _create_question_schema(c)
+        c.execute("""
+            INSERT OR IGNORE INTO categories (name)
+            SELECT DISTINCT category FROM questions_legacy WHERE category IS NOT NULL AND category != ''
+        """)
+        c.execute("""
+            INSERT OR IGNORE INTO saps (full_path)
+            SELECT DISTINCT SAPFullPath FROM questions_legacy WHERE SAPFullPath IS NOT NULL AND SAPFullPath != ''
+        """)
+        c.execute("""
+            INSERT INTO question_rows (id, guid, question, category_id, sap_id, updated_at, lease_owner, lease_expires)
+            SELECT q.id, q.guid, q.question, c.id, s.id,
+                   CAST(strftime('%s', NULLIF(q.timestamp, ''), 'utc') AS INTEGER), q.lease_owner, q.lease_expires
+            FROM questions_legacy q
+            LEFT JOIN categories c ON c.name = q.category
+            LEFT JOIN saps s ON s.full_path = q.SAPFullPath
+        """)
+        c.execute(f"""
+            INSERT INTO question_extras (question_id, {", ".join(EXTRA_COLUMNS)})
+            SELECT id, {", ".join(f"NULLIF({col}, '')" for col in EXTRA_COLUMNS)} FROM questions_legacy
+            WHERE {" OR ".join(f"NULLIF({col}, '') IS NOT NULL" for col in EXTRA_COLUMNS)}
+        """)
+        c.execute("DROP TABLE questions_legacy")
+        c.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = ""
+    # Hand the pages of the dropped table back to the filesystem
+    conn.executescript("PRAGMA incremental_vacuum;")
+
+def add_sap_dimension(conn):
+    """
+    Upgrades question_rows from a SAPFullPath text column to sap_id referencing saps, in one transaction.
+    The questions view and its triggers are dropped here and recreated by _create_question_schema.
+    """
+    conn.isolation_level = None
+    c = conn.cursor()
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("DROP VIEW IF EXISTS questions")
+        c.execute(SAPS_TABLE)
+        c.execute("ALTER TABLE question_rows ADD COLUMN sap_id INTEGER REFERENCES saps(id)")
+        c.execute("""
+            INSERT OR IGNORE INTO saps (full_path)
+            SELECT DISTINCT SAPFullPath FROM question_rows WHERE SAPFullPath IS NOT NULL AND SAPFullPath != ''
+        """)
+        c.execute("UPDATE question_rows SET sap_id = (SELECT id FROM saps WHERE full_path = question_rows.SAPFullPath)")
+        c.execute("DROP INDEX IF EXISTS idx_questions_sap")
+        c.execute("ALTER TABLE question_rows DROP COLUMN SAPFullPath")
+        c.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = ""
 
+def get_sap_id(c, sap_full_path):
+    """
+    saps.id for a SAPFullPath (None for no SAP), adding the path on first use.
+    """
+    if not sap_full_path:
+        return None
+    c.execute("INSERT OR IGNORE INTO saps (full_path) VALUES (?)", (sap_full_path,))
+    c.execute("SELECT id FROM saps WHERE full_path = ?", (sap_full_path,))
+    return c.fetchone()[0]
+
+def _epoch(timestamp):
+    """
+    ISO timestamp (local time, as written by datetime.now().isoformat()) to integer epoch seconds.
+    """
+    return int(datetime.datetime.fromisoformat(timestamp).timestamp()) if timestamp else None
+
+def _category_id(c, category):
+    """
+    categories.id for a category name (None for no category); unknown names are added.
+    """
+    if not category:
+        return None
+    if category in CATEGORY_CODES:
+        return CATEGORY_CODES[category]
+    c.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (category,))
+    c.execute("SELECT id FROM categories WHERE name = ?", (category,))
+    return c.fetchone()[0]
+
+def _save_extras(c, guid, values):
+    """
+    Stores the extra columns of one question; the side-table row is dropped when they are all empty.
+    """
+    values = [v or None for v in values]
+    c.execute("DELETE FROM question_extras WHERE question_id = (SELECT id FROM question_rows WHERE guid = ?)", (guid,))
+    if any(values):
+        c.execute(
+            f"INSERT INTO question_extras (question_id, {', '.join(EXTRA_COLUMNS)}) SELECT id, ?, ?, ?, ?, ? FROM question_rows WHERE guid = ?",
+            values + [guid]
+        )
+
+@timed("db.get_categorized_guids")
 def get_categorized_guids():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("SELECT guid FROM questions WHERE category IS NOT NULL AND category != ''")
+    c.execute("SELECT guid FROM question_rows WHERE category_id IS NOT NULL")
     rows = c.fetchall()
     conn.close()
     return set(row[0] for row in rows)
 
-def save_to_db(row):
-    conn = sqlite3.connect(DB_FILE)
+@timed("db.save_to_db")
+@db_cache.invalidates("questions")
+def save_to_db(row, owner=None):
+    """
+    Saves a categorized row. When `owner` is given the write only succeeds if that owner still
+    holds the question's lease (or nobody does), and the lease is cleared. Returns True if saved.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    category_id = _category_id(c, row[2])
+    if owner is None:
+        c.execute(
+            "UPDATE question_rows SET category_id = ?, updated_at = ? WHERE guid = ?",
+            (category_id, _epoch(row[8]), row[0])
+        )
+    else:
+        c.execute("""
+            UPDATE question_rows SET category_id = ?, updated_at = ?, lease_owner = NULL, lease_expires = NULL
+            WHERE guid = ? AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)
+        """, (category_id, _epoch(row[8]), row[0], owner, time.time()))
+    saved = c.rowcount > 0
+    if saved:
+        _save_extras(c, row[0], row[3:8])
+    conn.commit()
+    conn.close()
+    return saved
+
+@timed("db.uncategorize_question")
+@db_cache.invalidates("questions")
+def uncategorize_question(guid, owner, lease_seconds=LEASE_SECONDS):
+    """
+    Undoes a categorization: clears the category and leases the question back to `owner`.
+    Returns False if someone else has leased it since.
+    """
+    now = time.time()
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
-        UPDATE questions
-        SET category = ?, aI_response = ?, evaluation_text = ?, extra_column1 = ?, extra_column2 = ?, extra_column3 = ?, timestamp = ?
-        WHERE guid = ?
-    """, (row[2], row[3], row[4], row[5], row[6], row[7], row[8], row[0]))
+        UPDATE question_rows SET category_id = NULL, updated_at = NULL, lease_owner = ?, lease_expires = ?
+        WHERE guid = ? AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)
+    """, (owner, now + lease_seconds, guid, owner, now))
+    undone = c.rowcount > 0
+    conn.commit()
+    conn.close()
+    return undone
+
+_lease_owner = None
+
+def lease_owner():
+    """
+    Identifies this app instance in question leases: the configured alias plus host and process,
+    so one analyst running two terminals still gets disjoint batches.
+    """
+    global _lease_owner
+    if _lease_owner is None:
+        alias = get_config_values().get("alias") or getpass.getuser()
+        _lease_owner = f"{alias}@{socket.gethostname()}:{os.getpid()}"
+    return _lease_owner
+
+@timed("db.claim_questions")
+@db_cache.invalidates("questions")
+def claim_questions(owner, batch_size=LEASE_BATCH_SIZE, lease_seconds=LEASE_SECONDS):
+    """
+    Atomically leases up to `batch_size` uncategorized questions that nobody else holds (or whose
+    lease expired) to `owner` and returns them as QuestionRecords. BEGIN IMMEDIATE takes the write
+    lock up front, so two analysts claiming at the same moment always get disjoint batches.
+    """
+    now = time.time()
+    conn = get_connection()
+    conn.isolation_level = None
+    c = conn.cursor()
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("""
+            UPDATE question_rows SET lease_owner = ?, lease_expires = ?
+            WHERE id IN (
+                SELECT id FROM question_rows
+                WHERE category_id IS NULL AND (lease_owner IS NULL OR lease_expires < ?)
+                ORDER BY id LIMIT ?
+            )
+        """, (owner, now + lease_seconds, now, batch_size))
+        c.execute(
+            """
+            SELECT q.guid, q.question, s.full_path FROM question_rows q LEFT JOIN saps s ON s.id = q.sap_id
+            WHERE q.lease_owner = ? AND q.lease_expires = ? ORDER BY q.id
+            """,
+            (owner, now + lease_seconds)
+        )
+        rows = c.fetchall()
+        c.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return [QuestionRecord(row[0], row[1], row[2]) for row in rows]
+
+@timed("db.renew_leases")
+def renew_leases(owner, lease_seconds=LEASE_SECONDS):
+    """
+    Extends every lease `owner` still holds on uncategorized questions. Returns the number renewed.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "UPDATE question_rows SET lease_expires = ? WHERE lease_owner = ? AND category_id IS NULL",
+        (time.time() + lease_seconds, owner)
+    )
+    renewed = c.rowcount
+    conn.commit()
+    conn.close()
+    return renewed
+
+@timed("db.release_leases")
+def release_leases(owner, guids=None):
+    """
+    Releases `owner`'s leases (only those in `guids` when given) so other analysts can pick them up.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    if guids is None:
+        c.execute("UPDATE question_rows SET lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ?", (owner,))
+    else:
+        c.executemany(
+            "UPDATE question_rows SET lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ? AND guid = ?",
+            [(owner, guid) for guid in guids]
+        )
+    released = c.rowcount
     conn.commit()
     conn.close()
+    return released
 
+@timed("db.read_questions")
 def read_questions(csv_file):
     with open(csv_file, newline='', encoding='utf-8') as f:
         reader = csv.reader(f)
         return [row[0] for row in reader if row and row[0].strip()]
 
+def iter_questions(csv_file):
+    """
+    Streams the normalized first-column questions of a CSV file of any size with constant memory,
+    parsing memory-mapped chunks on all cores (see csv_chunks).
+    """
+    return csv_chunks.iter_questions(csv_file)
+
+@timed("db.import_questions_to_db")
+@db_cache.invalidates("questions")
 def import_questions_to_db(csv_file):
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
     with open(csv_file, newline='', encoding='utf-8') as f:
         reader = csv.reader(f)
@@ -98,27 +528,27 @@ def import_questions_to_db(csv_file):
             question = row[0].strip()
             if not question:
                 continue
-            c.execute("SELECT guid FROM questions WHERE question = ?", (question,))
+            c.execute("SELECT guid FROM question_rows WHERE question = ?", (question,))
             result = c.fetchone()
             if not result:
                 guid = str(uuid.uuid4())
-                c.execute(
-                    "INSERT INTO questions (guid, question, category, aI_response, evaluation_text, extra_column1, extra_column2, extra_column3, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (guid, question, '', '', '', '', '', '', '')
-                )
+                c.execute("INSERT INTO question_rows (guid, question) VALUES (?, ?)", (guid, question))
     conn.commit()
     conn.close()
 
+@timed("db.get_uncategorized_questions_from_db")
 def get_uncategorized_questions_from_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
-    c.execute("SELECT guid, question, SAPFullPath FROM questions WHERE category IS NULL OR category = ''")
+    c.execute("SELECT q.guid, q.question, s.full_path FROM question_rows q LEFT JOIN saps s ON s.id = q.sap_id WHERE q.category_id IS NULL")
     rows = c.fetchall()
     conn.close()
-    return [{"guid": row[0], "question": row[1], "sap": row[2]} for row in rows]
+    return [QuestionRecord(row[0], row[1], row[2]) for row in rows]
 
+@timed("db.init_config_db")
+@db_cache.invalidates("configuration")
 def init_config_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS configuration (
@@ -130,16 +560,20 @@ def init_config_db():
     conn.commit()
     conn.close()
 
+@timed("db.config_exists")
+@db_cache.cached("configuration")
 def config_exists():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT COUNT(*) FROM configuration")
     count = c.fetchone()[0]
     conn.close()
     return count > 0
 
+@timed("db.save_config")
+@db_cache.invalidates("configuration")
 def save_config(alias, advisory_sap, technical_sap, advisory_resource_sap):
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
     now = datetime.datetime.now().isoformat()
     c.execute("INSERT OR REPLACE INTO configuration (key, value, last_updated) VALUES (?, ?, ?)", ("alias", alias, now))
@@ -149,64 +583,511 @@ def save_config(alias, advisory_sap, technical_sap, advisory_resource_sap):
     conn.commit()
     conn.close()
 
+@timed("db.get_saps_from_config")
+@db_cache.cached("configuration")
 def get_saps_from_config():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT key, value FROM configuration WHERE key IN ('advisory_sap', 'technical_sap', 'advisory_resource_sap')")
     saps = {row[0]: row[1] for row in c.fetchall()}
     conn.close()
     return saps
 
+@timed("db.get_config_values")
+@db_cache.cached("configuration")
 def get_config_values():
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT key, value FROM configuration")
     values = dict(c.fetchall())
     conn.close()
     return values
 
-def import_questions_to_db_with_sap(csv_file, sap_full_path):
-    conn = sqlite3.connect(DB_FILE)
+@timed("db.import_questions_to_db_with_sap")
+@db_cache.invalidates("questions")
+def import_questions_to_db_with_sap(csv_file, sap_full_path, start_row=0, chunk_size=None, progress=None):
+    """
+    Imports the first column of a CSV file as questions for the given SAP. Rows before `start_row`
+    are skipped; with `chunk_size` the import commits every `chunk_size` rows and calls
+    `progress(rows_done)` after each commit, so an interrupted import can resume from there.
+    Returns the number of rows read.
+    """
+    conn = get_connection()
     c = conn.cursor()
-    with open(csv_file, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            question = row[0].strip()
-            if not question:
-                continue
-            c.execute("SELECT guid FROM questions WHERE question = ?", (question,))
-            result = c.fetchone()
-            if not result:
-                guid = str(uuid.uuid4())
-                c.execute(
-                    "INSERT INTO questions (guid, question, category, aI_response, evaluation_text, extra_column1, extra_column2, extra_column3, SAPFullPath, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (guid, question, '', '', '', '', '', '', sap_full_path, '')
-                )
-            else:
-                c.execute(
-                    "UPDATE questions SET SAPFullPath = ? WHERE question = ?",
-                    (sap_full_path, question)
-                )
-    conn.commit()
-    conn.close()
+    try:
+        sap_id = get_sap_id(c, sap_full_path)
+        rows_done = start_row
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            for row_number, row in enumerate(reader):
+                if row_number < start_row:
+                    continue
+                question = row[0].strip() if row else ""
+                if question:
+                    c.execute("SELECT guid FROM question_rows WHERE question = ?", (question,))
+                    result = c.fetchone()
+                    if not result:
+                        guid = str(uuid.uuid4())
+                        c.execute(
+                            "INSERT INTO question_rows (guid, question, sap_id) VALUES (?, ?, ?)",
+                            (guid, question, sap_id)
+                        )
+                    else:
+                        c.execute(
+                            "UPDATE question_rows SET sap_id = ? WHERE question = ?",
+                            (sap_id, question)
+                        )
+                rows_done = row_number + 1
+                if chunk_size and rows_done % chunk_size == 0:
+                    conn.commit()
+                    if progress:
+                        progress(rows_done)
+        conn.commit()
+    finally:
+        # Also reached when progress() raises (e.g. the job was cancelled); uncommitted rows are discarded
+        conn.close()
+    if progress:
+        progress(rows_done)
+    return rows_done
 
+@timed("db.import_questions_list_to_db")
+@db_cache.invalidates("questions")
 def import_questions_list_to_db(questions, sap_full_path):
     """
     Imports a list of questions into the database, associating each with the given SAP path.
-    Only inserts questions that do not already exist in the database.
+    Only inserts questions that do not already exist in the database. Returns the number inserted.
     """
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     c = conn.cursor()
+    sap_id = get_sap_id(c, sap_full_path)
+    inserted = 0
     for question in questions:
-        # Check if question already exists (case-insensitive match)
-        c.execute("SELECT guid FROM questions WHERE LOWER(question) = LOWER(?)", (question,))
+        # Check if question already exists (case-insensitive match, served by idx_questions_normalized)
+        c.execute(f"SELECT guid FROM question_rows WHERE {NORMALIZED_QUESTION} = LOWER(TRIM(?))", (question,))
         result = c.fetchone()
         if not result:
             guid = str(uuid.uuid4())
-            timestamp = datetime.datetime.now().isoformat()
             c.execute(
-                "INSERT INTO questions (guid, question, category, aI_response, evaluation_text, extra_column1, extra_column2, extra_column3, SAPFullPath, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (guid, question, '', '', '', '', '', '', sap_full_path, timestamp)
+                "INSERT INTO question_rows (guid, question, sap_id, updated_at) VALUES (?, ?, ?, ?)",
+                (guid, question, sap_id, int(time.time()))
             )
+            inserted += 1
     conn.commit()
     conn.close()
+    return inserted
+
+@timed("db.count_questions_for_sap")
+@db_cache.cached("questions", ttl=COUNT_CACHE_TTL)
+def count_questions_for_sap(sap_full_path):
+    """
+    Returns the number of questions in the database for the given SAP full path.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM question_rows WHERE sap_id = (SELECT id FROM saps WHERE full_path = ?)", (sap_full_path,))
+    count = c.fetchone()[0]
+    conn.close()
+    return count
+
+@timed("db.delete_questions_for_sap")
+@db_cache.invalidates("questions")
+def delete_questions_for_sap(sap_full_path, chunk_size=DELETE_CHUNK_SIZE, progress=None):
+    """
+    Deletes all questions from the database for the given SAP full path.
+    Rows are deleted in transactions of at most `chunk_size` so the write lock is released
+    between chunks; `progress(deleted, total)` is called after each one.
+    Returns the number of deleted questions.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT id FROM saps WHERE full_path = ?", (sap_full_path,))
+    row = c.fetchone()
+    sap_id = row[0] if row else None
+    c.execute("SELECT COUNT(*) FROM question_rows WHERE sap_id = ?", (sap_id,))
+    total = c.fetchone()[0]
+    deleted = 0
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS deleted_ids (id INTEGER PRIMARY KEY)")
+    while True:
+        c.execute("DELETE FROM temp.deleted_ids")
+        c.execute(
+            "INSERT INTO temp.deleted_ids (id) SELECT id FROM question_rows WHERE sap_id = ? LIMIT ?",
+            (sap_id, chunk_size)
+        )
+        c.execute("DELETE FROM question_extras WHERE question_id IN (SELECT id FROM temp.deleted_ids)")
+        c.execute("DELETE FROM question_rows WHERE id IN (SELECT id FROM temp.deleted_ids)")
+        removed = c.rowcount
+        conn.commit()
+        if removed <= 0:
+            break
+        deleted += removed
+        if progress:
+            progress(deleted, max(total, deleted))
+    conn.close()
+    return deleted
+
+# Sentinel category filter value matching rows with no category yet
+UNCATEGORIZED_FILTER = "__uncategorized__"
+def _question_filters(category=None, sap=None, date_from=None, date_to=None, product=None):
+    """
+    Builds the WHERE clause and parameters for the question browser filters.
+    Dates are ISO strings (YYYY-MM-DD); date_to is inclusive. `product` matches saps.product.
+    """
+    clauses = []
+    params = []
+    if category == UNCATEGORIZED_FILTER:
+        clauses.append("q.category_id IS NULL")
+    elif category:
+        clauses.append("q.category_id = (SELECT id FROM categories WHERE name = ?)")
+        params.append(category)
+    if sap:
+        clauses.append("q.sap_id = (SELECT id FROM saps WHERE full_path = ?)")
+        params.append(sap)
+    if product:
+        clauses.append("q.sap_id IN (SELECT id FROM saps WHERE product = ?)")
+        params.append(product)
+    if date_from:
+        clauses.append("q.updated_at >= ?")
+        params.append(_epoch(date_from))
+    if date_to:
+        end = datetime.date.fromisoformat(date_to) + datetime.timedelta(days=1)
+        clauses.append("q.updated_at < ?")
+        params.append(_epoch(end.isoformat()))
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+@timed("db.count_questions")
+@db_cache.cached("questions", ttl=COUNT_CACHE_TTL)
+def count_questions(category=None, sap=None, date_from=None, date_to=None, product=None):
+    where, params = _question_filters(category, sap, date_from, date_to, product)
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT COUNT(*) FROM question_rows q{where}", params)
+    count = c.fetchone()[0]
+    conn.close()
+    return count
+
+@timed("db.get_questions_page")
+def get_questions_page(after_id=0, limit=200, category=None, sap=None, date_from=None, date_to=None, product=None):
+    """
+    Returns up to `limit` rows (id, guid, question, category, SAPFullPath, timestamp) with id > after_id,
+    in id order. Keyset pagination keeps every page an index seek regardless of how deep the user scrolls.
+    """
+    where, params = _question_filters(category, sap, date_from, date_to, product)
+    where = (where + " AND q.id > ?") if where else " WHERE q.id > ?"
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        f"""
+        SELECT q.id, q.guid, q.question, c.name, s.full_path, strftime('%Y-%m-%dT%H:%M:%S', q.updated_at, 'unixepoch', 'localtime')
+        FROM question_rows q LEFT JOIN categories c ON c.id = q.category_id LEFT JOIN saps s ON s.id = q.sap_id{where}
+        ORDER BY q.id LIMIT ?
+        """,
+        params + [after_id, limit]
+    )
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+@timed("db.get_distinct_saps")
+@db_cache.cached("questions", ttl=COUNT_CACHE_TTL)
+def get_distinct_saps():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        SELECT full_path FROM saps s WHERE EXISTS (SELECT 1 FROM question_rows q WHERE q.sap_id = s.id) ORDER BY full_path
+    """)
+    saps = [row[0] for row in c.fetchall()]
+    conn.close()
+    return saps
+
+@timed("db.count_questions_by_sap_level")
+@db_cache.cached("questions", ttl=COUNT_CACHE_TTL)
+def count_questions_by_sap_level(level="product", category=None):
+    """
+    Returns [(level value, question count)] grouped by one SAP_LEVELS column (e.g. per product),
+    optionally only for one category. Questions without that level are counted under None.
+    """
+    if level not in SAP_LEVELS:
+        raise ValueError(f"Unknown SAP level: {level}")
+    where, params = _question_filters(category)
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        f"SELECT s.{level}, COUNT(*) FROM question_rows q LEFT JOIN saps s ON s.id = q.sap_id{where} GROUP BY s.{level} ORDER BY s.{level}",
+        params
+    )
+    counts = c.fetchall()
+    conn.close()
+    return counts
+
+def _stage_guids(c, guids):
+    """
+    Loads `guids` into a temp table so bulk edits run as one set-based statement
+    without hitting SQLite's bound-parameter limit.
+    """
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS selected_guids (guid TEXT PRIMARY KEY)")
+    c.execute("DELETE FROM temp.selected_guids")
+    c.executemany("INSERT OR IGNORE INTO temp.selected_guids (guid) VALUES (?)", ((g,) for g in guids))
+
+@timed("db.bulk_update_category")
+@db_cache.invalidates("questions")
+def bulk_update_category(guids, category, owner=None):
+    """
+    Sets `category` on every question in `guids` in one transaction, except questions another
+    analyst holds an unexpired lease on (their save would overwrite this one); `owner` defaults to
+    this instance's lease_owner(). Leases of the updated rows are cleared, as in save_to_db.
+    Returns (rows updated, guids skipped because they are leased).
+    """
+    owner = owner or lease_owner()
+    now = time.time()
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        _stage_guids(c, guids)
+        c.execute("""
+            UPDATE question_rows SET category_id = ?, updated_at = ?, lease_owner = NULL, lease_expires = NULL
+            WHERE guid IN (SELECT guid FROM temp.selected_guids)
+              AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)
+        """, (_category_id(c, category), int(now), owner, now))
+        updated = c.rowcount
+        # Still inside the write transaction, so these are exactly the rows the UPDATE skipped
+        c.execute("""
+            SELECT guid FROM question_rows
+            WHERE guid IN (SELECT guid FROM temp.selected_guids) AND lease_owner != ? AND lease_expires >= ?
+        """, (owner, now))
+        leased = [row[0] for row in c.fetchall()]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return updated, leased
+
+@timed("db.bulk_delete_questions")
+@db_cache.invalidates("questions")
+def bulk_delete_questions(guids):
+    """
+    Deletes every question in `guids` in one transaction. Returns the number of rows deleted.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        _stage_guids(c, guids)
+        c.execute("""
+            DELETE FROM question_extras WHERE question_id IN (
+                SELECT id FROM question_rows WHERE guid IN (SELECT guid FROM temp.selected_guids)
+            )
+        """)
+        c.execute("DELETE FROM question_rows WHERE guid IN (SELECT guid FROM temp.selected_guids)")
+        deleted = c.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return deleted
+
+@timed("db.init_rules_db")
+@db_cache.invalidates("rules")
+def init_rules_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pattern TEXT NOT NULL,
+            is_regex INTEGER NOT NULL DEFAULT 0,
+            category TEXT NOT NULL,
+            sap TEXT,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            created TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+@timed("db.add_rule")
+@db_cache.invalidates("rules")
+def add_rule(pattern, category, is_regex=False, sap=None):
+    """
+    Adds an auto-categorization rule. `sap` limits the rule to one SAPFullPath; None applies it everywhere.
+    Rules are applied in id order, so earlier rules win when several match. Returns the new rule id.
+    """
+    if category not in CATEGORIES:
+        raise ValueError(f"Unknown category: {category}")
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO rules (pattern, is_regex, category, sap, enabled, created) VALUES (?, ?, ?, ?, 1, ?)",
+        (pattern, 1 if is_regex else 0, category, sap or None, datetime.datetime.now().isoformat())
+    )
+    rule_id = c.lastrowid
+    conn.commit()
+    conn.close()
+    return rule_id
+
+@timed("db.get_rules")
+@db_cache.cached("rules")
+def get_rules(enabled_only=False):
+    """
+    Returns rules as (id, pattern, is_regex, category, sap, enabled) tuples in priority order.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    where = " WHERE enabled = 1" if enabled_only else ""
+    c.execute(f"SELECT id, pattern, is_regex, category, sap, enabled FROM rules{where} ORDER BY id")
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+@timed("db.delete_rule")
+@db_cache.invalidates("rules")
+def delete_rule(rule_id):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("DELETE FROM rules WHERE id = ?", (rule_id,))
+    conn.commit()
+    conn.close()
+
+@timed("db.set_rule_enabled")
+@db_cache.invalidates("rules")
+def set_rule_enabled(rule_id, enabled):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("UPDATE rules SET enabled = ? WHERE id = ?", (1 if enabled else 0, rule_id))
+    conn.commit()
+    conn.close()
+
+EXPORT_CATEGORIES = ["Scoping", "Advisory", "Advisory+ARG", "Troubleshooting"]
+
+@timed("db.export_questions_to_json")
+def export_questions_to_json(output_dir="."):
+    """
+    Writes one export_<product>_<category>.json answer set per product and exportable category.
+    The product is saps.product (second segment of SAPFullPath); answers are the aI_response
+    (see auth_mi.answer_questions). Returns the list of files written.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    written = []
+    for cat in EXPORT_CATEGORIES:
+        c.execute("""
+            SELECT COALESCE(s.product, 'Unknown') AS product, q.question, e.aI_response
+            FROM question_rows q
+            LEFT JOIN saps s ON s.id = q.sap_id
+            LEFT JOIN question_extras e ON e.question_id = q.id
+            WHERE q.category_id = ? AND q.question IS NOT NULL AND q.question != ''
+            ORDER BY product, q.id
+        """, (CATEGORY_CODES[cat],))
+        for sap_name, rows in itertools.groupby(c.fetchall(), key=lambda row: row[0]):
+            data = {
+                "name": f"{sap_name} {cat} Question Answer set",
+                "questionsAndAnswers": [
+                    {"question": q, "answer": answer or ""} for _, q, answer in rows
+                ]
+            }
+            safe_sap = sap_name.lower().replace('+','_').replace(' ','_').replace('/','_')
+            filename = Path(output_dir) / f"export_{safe_sap}_{cat.lower().replace('+','_').replace(' ','_')}.json"
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            written.append(str(filename))
+    conn.close()
+    return written
+
+@timed("db.init_answers_db")
+def init_answers_db():
+    conn = get_connection()
+    c = conn.cursor()
+    # Answers by normalized question, so duplicates and re-imported questions are not asked again
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            norm TEXT PRIMARY KEY,
+            answer TEXT NOT NULL,
+            answered_at INTEGER
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+def _answer_filters(categories):
+    categories = categories or EXPORT_CATEGORIES
+    where = f"""
+        q.category_id IN ({", ".join("?" * len(categories))}) AND q.question IS NOT NULL AND TRIM(q.question) != ''
+        AND NOT EXISTS (SELECT 1 FROM question_extras e WHERE e.question_id = q.id AND e.aI_response IS NOT NULL)
+    """
+    return where, [CATEGORY_CODES[cat] for cat in categories]
+
+@timed("db.count_unanswered_questions")
+def count_unanswered_questions(categories=None):
+    where, params = _answer_filters(categories)
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT COUNT(*) FROM question_rows q WHERE {where}", params)
+    count = c.fetchone()[0]
+    conn.close()
+    return count
+
+@timed("db.get_unanswered_questions")
+def get_unanswered_questions(after_id=0, limit=200, categories=None):
+    """
+    Keyset-paged (id, question, normalized question) rows of questions in `categories`
+    (default EXPORT_CATEGORIES) that have no aI_response yet.
+    """
+    where, params = _answer_filters(categories)
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        f"SELECT q.id, q.question, LOWER(TRIM(q.question)) FROM question_rows q WHERE q.id > ? AND {where} ORDER BY q.id LIMIT ?",
+        [after_id] + params + [limit]
+    )
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+@timed("db.get_cached_answers")
+def get_cached_answers(norms):
+    """
+    {normalized question: answer} for the given normalized questions that were answered before.
+    """
+    norms = list(norms)
+    conn = get_connection()
+    c = conn.cursor()
+    answers = {}
+    for i in range(0, len(norms), 500):
+        chunk = norms[i:i + 500]
+        c.execute(f"SELECT norm, answer FROM answer_cache WHERE norm IN ({', '.join('?' * len(chunk))})", chunk)
+        answers.update(c.fetchall())
+    conn.close()
+    return answers
+
+@timed("db.save_answers")
+@db_cache.invalidates("questions")
+def save_answers(answers):
+    """
+    Stores [(normalized question, answer)] in one transaction: in answer_cache and as the
+    aI_response of every question with that text that has none yet. Returns the questions updated.
+    """
+    now = int(time.time())
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.executemany(
+            "INSERT OR REPLACE INTO answer_cache (norm, answer, answered_at) VALUES (?, ?, ?)",
+            [(norm, answer, now) for norm, answer in answers]
+        )
+        # The lookup expression must match idx_questions_normalized
+        c.executemany("""
+            INSERT INTO question_extras (question_id, aI_response)
+            SELECT id, ? FROM question_rows WHERE LOWER(TRIM(question)) = ?
+            ON CONFLICT(question_id) DO UPDATE SET aI_response = excluded.aI_response WHERE aI_response IS NULL
+        """, [(answer, norm) for norm, answer in answers])
+        updated = c.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return updated
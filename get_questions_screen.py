@@ -1,51 +1,37 @@
 from textual.screen import Screen
 from textual.widgets import Static, Button, Header, Footer, Select, Input
 from textual.containers import Container, Horizontal
-from textual import events
-from db_utils import get_saps_from_config, import_questions_list_to_db
-from auth_mi import run_zebra_ai_client
+from textual import events, work
+from functools import partial
+import async_db
+from db_utils import get_saps_from_config, count_questions_for_sap
+from question_pipeline import run_pipeline
+
+# (label, configuration key) of the SAPs offered in the dropdown
+SAP_CHOICES = [
+    ("Advisory SAP", "advisory_sap"),
+    ("Technical SAP", "technical_sap"),
+    ("Advisory w/ Resource Awareness SAP", "advisory_resource_sap"),
+]
 
 class GetQuestionsScreen(Screen):
-    def update_sap_dropdown(self):
-        from db_utils import get_saps_from_config, count_questions_for_sap
-        saps = get_saps_from_config()
-        sap_options = []
-        advisory_sap = saps.get('advisory_sap', '')
-        technical_sap = saps.get('technical_sap', '')
-        advisory_resource_sap = saps.get('advisory_resource_sap', '')
-        if advisory_sap:
-            count = count_questions_for_sap(advisory_sap)
-            sap_options.append((f"Advisory SAP: {advisory_sap} ({count} entries)", advisory_sap))
-        if technical_sap:
-            count = count_questions_for_sap(technical_sap)
-            sap_options.append((f"Technical SAP: {technical_sap} ({count} entries)", technical_sap))
-        if advisory_resource_sap:
-            count = count_questions_for_sap(advisory_resource_sap)
-            sap_options.append((f"Advisory w/ Resource Awareness SAP: {advisory_resource_sap} ({count} entries)", advisory_resource_sap))
+    async def on_mount(self):
+        await self.update_sap_dropdown()
+
+    async def update_sap_dropdown(self):
+        saps = await async_db.run(get_saps_from_config)
+        choices = [(label, saps.get(key, "")) for label, key in SAP_CHOICES if saps.get(key, "")]
+        # All counts in one round trip to the reader threads
+        counts = await async_db.read_many(*[partial(count_questions_for_sap, sap) for _, sap in choices])
+        sap_options = [(f"{label}: {sap} ({count} entries)", sap) for (label, sap), count in zip(choices, counts)]
         sap_select = self.query_one("#sap_select", Select)
-        sap_select.options = sap_options
-        # Optionally, keep the current selection if possible
-        if sap_select.value not in [v for _, v in sap_options]:
-            sap_select.value = sap_options[0][1] if sap_options else None
+        current = sap_select.value
+        sap_select.set_options(sap_options)
+        # Keep the current selection if possible
+        if current in [v for _, v in sap_options]:
+            sap_select.value = current
 
     def compose(self):
-        saps = get_saps_from_config()
-        from db_utils import count_questions_for_sap
-        # Prepare SAP options with counts
-        sap_options = []
-        advisory_sap = saps.get('advisory_sap', '')
-        technical_sap = saps.get('technical_sap', '')
-        advisory_resource_sap = saps.get('advisory_resource_sap', '')
-        if advisory_sap:
-            count = count_questions_for_sap(advisory_sap)
-            sap_options.append((f"Advisory SAP: {advisory_sap} ({count} entries)", advisory_sap))
-        if technical_sap:
-            count = count_questions_for_sap(technical_sap)
-            sap_options.append((f"Technical SAP: {technical_sap} ({count} entries)", technical_sap))
-        if advisory_resource_sap:
-            count = count_questions_for_sap(advisory_resource_sap)
-            sap_options.append((f"Advisory w/ Resource Awareness SAP: {advisory_resource_sap} ({count} entries)", advisory_resource_sap))
-
         yield Header()
         yield Container(
             Static("[bold yellow]Make sure you are on VPN[/bold yellow]", id="vpn_banner"),  # VPN banner
@@ -53,7 +39,7 @@ class GetQuestionsScreen(Screen):
             Static("Get Questions by SAP", classes="title", id="get_questions_title"),
             Static("Select SAP:", id="sap_label"),
             Select(
-                options=sap_options,
+                options=[],
                 prompt="Choose SAP",
                 id="sap_select"
             ),
@@ -61,6 +47,7 @@ class GetQuestionsScreen(Screen):
             Input(placeholder="Enter number of cases", id="cases_input", value="10"),
             Horizontal(
                 Button("Get Questions", id="get_questions_btn", variant="success"),
+                Button("Queue as Background Job", id="queue_fetch_btn", variant="primary"),
                 Button("Delete Questions for this SAP", id="delete_questions_btn", variant="error"),
                 Button("Back to Menu", id="back_to_menu", variant="primary"),
                 id="get_questions_buttons"
@@ -74,29 +61,28 @@ class GetQuestionsScreen(Screen):
         if event.button.id == "back_to_menu":
             from menu_screen import MenuScreen
             self.app.push_screen(MenuScreen())
-        elif event.button.id == "get_questions_btn":
-            sap_full_path = self.query_one("#sap_select", Select).value
+        elif event.button.id in ("get_questions_btn", "queue_fetch_btn"):
+            sap_select = self.query_one("#sap_select", Select)
+            if sap_select.is_blank():
+                self.query_one("#questions_output", Static).update("[red]Please select a SAP to get questions for.[/red]")
+                return
+            sap_full_path = sap_select.value
             cases_input = self.query_one("#cases_input", Input).value
             try:
                 number_of_cases = int(cases_input)
             except ValueError:
                 number_of_cases = 10
             questions_output = self.query_one("#questions_output", Static)
+            if event.button.id == "queue_fetch_btn":
+                # Survives closing the app: the job resumes from its last completed chunk
+                import jobs
+                job_id = await async_db.run(jobs.enqueue, "fetch", {"sap": sap_full_path, "cases": number_of_cases}, total=number_of_cases)
+                self.app.wake_job_worker()
+                questions_output.update(f"[green]Queued as background job {job_id}; see Background Jobs in the menu.[/green]")
+                return
             # Show working banner
             questions_output.update("[yellow]Working... this may take awhile.[/yellow]")
-            self.refresh()
-            try:
-                # Get questions from ZebraAI
-                questions = run_zebra_ai_client(sap_full_path=sap_full_path, number_of_cases=number_of_cases)
-                if questions:
-                    # Import questions into the database, avoiding duplicates
-                    import_questions_list_to_db(questions, sap_full_path)
-                    questions_output.update(f"[green]{len(questions)} questions extracted and imported into the database.[/green]")
-                else:
-                    questions_output.update("[red]No questions found or error occurred.[/red]")
-            except Exception as e:
-                questions_output.update(f"[red]Error: {str(e)}[/red]")
-            self.update_sap_dropdown()
+            self.get_questions(sap_full_path, number_of_cases)
         elif event.button.id == "delete_questions_btn":
             sap_full_path = self.query_one("#sap_select", Select).value
             questions_output = self.query_one("#questions_output", Static)
@@ -108,12 +94,51 @@ class GetQuestionsScreen(Screen):
             except ImportError:
                 questions_output.update("[red]Delete function not implemented in db_utils.py.[/red]")
                 return
-            try:
-                deleted_count = delete_questions_for_sap(sap_full_path)
-                questions_output.update(f"[red]{deleted_count} questions deleted for this SAP.[/red]")
-            except Exception as e:
-                questions_output.update(f"[red]Error deleting questions: {str(e)}[/red]")
-            self.update_sap_dropdown()
+            questions_output.update("[yellow]Deleting questions...[/yellow]")
+            self.delete_questions(sap_full_path)
+
+    @work(thread=True, exclusive=True, group="get_questions")
+    def get_questions(self, sap_full_path, number_of_cases):
+        questions_output = self.query_one("#questions_output", Static)
+
+        def on_batch(result, inserted):
+            self.app.call_from_thread(
+                questions_output.update,
+                f"[yellow]Working... {result.questions} questions extracted, {result.imported} new imported so far.[/yellow]\n{result.summary()}"
+            )
+            if inserted:
+                # Let an open categorizer pick the new questions up without waiting for the whole run
+                self.app.call_from_thread(self.announce_new_questions)
+        try:
+            result = run_pipeline(sap_full_path, number_of_cases, on_batch=on_batch)
+            if result.questions:
+                message = f"[green]{result.questions} questions extracted, {result.imported} new imported into the database.[/green]\n{result.summary()}"
+            else:
+                message = "[red]No questions found or error occurred.[/red]"
+            self.app.call_from_thread(questions_output.update, message)
+        except Exception as e:
+            self.app.call_from_thread(questions_output.update, f"[red]Error: {str(e)}[/red]")
+        self.app.call_from_thread(self.update_sap_dropdown)
+
+    def announce_new_questions(self):
+        from question_categorizer_screen import QuestionCategorizerScreen
+        for screen in self.app.screen_stack:
+            if isinstance(screen, QuestionCategorizerScreen):
+                screen.questions_available()
+
+    @work(thread=True, exclusive=True, group="delete_questions")
+    def delete_questions(self, sap_full_path):
+        from db_utils import delete_questions_for_sap
+        questions_output = self.query_one("#questions_output", Static)
+
+        def progress(deleted, total):
+            self.app.call_from_thread(questions_output.update, f"[yellow]Deleting questions... {deleted} / {total}[/yellow]")
+        try:
+            deleted_count = delete_questions_for_sap(sap_full_path, progress=progress)
+            self.app.call_from_thread(questions_output.update, f"[red]{deleted_count} questions deleted for this SAP.[/red]")
+        except Exception as e:
+            self.app.call_from_thread(questions_output.update, f"[red]Error deleting questions: {str(e)}[/red]")
+        self.app.call_from_thread(self.update_sap_dropdown)
 
     async def on_key(self, event: events.Key):
         if event.key == "ctrl+c":
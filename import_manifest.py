@@ -0,0 +1,228 @@
+import csv
+import datetime
+import hashlib
+import io
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import db_cache
+import metrics
+import csv_chunks
+from db_utils import get_connection, get_sap_id
+
+HASH_CHUNK_BYTES = 1 << 20
+# Files at least this large are parsed chunk-parallel and imported in a stream instead of read whole
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# File states reported by file_status()
+NEW = "new"
+MODIFIED = "modified"
+UNCHANGED = "unchanged"
+
+def init_manifest_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS import_manifest (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT,
+            SAPFullPath TEXT,
+            rows_imported INTEGER,
+            imported_at TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _key(path):
+    return str(Path(path).resolve())
+
+@metrics.timed("manifest.get_manifest")
+@db_cache.cached("import_manifest")
+def get_manifest():
+    """
+    Returns {resolved path: (size, mtime, content_hash, SAPFullPath, rows_imported, imported_at)}.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT path, size, mtime, content_hash, SAPFullPath, rows_imported, imported_at FROM import_manifest")
+    manifest = {row[0]: row[1:] for row in c.fetchall()}
+    conn.close()
+    return manifest
+
+def file_status(path, manifest=None):
+    """
+    NEW, MODIFIED or UNCHANGED compared with the last import. Size and mtime decide instantly;
+    the file is only hashed when its mtime moved but the size did not (e.g. a touched or re-saved file).
+    """
+    entry = (manifest if manifest is not None else get_manifest()).get(_key(path))
+    if entry is None:
+        return NEW
+    size, mtime, content_hash = entry[0], entry[1], entry[2]
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return MODIFIED
+    if stat.st_mtime == mtime:
+        return UNCHANGED
+    return UNCHANGED if file_hash(path) == content_hash else MODIFIED
+
+def csv_files_with_status(directory="."):
+    """
+    Returns [(path, status)] for the CSV files in `directory`, sorted by name.
+    """
+    manifest = get_manifest()
+    return [(path, file_status(path, manifest)) for path in sorted(Path(directory).glob("*.csv"))]
+
+def pending_csv_files(directory="."):
+    """
+    CSV files that are new or changed since they were last imported.
+    """
+    return [path for path, status in csv_files_with_status(directory) if status != UNCHANGED]
+
+def is_imported(path, sap_full_path):
+    """
+    True if this exact file content was already imported for this SAP.
+    """
+    entry = get_manifest().get(_key(path))
+    return entry is not None and entry[3] == sap_full_path and file_status(path) == UNCHANGED
+
+def _record(c, path, sap_full_path, rows, content_hash, stat):
+    c.execute(
+        "INSERT OR REPLACE INTO import_manifest (path, size, mtime, content_hash, SAPFullPath, rows_imported, imported_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (_key(path), stat.st_size, stat.st_mtime, content_hash, sap_full_path, rows, datetime.datetime.now().isoformat())
+    )
+
+@db_cache.invalidates("import_manifest")
+def record_import(path, sap_full_path, rows):
+    conn = get_connection()
+    c = conn.cursor()
+    _record(c, path, sap_full_path, rows, file_hash(path), os.stat(path))
+    conn.commit()
+    conn.close()
+
+def parse_csv(path):
+    """
+    Reads the question column of a CSV file. Runs in a worker process; returns
+    (path, questions, content hash, os.stat_result) with the hash and stat taken of the bytes parsed.
+    """
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    reader = csv.reader(io.StringIO(raw.decode("utf-8-sig"), newline=""))
+    questions = [q for q in (csv_chunks.normalize_question(row[0]) for row in reader if row) if q]
+    return path, questions, hashlib.sha256(raw).hexdigest(), stat
+
+def write_questions(c, questions, sap_full_path):
+    """
+    Set-based version of the per-row CSV import: questions already in the database (exact text)
+    move to `sap_full_path`, the rest are inserted once. Returns (inserted, updated).
+    """
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS import_rows (question TEXT PRIMARY KEY, guid TEXT)")
+    c.execute("DELETE FROM temp.import_rows")
+    c.executemany(
+        "INSERT OR IGNORE INTO temp.import_rows (question, guid) VALUES (?, ?)",
+        ((q, str(uuid.uuid4())) for q in questions)
+    )
+    sap_id = get_sap_id(c, sap_full_path)
+    c.execute(
+        "UPDATE question_rows SET sap_id = ? WHERE question IN (SELECT question FROM temp.import_rows)",
+        (sap_id,)
+    )
+    updated = c.rowcount
+    c.execute("""
+        INSERT INTO question_rows (guid, question, sap_id)
+        SELECT guid, question, ? FROM temp.import_rows
+        WHERE question NOT IN (SELECT question FROM question_rows WHERE question IS NOT NULL)
+    """, (sap_id,))
+    inserted = c.rowcount
+    c.execute("DELETE FROM temp.import_rows")
+    return inserted, updated
+
+class ImportResult:
+    def __init__(self):
+        # path -> (rows, inserted, updated); skipped files are listed separately
+        self.files = {}
+        self.skipped = []
+        self.errors = {}
+
+@metrics.timed("manifest.import_csv_files")
+@db_cache.invalidates("questions", "import_manifest")
+def import_csv_files(paths, sap_full_path, workers=None, force=False, progress=None):
+    """
+    Imports several CSV files for one SAP. Files already imported unchanged for that SAP are
+    skipped unless `force`. The rest are parsed concurrently on a process pool while this thread,
+    the only writer, commits each parsed file (questions and manifest entry) in its own transaction.
+    `progress(path, result)` is called after each file. Returns an ImportResult.
+    """
+    init_manifest_db()
+    result = ImportResult()
+    todo = []
+    for path in paths:
+        if not force and is_imported(path, sap_full_path):
+            result.skipped.append(str(path))
+        else:
+            todo.append(str(path))
+    large = [path for path in todo if os.path.getsize(path) >= STREAM_THRESHOLD_BYTES]
+    small = [path for path in todo if path not in large]
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        if small:
+            with ProcessPoolExecutor(max_workers=min(len(small), workers or os.cpu_count() or 1)) as pool:
+                futures = [pool.submit(parse_csv, path) for path in small]
+                for future in as_completed(futures):
+                    try:
+                        path, questions, content_hash, stat = future.result()
+                    except Exception as e:
+                        result.errors[small[futures.index(future)]] = str(e)
+                        continue
+                    inserted, updated = write_questions(c, questions, sap_full_path)
+                    _record(c, path, sap_full_path, len(questions), content_hash, stat)
+                    conn.commit()
+                    result.files[path] = (len(questions), inserted, updated)
+                    metrics.increment("manifest.rows", len(questions))
+                    if progress:
+                        progress(path, result)
+        # Large files already use every core for parsing, so they are streamed one after another
+        for path in large:
+            try:
+                result.files[path] = import_large_csv(conn, c, path, sap_full_path, workers)
+            except Exception as e:
+                conn.rollback()
+                result.errors[path] = str(e)
+                continue
+            if progress:
+                progress(path, result)
+    finally:
+        conn.close()
+    return result
+
+def import_large_csv(conn, c, path, sap_full_path, workers=None):
+    """
+    Streams a large CSV into the database chunk by chunk (one transaction per chunk), hashing it in
+    the same pass; the manifest entry is written last, so an interrupted import is simply redone.
+    Returns (rows, inserted, updated).
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    rows = inserted = updated = 0
+    for batch in csv_chunks.iter_question_batches(path, workers=workers, digest=digest):
+        batch_inserted, batch_updated = write_questions(c, batch, sap_full_path)
+        conn.commit()
+        rows += len(batch)
+        inserted += batch_inserted
+        updated += batch_updated
+        metrics.increment("manifest.rows", len(batch))
+    _record(c, path, sap_full_path, rows, digest.hexdigest(), stat)
+    conn.commit()
+    return rows, inserted, updated
@@ -0,0 +1,492 @@
+import argparse
+import datetime
+import json
+import random
+import threading
+import time
+import db_cache
+import db_utils
+import metrics
+from db_utils import get_connection
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+RETRY = "retry"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING, RETRY)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 1800
+# A running job whose heartbeat is older than this was left behind by a dead process
+STALE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+POLL_SECONDS = 2.0
+
+# Work per checkpoint for each job kind
+IMPORT_ROWS_PER_CHUNK = 1000
+
+class JobInterrupted(Exception):
+    """
+    Raised inside a running job when it was cancelled or the worker is shutting down.
+    """
+
+def init_jobs_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT,
+            params TEXT,
+            status TEXT,
+            checkpoint TEXT,
+            done INTEGER DEFAULT 0,
+            total INTEGER,
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER,
+            next_run_at REAL,
+            error TEXT,
+            owner TEXT,
+            created TEXT,
+            started_at REAL,
+            done_at_start INTEGER DEFAULT 0,
+            heartbeat REAL,
+            finished_at REAL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, next_run_at)")
+    conn.commit()
+    conn.close()
+
+@metrics.timed("jobs.enqueue")
+@db_cache.invalidates("jobs")
+def enqueue(kind, params, total=None, max_attempts=MAX_ATTEMPTS):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO jobs (kind, params, status, checkpoint, total, max_attempts, next_run_at, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (kind, json.dumps(params), QUEUED, "{}", total, max_attempts, time.time(), datetime.datetime.now().isoformat())
+    )
+    job_id = c.lastrowid
+    conn.commit()
+    conn.close()
+    return job_id
+
+class Job:
+    __slots__ = ("id", "kind", "params", "status", "checkpoint", "done", "total", "attempts", "max_attempts",
+                 "next_run_at", "error", "started_at", "done_at_start", "heartbeat")
+
+    COLUMNS = "id, kind, params, status, checkpoint, done, total, attempts, max_attempts, next_run_at, error, started_at, done_at_start, heartbeat"
+
+    def __init__(self, row):
+        (self.id, self.kind, params, self.status, checkpoint, self.done, self.total, self.attempts, self.max_attempts,
+         self.next_run_at, self.error, self.started_at, self.done_at_start, self.heartbeat) = row
+        self.params = json.loads(params or "{}")
+        self.checkpoint = json.loads(checkpoint or "{}")
+
+    def describe(self):
+        p = self.params
+        if self.kind == "fetch":
+            return f"{p.get('cases')} cases for {p.get('sap')}"
+        if self.kind == "import":
+            return f"{p.get('csv_file')} -> {p.get('sap')}"
+        if self.kind == "export":
+            return f"to {p.get('output_dir', '.')}"
+        if self.kind == "answer":
+            return ", ".join(p.get("categories") or db_utils.EXPORT_CATEGORIES)
+        return ""
+
+    def throughput(self):
+        """
+        Units per second since the current (or last) run started.
+        """
+        end = time.time() if self.status == RUNNING else self.heartbeat
+        if not self.started_at or not end or end <= self.started_at:
+            return 0.0
+        return (self.done - (self.done_at_start or 0)) / (end - self.started_at)
+
+    def eta_seconds(self):
+        rate = self.throughput()
+        if self.status != RUNNING or not self.total or rate <= 0:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+@metrics.timed("jobs.list_jobs")
+@db_cache.cached("jobs", ttl=1)
+def list_jobs(limit=200):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT {Job.COLUMNS} FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+    rows = c.fetchall()
+    conn.close()
+    return [Job(row) for row in rows]
+
+def get_job(job_id):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT {Job.COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+    row = c.fetchone()
+    conn.close()
+    return Job(row) if row else None
+
+@db_cache.invalidates("jobs")
+def cancel_job(job_id):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?, ?)",
+        (CANCELLED, time.time(), job_id) + ACTIVE_STATES
+    )
+    cancelled = c.rowcount > 0
+    conn.commit()
+    conn.close()
+    return cancelled
+
+@db_cache.invalidates("jobs")
+def retry_job(job_id):
+    """
+    Puts a failed or cancelled job back in the queue; it resumes from its last checkpoint.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "UPDATE jobs SET status = ?, attempts = 0, error = NULL, next_run_at = ?, finished_at = NULL WHERE id = ? AND status IN (?, ?)",
+        (QUEUED, time.time(), job_id, FAILED, CANCELLED)
+    )
+    retried = c.rowcount > 0
+    conn.commit()
+    conn.close()
+    return retried
+
+@metrics.timed("jobs.recover_stale_jobs")
+@db_cache.invalidates("jobs")
+def recover_stale_jobs():
+    """
+    Requeues running jobs whose worker stopped sending heartbeats (the app was closed, crashed or
+    lost its terminal). They resume from their last checkpoint. Returns the number requeued.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "UPDATE jobs SET status = ?, owner = NULL, next_run_at = ? WHERE status = ? AND heartbeat < ?",
+        (QUEUED, time.time(), RUNNING, time.time() - STALE_SECONDS)
+    )
+    recovered = c.rowcount
+    conn.commit()
+    conn.close()
+    return recovered
+
+def touch_job(job_id, owner):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ? AND status = ?", (time.time(), job_id, owner, RUNNING))
+    conn.commit()
+    conn.close()
+
+@metrics.timed("jobs.claim_next_job")
+@db_cache.invalidates("jobs")
+def claim_next_job(owner):
+    """
+    Atomically marks the oldest due queued/retry job as running for `owner` and returns it.
+    """
+    now = time.time()
+    conn = get_connection()
+    conn.isolation_level = None
+    c = conn.cursor()
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        c.execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?) AND next_run_at <= ? ORDER BY next_run_at, id LIMIT 1",
+            (QUEUED, RETRY, now)
+        )
+        row = c.fetchone()
+        job = None
+        if row:
+            c.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started_at = ?, heartbeat = ?, done_at_start = done WHERE id = ?",
+                (RUNNING, owner, now, now, row[0])
+            )
+            c.execute(f"SELECT {Job.COLUMNS} FROM jobs WHERE id = ?", (row[0],))
+            job = Job(c.fetchone())
+        c.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return job
+
+@db_cache.invalidates("jobs")
+def save_checkpoint(job_id, checkpoint, done, total=None):
+    """
+    Persists a job's progress. Returns the job's status so the runner notices cancellation.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(
+        "UPDATE jobs SET checkpoint = ?, done = ?, total = COALESCE(?, total), heartbeat = ? WHERE id = ?",
+        (json.dumps(checkpoint), done, total, time.time(), job_id)
+    )
+    c.execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
+    status = c.fetchone()[0]
+    conn.commit()
+    conn.close()
+    return status
+
+@db_cache.invalidates("jobs")
+def _finish(job_id, status, error=None, next_run_at=None, attempts_increment=0):
+    conn = get_connection()
+    c = conn.cursor()
+    finished = time.time() if status in (DONE, FAILED) else None
+    c.execute(
+        "UPDATE jobs SET status = ?, error = ?, next_run_at = COALESCE(?, next_run_at), attempts = attempts + ?, "
+        "finished_at = ?, owner = NULL, heartbeat = ? WHERE id = ? AND status = ?",
+        (status, error, next_run_at, attempts_increment, finished, time.time(), job_id, RUNNING)
+    )
+    conn.commit()
+    conn.close()
+
+def backoff_seconds(attempts):
+    """
+    Exponential backoff with jitter: 30s, 60s, 120s, ... capped at RETRY_MAX_SECONDS.
+    """
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+class JobContext:
+    """
+    Passed to job handlers: the job's checkpoint and a progress() call that persists it.
+    """
+    def __init__(self, job, stop_event):
+        self.job = job
+        self.checkpoint = dict(job.checkpoint)
+        self.stop_event = stop_event
+
+    def progress(self, done, total=None, **checkpoint):
+        self.checkpoint.update(checkpoint)
+        status = save_checkpoint(self.job.id, self.checkpoint, done, total)
+        metrics.increment(f"jobs.{self.job.kind}.checkpoints")
+        if status != RUNNING:
+            raise JobInterrupted("cancelled")
+        if self.stop_event.is_set():
+            raise JobInterrupted("shutting down")
+
+    def check(self):
+        """
+        Raises JobInterrupted if the job was cancelled or the worker is stopping, for handlers
+        that have no progress to save while they wait.
+        """
+        if self.stop_event.is_set():
+            raise JobInterrupted("shutting down")
+        job = get_job(self.job.id)
+        if job is None or job.status != RUNNING:
+            raise JobInterrupted("cancelled")
+
+def run_fetch(job, ctx):
+    """
+    Fetches `cases` cases for a SAP. The experiment API has no offset to resume from, so this is
+    one call and one checkpoint; an interrupted fetch is redone (questions already imported are
+    not inserted twice). Cancellation and shutdown are checked while the call is in flight.
+    """
+    from question_pipeline import run_pipeline
+    cases = int(job.params["cases"])
+    result = run_pipeline(job.params["sap"], cases, background=True, check=ctx.check)
+    ctx.progress(cases, cases, imported=result.imported)
+
+def run_import(job, ctx):
+    """
+    Imports a CSV file, committing and checkpointing every IMPORT_ROWS_PER_CHUNK rows.
+    """
+    import import_manifest
+    csv_file = job.params["csv_file"]
+    if not ctx.checkpoint and import_manifest.is_imported(csv_file, job.params["sap"]):
+        ctx.progress(0, 0, skipped=True)
+        return
+    total = job.total
+    if total is None:
+        with open(csv_file, "rb") as f:
+            total = sum(1 for _ in f)
+    db_utils.import_questions_to_db_with_sap(
+        csv_file, job.params["sap"], start_row=ctx.checkpoint.get("rows_done", 0), chunk_size=IMPORT_ROWS_PER_CHUNK,
+        progress=lambda rows_done: ctx.progress(rows_done, total, rows_done=rows_done)
+    )
+    import_manifest.record_import(csv_file, job.params["sap"], total)
+
+def run_export(job, ctx):
+    files = db_utils.export_questions_to_json(job.params.get("output_dir", "."))
+    ctx.progress(1, 1, files=files)
+
+def run_reprocess(job, ctx):
+    import response_archive
+    response_archive.init_archive_db()
+    total = response_archive.archive_stats()[0]
+    base = ctx.checkpoint.get("responses", 0)
+    response_archive.reprocess(
+        start_after=ctx.checkpoint.get("last_id", 0),
+        progress=lambda r: ctx.progress(base + r.responses, total, last_id=r.last_id, responses=base + r.responses)
+    )
+
+def run_answer(job, ctx):
+    """
+    Answers unanswered categorized questions through ZebraAI; every committed batch is a
+    checkpoint. A resumed run simply picks up the questions that are still unanswered.
+    """
+    import auth_mi
+    categories = job.params.get("categories")
+    base = ctx.checkpoint.get("saved", 0)
+    db_utils.init_answers_db()
+    total = base + db_utils.count_unanswered_questions(categories)
+    result = auth_mi.answer_questions(
+        categories=categories, stop=ctx.stop_event,
+        progress=lambda r: ctx.progress(base + r.saved, total, saved=base + r.saved)
+    )
+    ctx.progress(base + result.saved, total, saved=base + result.saved, failed=result.failed)
+
+HANDLERS = {
+    "fetch": run_fetch,
+    "import": run_import,
+    "export": run_export,
+    "reprocess": run_reprocess,
+    "answer": run_answer,
+}
+
+class JobWorker:
+    """
+    Background thread that runs queued jobs one at a time. Jobs left running by a previous run
+    are requeued on start and resume from their last checkpoint; failures retry with backoff.
+    """
+    def __init__(self, owner, poll_seconds=POLL_SECONDS):
+        self.owner = owner
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+        self.current = None
+
+    def start(self):
+        init_jobs_db()
+        self.thread = threading.Thread(target=self.run, name="job-worker", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def wake(self):
+        """
+        Checks the queue now instead of at the next poll (call after enqueue).
+        """
+        self.wake_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                recover_stale_jobs()
+                job = claim_next_job(self.owner)
+            except Exception:
+                job = None
+            if job is None:
+                self.wake_event.wait(self.poll_seconds)
+                self.wake_event.clear()
+                continue
+            self.run_job(job)
+
+    def heartbeat(self, job_id, finished):
+        while not finished.wait(HEARTBEAT_SECONDS):
+            try:
+                touch_job(job_id, self.owner)
+            except Exception:
+                pass
+
+    def run_job(self, job):
+        self.current = job
+        finished = threading.Event()
+        threading.Thread(target=self.heartbeat, args=(job.id, finished), name="job-heartbeat", daemon=True).start()
+        try:
+            with metrics.timer(f"jobs.{job.kind}"):
+                HANDLERS[job.kind](job, JobContext(job, self.stop_event))
+            _finish(job.id, DONE)
+        except JobInterrupted:
+            # Cancelled jobs keep their status; on shutdown the job is requeued to resume later
+            if self.stop_event.is_set():
+                _finish(job.id, QUEUED)
+        except Exception as e:
+            attempts = job.attempts + 1
+            if attempts >= (job.max_attempts or MAX_ATTEMPTS):
+                _finish(job.id, FAILED, str(e), attempts_increment=1)
+            else:
+                _finish(job.id, RETRY, str(e), time.time() + backoff_seconds(attempts), attempts_increment=1)
+            metrics.increment(f"jobs.{job.kind}.errors")
+        finally:
+            finished.set()
+            self.current = None
+
+def format_duration(seconds):
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue and inspect background jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    fetch = sub.add_parser("fetch")
+    fetch.add_argument("sap")
+    fetch.add_argument("cases", type=int)
+    imp = sub.add_parser("import")
+    imp.add_argument("csv_file")
+    imp.add_argument("sap")
+    export = sub.add_parser("export")
+    export.add_argument("--output-dir", default=".")
+    sub.add_parser("reprocess")
+    answer = sub.add_parser("answer", help="Fill aI_response through ZebraAI")
+    answer.add_argument("--category", action="append", choices=db_utils.CATEGORIES, help="Category to answer (repeatable)")
+    for name in ("cancel", "retry"):
+        sub.add_parser(name).add_argument("job_id", type=int)
+    sub.add_parser("run", help="Run queued jobs in the foreground until interrupted")
+    args = parser.parse_args()
+
+    db_utils.init_db()
+    init_jobs_db()
+    if args.command == "list":
+        for job in list_jobs():
+            print(f"{job.id:>5} {job.kind:<9} {job.status:<9} {job.done}/{job.total or '?'} {job.describe()} {job.error or ''}")
+    elif args.command == "fetch":
+        print(enqueue("fetch", {"sap": args.sap, "cases": args.cases}, total=args.cases))
+    elif args.command == "import":
+        print(enqueue("import", {"csv_file": args.csv_file, "sap": args.sap}))
+    elif args.command == "export":
+        print(enqueue("export", {"output_dir": args.output_dir}))
+    elif args.command == "reprocess":
+        print(enqueue("reprocess", {}))
+    elif args.command == "answer":
+        print(enqueue("answer", {"categories": args.category}))
+    elif args.command == "cancel":
+        print("cancelled" if cancel_job(args.job_id) else "not active")
+    elif args.command == "retry":
+        print("requeued" if retry_job(args.job_id) else "not failed or cancelled")
+    elif args.command == "run":
+        worker = JobWorker(db_utils.lease_owner())
+        worker.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            worker.stop()
+
+if __name__ == "__main__":
+    main()
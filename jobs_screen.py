@@ -0,0 +1,121 @@
+from textual.screen import Screen
+from textual.widgets import Static, Button, Header, Footer, DataTable
+from textual.containers import Container, Horizontal
+from textual import events
+import time
+import async_db
+import jobs
+
+class JobsScreen(Screen):
+    """
+    Lists background jobs with their progress, throughput and ETA; lets the user cancel or
+    retry them and queue an export, archive reprocess or answer generation.
+    """
+    def compose(self):
+        yield Header()
+        yield Container(
+            Static("Background Jobs", classes="title", id="jobs_title"),
+            DataTable(id="jobs_table", cursor_type="row", zebra_stripes=True),
+            Horizontal(
+                Button("Cancel Job", id="cancel_job", variant="error"),
+                Button("Retry Job", id="retry_job", variant="warning"),
+                Button("Queue Export", id="queue_export", variant="primary"),
+                Button("Queue Reprocess", id="queue_reprocess", variant="primary"),
+                Button("Queue Answers", id="queue_answer", variant="primary"),
+                Button("Back to Menu", id="back_to_menu", variant="primary"),
+                id="jobs_buttons"
+            ),
+            Static("", id="jobs_output"),
+            id="jobs_container"
+        )
+        yield Footer()
+
+    def on_mount(self):
+        table = self.query_one("#jobs_table", DataTable)
+        table.add_columns("Id", "Kind", "Details", "Status", "Progress", "Rate/s", "ETA", "Attempts", "Error")
+        self.run_worker(self.refresh_jobs(), exclusive=True, group="jobs_refresh")
+        self.set_interval(1.0, self.refresh_jobs)
+
+    async def refresh_jobs(self):
+        job_list = await async_db.run(jobs.list_jobs)
+        table = self.query_one("#jobs_table", DataTable)
+        cursor = table.cursor_row
+        table.clear()
+        for job in job_list:
+            if job.total:
+                progress = f"{job.done}/{job.total} ({100 * job.done // job.total}%)"
+            else:
+                progress = str(job.done or "")
+            status = job.status
+            if job.status == jobs.RETRY and job.next_run_at:
+                status = f"retry in {jobs.format_duration(max(0, job.next_run_at - time.time()))}"
+            rate = job.throughput()
+            table.add_row(
+                str(job.id), job.kind, job.describe(), status, progress,
+                f"{rate:.1f}" if rate else "", jobs.format_duration(job.eta_seconds()),
+                str(job.attempts), (job.error or "")[:60], key=str(job.id)
+            )
+        if table.row_count:
+            table.move_cursor(row=min(cursor, table.row_count - 1))
+
+    def selected_job_id(self):
+        table = self.query_one("#jobs_table", DataTable)
+        if not table.row_count:
+            return None
+        row_key, _ = table.coordinate_to_cell_key(table.cursor_coordinate)
+        return int(row_key.value)
+
+    async def on_button_pressed(self, event: Button.Pressed):
+        output = self.query_one("#jobs_output", Static)
+        if event.button.id == "back_to_menu":
+            from menu_screen import MenuScreen
+            self.app.push_screen(MenuScreen())
+            return
+        if event.button.id == "cancel_job":
+            job_id = self.selected_job_id()
+            if job_id is not None:
+                output.update(f"Job {job_id} cancelled." if await async_db.run(jobs.cancel_job, job_id) else f"Job {job_id} is not active.")
+        elif event.button.id == "retry_job":
+            job_id = self.selected_job_id()
+            if job_id is not None:
+                output.update(f"Job {job_id} requeued." if await async_db.run(jobs.retry_job, job_id) else f"Job {job_id} has not failed or been cancelled.")
+        elif event.button.id == "queue_export":
+            output.update(f"Export queued as job {await async_db.run(jobs.enqueue, 'export', {'output_dir': '.'})}.")
+        elif event.button.id == "queue_reprocess":
+            output.update(f"Reprocess queued as job {await async_db.run(jobs.enqueue, 'reprocess', {})}.")
+        elif event.button.id == "queue_answer":
+            output.update(f"Answer generation queued as job {await async_db.run(jobs.enqueue, 'answer', {})}.")
+        self.app.wake_job_worker()
+        await self.refresh_jobs()
+
+    async def on_key(self, event: events.Key):
+        if event.key == "ctrl+c":
+            await self.app.action_quit()
+
+    CSS = """
+    #jobs_container {
+        height: 100%;
+        width: 100%;
+    }
+    #jobs_title {
+        text-align: center;
+        margin-bottom: 1;
+    }
+    #jobs_table {
+        height: 1fr;
+    }
+    #jobs_buttons {
+        height: auto;
+        align: center middle;
+        margin-top: 1;
+    }
+    #jobs_output {
+        margin-top: 1;
+        height: auto;
+    }
+    Button {
+        margin: 0 1;
+        min-width: 10;
+        padding: 0 1;
+    }
+    """
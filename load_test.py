@@ -0,0 +1,151 @@
+"""
+Client load-testing harness for auth_mi.
+
+Drives the auth_mi API functions with a stubbed token provider against the local mock server
+(started in-process by default) or any --url, and reports latency percentiles and throughput.
+Responses are not archived, and db_utils is pointed at a throwaway database for the run, so a load
+test never writes to the live questions database.
+
+    python load_test.py --requests 500 --concurrency 16 --latency-ms 50 --throttle-rate 0.02
+    python load_test.py --url http://127.0.0.1:8765/ --endpoint client --cases 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import auth_mi
+import db_utils
+import mock_zebra_server
+from request_scheduler import RequestScheduler
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def make_call(endpoint, cases):
+    token = auth_mi.get_access_token()
+    if endpoint == "version":
+        return lambda: (auth_mi.call_version_api(token), 0)[1]
+    if endpoint == "whoami":
+        return lambda: (auth_mi.call_whoami_api(token), 0)[1]
+    if endpoint == "experiment":
+        return lambda: len(auth_mi.call_experiment_api(token, max_rows=cases, archive=False)["questions"])
+    return lambda: len(auth_mi.run_zebra_ai_client(number_of_cases=cases, archive=False))
+
+def run_load(endpoint, total, concurrency, cases, background_every=0):
+    """
+    Issues `total` calls with `concurrency` threads; every `background_every`-th call goes through
+    the scheduler's background lane. Returns a summary dict.
+    """
+    call = make_call(endpoint, cases)
+
+    def one(i):
+        start = time.perf_counter()
+        status = "ok"
+        questions = 0
+        try:
+            if background_every and i % background_every == 0:
+                with auth_mi.background():
+                    questions = call()
+            else:
+                questions = call()
+        except requests.HTTPError as e:
+            status = str(e.response.status_code) if e.response is not None else "http_error"
+        except Exception as e:
+            status = type(e).__name__
+        return time.perf_counter() - start, status, questions
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(o[0] * 1000 for o in outcomes)
+    ok_latencies = sorted(o[0] * 1000 for o in outcomes if o[1] == "ok")
+    statuses = Counter(o[1] for o in outcomes)
+    questions = sum(o[2] for o in outcomes)
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "ok_rps": round(statuses.get("ok", 0) / wall, 2) if wall else 0.0,
+        "questions": questions,
+        "questions_per_second": round(questions / wall, 2) if wall else 0.0,
+        "statuses": dict(statuses),
+        "latency_ms": {
+            "min": round(latencies[0], 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p90": round(percentile(latencies, 90), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "ok_latency_ms_p50": round(percentile(ok_latencies, 50), 2),
+        "scheduler": auth_mi.scheduler.stats(),
+    }
+
+def print_report(summary):
+    lat = summary["latency_ms"]
+    print(f"Endpoint:     {summary['endpoint']}  ({summary['requests']} requests, concurrency {summary['concurrency']})")
+    print(f"Wall time:    {summary['wall_seconds']}s")
+    print(f"Throughput:   {summary['throughput_rps']} req/s  ({summary['ok_rps']} ok req/s, {summary['questions_per_second']} questions/s)")
+    print(f"Latency ms:   min {lat['min']}  p50 {lat['p50']}  p90 {lat['p90']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print("Statuses:     " + ", ".join(f"{k}={v}" for k, v in sorted(summary["statuses"].items())))
+    sched = summary["scheduler"]
+    print(f"Scheduler:    limit {sched['limit']}  achieved {sched['achieved_rate']} req/s of {sched['rate_limit']}  throttled {sched['throttled']}")
+    for lane, s in sched["lanes"].items():
+        print(f"  {lane:<12}{s['requests']} requests, queue wait mean {s['mean_wait_ms']} ms, max {s['max_wait_ms']} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the ZebraAI client against a mock server")
+    parser.add_argument("--url", help="Use an already running server instead of starting the mock in-process")
+    parser.add_argument("--endpoint", choices=["experiment", "version", "whoami", "client"], default="experiment",
+                        help="'client' runs the full run_zebra_ai_client flow (version + whoami + experiment)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cases", type=int, default=10, help="MaxNumberOfRows sent with experiment calls")
+    parser.add_argument("--json", help="Also write the summary to this JSON file")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Scheduler token-bucket rate (requests/second)")
+    parser.add_argument("--burst", type=int, default=50, help="Scheduler token-bucket burst size")
+    parser.add_argument("--max-concurrency", type=int, default=64, help="Upper bound for the scheduler's adaptive limit")
+    parser.add_argument("--background-every", type=int, default=0, help="Send every Nth call in the background lane")
+    mock_zebra_server.add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.TemporaryDirectory(prefix="load_test_")
+    db_utils.DB_FILE = os.path.join(scratch.name, "questions.db")
+    server = None
+    url = args.url
+    if not url:
+        server, url = mock_zebra_server.start_server(mock_zebra_server.config_from_args(args))
+    auth_mi.API_URL = url if url.endswith("/") else url + "/"
+    auth_mi.token_provider = lambda: "load-test-token"
+    auth_mi.scheduler = RequestScheduler(rate=args.rate, burst=args.burst, initial_limit=args.concurrency, max_limit=args.max_concurrency)
+    try:
+        summary = run_load(args.endpoint, args.requests, args.concurrency, args.cases, args.background_every)
+    finally:
+        if server:
+            server.shutdown()
+        scratch.cleanup()
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from textual.screen import Screen
+from textual.widgets import Static, Header, Footer, LoadingIndicator
+from textual.containers import Container
+from textual import events
+
+class LoadingScreen(Screen):
+    """
+    Lightweight placeholder screen shown while startup data is loaded in the background.
+    It does not touch the database so it can be painted immediately.
+    """
+    def __init__(self, message="Loading questions..."):
+        super().__init__()
+        self.message = message
+
+    def compose(self):
+        yield Header()
+        yield Container(
+            Static("SME Agent", classes="title", id="loading_title"),
+            Static(self.message, id="loading_message"),
+            LoadingIndicator(id="loading_indicator"),
+            id="loading_container"
+        )
+        yield Footer()
+
+    def set_message(self, message):
+        self.message = message
+        self.query_one("#loading_message", Static).update(message)
+
+    async def on_key(self, event: events.Key):
+        if event.key == "ctrl+c":
+            await self.app.action_quit()
+
+    CSS = """
+    #loading_container {
+        align: center middle;
+        height: 100%;
+        width: 100%;
+    }
+    #loading_title {
+        text-align: center;
+        margin-bottom: 2;
+    }
+    #loading_message {
+        text-align: center;
+        margin-bottom: 1;
+    }
+    #loading_indicator {
+        height: 3;
+    }
+    """
@@ -1,37 +1,201 @@
+import argparse
+import time
 from textual.app import App
-from pathlib import Path
-from db_utils import init_db, init_config_db, config_exists, get_config_values, get_uncategorized_questions_from_db
+from textual import events, work
+import async_db
+import metrics
+import query_tracer
+import maintenance
+import backup
+import response_archive
+import jobs
+import import_manifest
+from db_utils import init_db, init_config_db, init_rules_db, init_answers_db, db_needs_vacuum, config_exists, get_config_values, claim_questions, lease_owner, release_leases
 
 from config_screen import ConfigScreen
 from menu_screen import MenuScreen
 from question_categorizer_screen import QuestionCategorizerScreen
 from csv_import_screen import CsvImportScreen
+from loading_screen import LoadingScreen
+from metrics_screen import MetricsScreen
+
+def init_databases():
+    init_db()
+    init_config_db()
+    init_rules_db()
+    init_answers_db()
+    response_archive.init_archive_db()
+    jobs.init_jobs_db()
+    import_manifest.init_manifest_db()
+    backup.init_backup_db()
 
 class MainApp(App):
-    def show_csv_import_screen(self):
-        csv_files = [f for f in Path('.').glob('*.csv')]
-        if csv_files:
-            self.push_screen(CsvImportScreen())
-        else:
-            if not config_exists():
-                config_values = get_config_values()
-                self.push_screen(ConfigScreen(initial_values=config_values))
-            else:
-                uncategorized = get_uncategorized_questions_from_db()
-                self.push_screen(QuestionCategorizerScreen(uncategorized))
-
-    def on_mount(self):
-        csv_files = [f for f in Path('.').glob('*.csv')]
+    BINDINGS = [("f2", "toggle_metrics", "Metrics")]
+
+    async def on_mount(self):
+        # Paint a skeleton screen right away; database setup, the CSV scan, config check and
+        # queue loading happen in a background worker.
+        await self.push_screen(LoadingScreen())
+        self.last_input = time.monotonic()
+        self.maintenance_running = False
+        self.reprocess_running = False
+        self.backup_running = False
+        self.job_worker = None
+        self.load_start_screen()
+
+    def start_background_tasks(self):
+        """
+        Called once the databases are set up, so nothing runs alongside a schema migration.
+        """
+        self.set_interval(60, self.check_idle_maintenance)
+        # Scheduled snapshots; the worker only backs up when the last one is older than BACKUP_INTERVAL_HOURS
+        self.set_interval(300, self.check_scheduled_backup)
+        self.check_scheduled_backup()
+        # Resumes jobs left unfinished by a previous run and works through the queue
+        self.job_worker = jobs.JobWorker(lease_owner())
+        self.job_worker.start()
+
+    def on_unmount(self):
+        if self.job_worker:
+            self.job_worker.stop(timeout=2)
+
+    def wake_job_worker(self):
+        if self.job_worker:
+            self.job_worker.wake()
+
+    async def on_event(self, event):
+        # Recorded before dispatch: screens stop the key events they handle (e.g. categorizer hotkeys)
+        if isinstance(event, (events.Key, events.MouseDown)):
+            self.last_input = time.monotonic()
+        await super().on_event(event)
+
+    def check_idle_maintenance(self):
+        if self.maintenance_running or time.monotonic() - self.last_input < maintenance.IDLE_SECONDS:
+            return
+        self.start_maintenance(manual=False)
+
+    def start_maintenance(self, manual=True):
+        if self.maintenance_running:
+            if manual:
+                self.notify("Database maintenance is already running.")
+            return
+        self.maintenance_running = True
+        if manual:
+            self.notify("Database maintenance started...")
+        self.run_maintenance_worker(manual)
+
+    @work(thread=True, exclusive=True, group="maintenance")
+    def run_maintenance_worker(self, manual):
+        try:
+            if not manual and not maintenance.maintenance_due():
+                return
+            report = maintenance.run_maintenance()
+            self.call_from_thread(self.notify, maintenance.format_report(report), timeout=10)
+        except Exception as e:
+            self.call_from_thread(self.notify, f"Database maintenance failed: {e}", severity="error")
+        finally:
+            self.maintenance_running = False
+
+    def check_scheduled_backup(self):
+        self.start_backup(manual=False)
+
+    def start_backup(self, manual=True):
+        if self.backup_running:
+            if manual:
+                self.notify("A backup is already running.")
+            return
+        self.backup_running = True
+        if manual:
+            self.notify("Database backup started...")
+        self.run_backup_worker(manual)
+
+    @work(thread=True, exclusive=True, group="backup")
+    def run_backup_worker(self, manual):
+        try:
+            if not manual and not backup.backup_due():
+                return
+            report = backup.backup_database()
+            self.call_from_thread(self.notify, backup.format_report(report), timeout=10)
+        except backup.BackupRunning as e:
+            # A scheduled backup simply tries again at the next check
+            if manual:
+                self.call_from_thread(self.notify, str(e), severity="warning")
+        except Exception as e:
+            self.call_from_thread(self.notify, f"Database backup failed: {e}", severity="error")
+        finally:
+            self.backup_running = False
+
+    def start_reprocess(self):
+        if self.reprocess_running:
+            self.notify("Archive reprocessing is already running.")
+            return
+        self.reprocess_running = True
+        self.notify("Reprocessing archived ZebraAI responses...")
+        self.run_reprocess_worker()
+
+    @work(thread=True, exclusive=True, group="reprocess")
+    def run_reprocess_worker(self):
+        try:
+            result = response_archive.reprocess()
+            self.call_from_thread(self.notify, response_archive.format_result(result), timeout=10)
+        except Exception as e:
+            self.call_from_thread(self.notify, f"Archive reprocessing failed: {e}", severity="error")
+        finally:
+            self.reprocess_running = False
+
+    @work(thread=True, exclusive=True, group="startup")
+    def load_start_screen(self):
+        """
+        Sets up the databases, then decides which screen to start on and loads the data it needs,
+        off the UI thread.
+        """
+        if db_needs_vacuum():
+            self.call_from_thread(self.set_loading_message, "Upgrading the database (one-off, this can take a few minutes)...")
+        init_databases()
+        self.call_from_thread(self.start_background_tasks)
+        self.call_from_thread(self.set_loading_message, "Loading questions...")
+        # Only nag about CSV files that are new or changed since they were last imported
+        csv_files = import_manifest.pending_csv_files()
         if csv_files:
-            self.show_csv_import_screen()
+            self.call_from_thread(self.show_start_screen, CsvImportScreen, {})
         elif not config_exists():
             config_values = get_config_values()
-            self.push_screen(ConfigScreen(initial_values=config_values))
+            self.call_from_thread(self.show_start_screen, ConfigScreen, {"initial_values": config_values})
         else:
-            uncategorized = get_uncategorized_questions_from_db()
-            self.push_screen(QuestionCategorizerScreen(uncategorized))
+            uncategorized = claim_questions(lease_owner())
+            self.call_from_thread(self.show_start_screen, QuestionCategorizerScreen, {"questions": uncategorized})
+
+    def set_loading_message(self, message):
+        if isinstance(self.screen, LoadingScreen):
+            self.screen.set_message(message)
+
+    def show_start_screen(self, screen_class, kwargs):
+        # Screens are constructed on the UI thread, then swapped in for the loading screen
+        if isinstance(self.screen, LoadingScreen):
+            self.switch_screen(screen_class(**kwargs))
+        else:
+            self.push_screen(screen_class(**kwargs))
+
+    def action_toggle_metrics(self):
+        if isinstance(self.screen, MetricsScreen):
+            self.screen.dismiss()
+        else:
+            self.push_screen(MetricsScreen())
 
 if __name__ == "__main__":
-    init_db()
-    init_config_db()
-    MainApp().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SME question categorizer")
+    parser.add_argument("--metrics-out", help="Write collected metrics on exit (.json for JSON, otherwise Prometheus text)")
+    parser.add_argument("--trace-sql", action="store_true", help="Record SQL timings and write a ranked slow-query report on exit")
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="Capture EXPLAIN QUERY PLAN for statements slower than this")
+    parser.add_argument("--trace-report", default="slow_queries.log", help="Where the --trace-sql report is written")
+    args = parser.parse_args()
+    if args.trace_sql:
+        query_tracer.enable(slow_ms=args.slow_ms, report_path=args.trace_report)
+    try:
+        MainApp().run()
+    finally:
+        # Let queued saves land first, then hand any questions still leased to this instance back to the other analysts
+        async_db.shutdown()
+        release_leases(lease_owner())
+        if args.metrics_out:
+            metrics.dump(args.metrics_out)
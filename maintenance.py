@@ -0,0 +1,94 @@
+import datetime
+import time
+from db_utils import get_connection
+import metrics
+
+# Run automatically when the app has been idle this long and the last run is older than MAINTENANCE_INTERVAL_HOURS
+IDLE_SECONDS = 300
+MAINTENANCE_INTERVAL_HOURS = 24
+
+def init_maintenance_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ran_at TEXT,
+            bytes_before INTEGER,
+            bytes_after INTEGER,
+            integrity TEXT,
+            seconds REAL
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+def database_size(c):
+    """
+    Returns (file_bytes, free_bytes) for the connection's main database.
+    """
+    page_size = c.execute("PRAGMA page_size").fetchone()[0]
+    page_count = c.execute("PRAGMA page_count").fetchone()[0]
+    freelist = c.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_size * page_count, page_size * freelist
+
+@metrics.timed("maintenance.run_maintenance")
+def run_maintenance(full_integrity_check=False):
+    """
+    Reclaims free pages (incremental vacuum), refreshes planner statistics (ANALYZE, PRAGMA optimize)
+    and checks integrity. Returns a dict describing the run, including bytes reclaimed.
+    """
+    init_maintenance_db()
+    start = time.perf_counter()
+    conn = get_connection()
+    c = conn.cursor()
+    bytes_before, free_before = database_size(c)
+    # executescript steps the pragma to completion; a plain execute() frees only one page
+    conn.executescript("PRAGMA incremental_vacuum;")
+    c.execute("ANALYZE")
+    c.execute("PRAGMA optimize")
+    conn.commit()
+    check = "integrity_check" if full_integrity_check else "quick_check"
+    problems = [row[0] for row in c.execute(f"PRAGMA {check}").fetchall()]
+    integrity = "ok" if problems == ["ok"] else "; ".join(problems[:20])
+    bytes_after, free_after = database_size(c)
+    seconds = time.perf_counter() - start
+    c.execute(
+        "INSERT INTO maintenance_log (ran_at, bytes_before, bytes_after, integrity, seconds) VALUES (?, ?, ?, ?, ?)",
+        (datetime.datetime.now().isoformat(), bytes_before, bytes_after, integrity, seconds)
+    )
+    conn.commit()
+    conn.close()
+    return {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        # ANALYZE can grow the file (new statistics pages) by more than was reclaimed
+        "reclaimed": max(0, bytes_before - bytes_after),
+        "grown": max(0, bytes_after - bytes_before),
+        "free_before": free_before,
+        "free_after": free_after,
+        "integrity": integrity,
+        "seconds": round(seconds, 3),
+    }
+
+def last_maintenance_time():
+    init_maintenance_db()
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT MAX(ran_at) FROM maintenance_log")
+    ran_at = c.fetchone()[0]
+    conn.close()
+    return datetime.datetime.fromisoformat(ran_at) if ran_at else None
+
+def maintenance_due(interval_hours=MAINTENANCE_INTERVAL_HOURS):
+    last = last_maintenance_time()
+    return last is None or datetime.datetime.now() - last >= datetime.timedelta(hours=interval_hours)
+
+def format_report(report):
+    def mb(n):
+        return f"{n / (1024 * 1024):.1f} MB" if n >= 1024 * 1024 else f"{n / 1024:.0f} KB"
+    change = f"grew {mb(report['grown'])}" if report.get("grown") else f"{mb(report['reclaimed'])} reclaimed"
+    return (
+        f"Maintenance done in {report['seconds']}s: {mb(report['bytes_before'])} -> {mb(report['bytes_after'])} "
+        f"({change}), integrity {report['integrity']}"
+    )
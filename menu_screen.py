@@ -2,7 +2,8 @@ from textual.screen import Screen
 from textual.widgets import Static, Button, Header, Footer
 from textual.containers import Container, Horizontal
 from textual import events
-from db_utils import get_config_values, get_uncategorized_questions_from_db
+import async_db
+from db_utils import get_config_values, claim_questions, lease_owner, export_questions_to_json
 
 class MenuScreen(Screen):
     def compose(self):
@@ -13,8 +14,14 @@ class MenuScreen(Screen):
                 Button("Configuration", id="menu_config", variant="primary"),
                 Button("Import Questions From CSV", id="menu_import", variant="primary"),
                 Button("Screen Questions", id="menu_questions", variant="primary"),
+                Button("Browse Questions", id="menu_browse", variant="primary"),
+                Button("Auto-Categorize Rules", id="menu_rules", variant="primary"),
                 Button("Get Questions From ZebraAI", id="menu_get_questions", variant="primary"),
                 Button("Export Questions", id="menu_export", variant="primary"),
+                Button("Database Maintenance", id="menu_maintenance", variant="primary"),
+                Button("Back Up Database", id="menu_backup", variant="primary"),
+                Button("Reprocess Archive", id="menu_reprocess", variant="primary"),
+                Button("Background Jobs", id="menu_jobs", variant="primary"),
                 id="menu_buttons"
             ),
             id="menu_container"
@@ -24,51 +31,38 @@ class MenuScreen(Screen):
     async def on_button_pressed(self, event: Button.Pressed):
         if event.button.id == "menu_config":
             from config_screen import ConfigScreen
-            config_values = get_config_values()
+            config_values = await async_db.run(get_config_values)
             self.app.push_screen(ConfigScreen(initial_values=config_values))
         elif event.button.id == "menu_import":
             from csv_import_screen import CsvImportScreen
             self.app.push_screen(CsvImportScreen())
         elif event.button.id == "menu_questions":
             from question_categorizer_screen import QuestionCategorizerScreen
-            uncategorized = get_uncategorized_questions_from_db()
+            uncategorized = await async_db.run(claim_questions, lease_owner())
             self.app.push_screen(QuestionCategorizerScreen(uncategorized))
+        elif event.button.id == "menu_browse":
+            from question_browser_screen import QuestionBrowserScreen
+            self.app.push_screen(QuestionBrowserScreen())
+        elif event.button.id == "menu_rules":
+            from rules_screen import RulesScreen
+            self.app.push_screen(RulesScreen())
         elif event.button.id == "menu_get_questions":
             from get_questions_screen import GetQuestionsScreen
             self.app.push_screen(GetQuestionsScreen())
         elif event.button.id == "menu_export":
             await self.export_questions_to_json()
+        elif event.button.id == "menu_maintenance":
+            self.app.start_maintenance(manual=True)
+        elif event.button.id == "menu_backup":
+            self.app.start_backup(manual=True)
+        elif event.button.id == "menu_reprocess":
+            self.app.start_reprocess()
+        elif event.button.id == "menu_jobs":
+            from jobs_screen import JobsScreen
+            self.app.push_screen(JobsScreen())
 
     async def export_questions_to_json(self):
-        import sqlite3, json
-        categories = ["Scoping", "Advisory", "Advisory+ARG", "Troubleshooting"]
-        db_file = "questions.db"
-        conn = sqlite3.connect(db_file)
-        c = conn.cursor()
-        for cat in categories:
-            c.execute("SELECT question, SAPFullPath FROM questions WHERE category = ?", (cat,))
-            rows = [row for row in c.fetchall() if row[0]]
-            # Group questions by the second segment of SAPFullPath
-            sap_groups = {}
-            for question, sap_full_path in rows:
-                sap_name = "Unknown"
-                if sap_full_path:
-                    parts = sap_full_path.split('/')
-                    if len(parts) > 1:
-                        sap_name = parts[1].strip()
-                sap_groups.setdefault(sap_name, []).append(question)
-            for sap_name, questions in sap_groups.items():
-                data = {
-                    "name": f"{sap_name} {cat} Question Answer set",
-                    "questionsAndAnswers": [
-                        {"question": q, "answer": ""} for q in questions
-                    ]
-                }
-                safe_sap = sap_name.lower().replace('+','_').replace(' ','_').replace('/','_')
-                filename = f"export_{safe_sap}_{cat.lower().replace('+','_').replace(' ','_')}.json"
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-        conn.close()
+        await async_db.run(export_questions_to_json)
 
     async def on_key(self, event: events.Key):
         if event.key == "ctrl+c":
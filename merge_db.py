@@ -0,0 +1,230 @@
+import argparse
+import csv
+import sqlite3
+import time
+import db_cache
+import db_utils
+import metrics
+from db_utils import get_connection, NORMALIZED_QUESTION
+
+# Columns copied from the other database when its version of a question wins
+DATA_COLUMNS = ["category", "aI_response", "evaluation_text", "extra_column1", "extra_column2", "extra_column3", "SAPFullPath", "timestamp"]
+
+class MergeResult:
+    def __init__(self, source_alias, local_alias):
+        self.source_alias = source_alias
+        self.local_alias = local_alias
+        self.source_rows = 0
+        self.matched_by_guid = 0
+        self.matched_by_question = 0
+        self.inserted = 0
+        # Local uncategorized questions that take the other database's category
+        self.filled = 0
+        # (guid, question, local category, local timestamp, other category, other timestamp, winner)
+        self.conflicts = []
+        self.seconds = 0.0
+
+    @property
+    def source_wins(self):
+        return sum(1 for c in self.conflicts if c[6] == "other")
+
+def _alias(c, schema):
+    try:
+        c.execute(f"SELECT value FROM {schema}.configuration WHERE key = 'alias'")
+    except sqlite3.OperationalError:
+        return None
+    row = c.fetchone()
+    return row[0] if row else None
+
+def _source_columns(c):
+    c.execute("PRAGMA src.table_info(questions)")
+    present = {row[1] for row in c.fetchall()}
+    if "guid" not in present or "question" not in present:
+        raise ValueError("The other database has no questions table with guid and question columns")
+    # Older databases predate SAPFullPath; missing columns merge as NULL
+    return [col if col in present else f"NULL AS {col}" for col in DATA_COLUMNS]
+
+@metrics.timed("merge.merge_database")
+def merge_database(source_path, prefer_alias=None, dry_run=False, progress=None):
+    """
+    Merges another analyst's questions.db into ours with set-based statements over an ATTACHed
+    database. Questions match by guid, then by normalized question text; unmatched ones are inserted.
+    When both sides categorized a question differently the newest timestamp wins, unless
+    `prefer_alias` names the alias of one side, which then always wins. Everything runs in one
+    transaction (rolled back for dry_run). Returns a MergeResult listing every conflict.
+    """
+    def step(message):
+        if progress:
+            progress(message)
+
+    start = time.perf_counter()
+    conn = get_connection()
+    conn.isolation_level = None
+    c = conn.cursor()
+    try:
+        c.execute("ATTACH DATABASE ? AS src", (source_path,))
+        columns = _source_columns(c)
+        result = MergeResult(_alias(c, "src"), _alias(c, "main"))
+        if prefer_alias and prefer_alias == result.source_alias:
+            winner_rule = "1"
+        elif prefer_alias and prefer_alias == result.local_alias:
+            winner_rule = "0"
+        else:
+            winner_rule = "COALESCE(s.timestamp, '') > COALESCE(q.timestamp, '')"
+
+        c.execute("BEGIN IMMEDIATE")
+        step("Staging the other database...")
+        c.execute("DROP TABLE IF EXISTS temp.merge_src")
+        c.execute(f"""
+            CREATE TEMP TABLE merge_src AS
+            SELECT guid, question, {', '.join(columns)}, {NORMALIZED_QUESTION} AS norm
+            FROM src.questions WHERE question IS NOT NULL AND TRIM(question) != ''
+        """)
+        result.source_rows = c.execute("SELECT COUNT(*) FROM temp.merge_src").fetchone()[0]
+
+        step("Matching questions...")
+        c.execute("DROP TABLE IF EXISTS temp.merge_pairs")
+        c.execute("CREATE TEMP TABLE merge_pairs (src_row INTEGER PRIMARY KEY, local_id INTEGER)")
+        c.execute("""
+            INSERT INTO temp.merge_pairs (src_row, local_id)
+            SELECT s.rowid, q.id FROM temp.merge_src s JOIN main.question_rows q ON q.guid = s.guid
+        """)
+        result.matched_by_guid = c.rowcount
+        # Same question captured independently by both analysts under different guids
+        # (the join expression must match idx_questions_normalized so each lookup is an index probe)
+        c.execute("""
+            INSERT INTO temp.merge_pairs (src_row, local_id)
+            SELECT s.rowid, MIN(q.id) FROM temp.merge_src s
+            JOIN main.question_rows q ON LOWER(TRIM(q.question)) = s.norm
+            WHERE s.rowid NOT IN (SELECT src_row FROM temp.merge_pairs)
+            GROUP BY s.rowid
+        """)
+        result.matched_by_question = c.rowcount
+
+        step("Resolving conflicts...")
+        c.execute("DROP TABLE IF EXISTS temp.merge_updates")
+        c.execute("CREATE TEMP TABLE merge_updates (local_id INTEGER PRIMARY KEY, src_row INTEGER)")
+        c.execute(f"""
+            SELECT q.guid, q.question, q.category, q.timestamp, s.category, s.timestamp,
+                   CASE WHEN {winner_rule} THEN 'other' ELSE 'local' END
+            FROM temp.merge_pairs p
+            JOIN temp.merge_src s ON s.rowid = p.src_row
+            JOIN main.questions q ON q.id = p.local_id
+            WHERE COALESCE(q.category, '') != '' AND COALESCE(s.category, '') != '' AND q.category != s.category
+            ORDER BY q.id
+        """)
+        result.conflicts = c.fetchall()
+        # A local question can pair with several source rows; the first one in source order decides
+        c.execute(f"""
+            INSERT OR IGNORE INTO temp.merge_updates (local_id, src_row)
+            SELECT p.local_id, p.src_row
+            FROM temp.merge_pairs p
+            JOIN temp.merge_src s ON s.rowid = p.src_row
+            JOIN main.questions q ON q.id = p.local_id
+            WHERE COALESCE(s.category, '') != ''
+              AND (COALESCE(q.category, '') = '' OR (q.category != s.category AND {winner_rule}))
+            ORDER BY p.src_row
+        """)
+        result.filled = c.execute("""
+            SELECT COUNT(*) FROM temp.merge_updates u JOIN main.questions q ON q.id = u.local_id
+            WHERE COALESCE(q.category, '') = ''
+        """).fetchone()[0]
+
+        step("Applying updates...")
+        assignments = ", ".join(DATA_COLUMNS)
+        # The winning row sets the category; other fields are only overwritten where it has a value,
+        # so e.g. a local aI_response survives a source row without one
+        values = ", ".join(
+            "s.category" if col == "category" else f"COALESCE(NULLIF(s.{col}, ''), main.questions.{col})"
+            for col in DATA_COLUMNS
+        )
+        c.execute(f"""
+            UPDATE main.questions SET ({assignments}, lease_owner, lease_expires) = (
+                SELECT {values}, NULL, NULL
+                FROM temp.merge_updates u JOIN temp.merge_src s ON s.rowid = u.src_row
+                WHERE u.local_id = main.questions.id
+            )
+            WHERE id IN (SELECT local_id FROM temp.merge_updates)
+        """)
+
+        step("Inserting new questions...")
+        # Writes through the questions view (its triggers fill the compact tables), which report no rowcount
+        new_rows = """
+            SELECT MIN(rowid) FROM temp.merge_src
+            WHERE rowid NOT IN (SELECT src_row FROM temp.merge_pairs)
+            GROUP BY norm
+        """
+        result.inserted = c.execute(f"SELECT COUNT(*) FROM ({new_rows})").fetchone()[0]
+        c.execute(f"""
+            INSERT INTO main.questions (guid, question, {assignments})
+            SELECT guid, question, {assignments} FROM temp.merge_src
+            WHERE rowid IN ({new_rows})
+        """)
+
+        c.execute("ROLLBACK" if dry_run else "COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        c.execute("DROP TABLE IF EXISTS temp.merge_src")
+        c.execute("DROP TABLE IF EXISTS temp.merge_pairs")
+        c.execute("DROP TABLE IF EXISTS temp.merge_updates")
+        try:
+            c.execute("DETACH DATABASE src")
+        except sqlite3.OperationalError:
+            pass
+        conn.close()
+        if not dry_run:
+            db_cache.invalidate("questions")
+    result.seconds = round(time.perf_counter() - start, 3)
+    metrics.increment("merge.inserted", result.inserted)
+    metrics.increment("merge.conflicts", len(result.conflicts))
+    return result
+
+def write_conflict_report(result, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "guid", "question",
+            f"local_category ({result.local_alias or 'local'})", "local_timestamp",
+            f"other_category ({result.source_alias or 'other'})", "other_timestamp",
+            "winner",
+        ])
+        writer.writerows(result.conflicts)
+
+def format_summary(result, dry_run=False):
+    prefix = "Dry run: " if dry_run else ""
+    return (
+        f"{prefix}merged {result.source_rows} questions from {result.source_alias or 'the other database'} in {result.seconds}s: "
+        f"{result.matched_by_guid} matched by guid, {result.matched_by_question} by question text, "
+        f"{result.inserted} new, {result.filled} newly categorized, "
+        f"{len(result.conflicts)} conflicts ({result.source_wins} taken from the other database)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge another analyst's questions database into this one.")
+    parser.add_argument("source", nargs="+", help="questions.db file(s) to merge in, applied in order")
+    parser.add_argument("--db", default=db_utils.DB_FILE, help="Database to merge into")
+    parser.add_argument("--prefer-alias", help="Alias whose categories win conflicts (default: newest timestamp wins)")
+    parser.add_argument("--report", default="merge_conflicts.csv", help="CSV file listing the conflicts found")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    db_utils.DB_FILE = args.db
+    db_utils.init_db()
+    db_utils.init_config_db()
+    combined = None
+    for source in args.source:
+        result = merge_database(source, prefer_alias=args.prefer_alias, dry_run=args.dry_run, progress=lambda m: print(f"  {m}"))
+        print(format_summary(result, args.dry_run))
+        if combined is None:
+            combined = result
+        else:
+            combined.conflicts.extend(result.conflicts)
+    if combined and combined.conflicts:
+        write_conflict_report(combined, args.report)
+        print(f"{len(combined.conflicts)} conflicts written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, math.inf)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Cheap to update; percentiles are estimated from the buckets.
+    """
+    __slots__ = ("name", "count", "total_ms", "min_ms", "max_ms", "buckets")
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def observe(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        if ms < self.min_ms:
+            self.min_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0.0
+        target = pct / 100.0 * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(BUCKETS_MS, self.buckets):
+            if n and seen + n >= target:
+                upper = min(bound, self.max_ms)
+                # Linear interpolation inside the bucket
+                return lower + (upper - lower) * ((target - seen) / n)
+            seen += n
+            lower = bound
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min_ms, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "buckets": {("+Inf" if math.isinf(b) else str(b)): n for b, n in zip(BUCKETS_MS, self.buckets)},
+        }
+
+def observe(name, ms):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram(name)
+        hist.observe(ms)
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+@contextmanager
+def timer(name):
+    """
+    Context manager that records the elapsed monotonic time of its block under `name`.
+    Failures are timed too and counted under `<name>.errors`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        increment(f"{name}.errors")
+        raise
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000.0)
+
+def timed(name=None):
+    """
+    Decorator form of timer(). Defaults to `<module>.<function>` as the metric name.
+    """
+    def decorator(func):
+        metric = name or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(metric):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def snapshot():
+    with _lock:
+        return {
+            "histograms": {name: h.snapshot() for name, h in sorted(_histograms.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def _prom_name(name):
+    return "sme_" + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+def to_prometheus():
+    """
+    Renders all metrics in the Prometheus text exposition format (durations in seconds).
+    """
+    lines = []
+    with _lock:
+        histograms = list(_histograms.items())
+        counters = list(_counters.items())
+    for name, h in sorted(histograms):
+        metric = _prom_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS, h.buckets):
+            cumulative += n
+            le = "+Inf" if math.isinf(bound) else repr(bound / 1000.0)
+            lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{metric}_sum {h.total_ms / 1000.0:.6f}")
+        lines.append(f"{metric}_count {h.count}")
+    for name, value in sorted(counters):
+        metric = _prom_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+def dump(path):
+    """
+    Writes metrics to `path`: JSON for *.json, Prometheus text for anything else.
+    """
+    text = to_json() if str(path).endswith(".json") else to_prometheus()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
@@ -0,0 +1,66 @@
+from textual.screen import ModalScreen
+from textual.widgets import Static, DataTable
+from textual.containers import Container
+from textual import events
+import metrics
+
+class MetricsScreen(ModalScreen):
+    """
+    Overlay with live timings and counters from the metrics module. Toggled with F2.
+    """
+    REFRESH_SECONDS = 1.0
+
+    def compose(self):
+        yield Container(
+            Static("Metrics (F2 / Esc to close)", classes="title", id="metrics_title"),
+            DataTable(id="metrics_table", zebra_stripes=True, cursor_type="none"),
+            Static("", id="metrics_counters"),
+            id="metrics_container"
+        )
+
+    def on_mount(self):
+        table = self.query_one("#metrics_table", DataTable)
+        table.add_columns("Operation", "Count", "Mean ms", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Total s")
+        self.refresh_metrics()
+        self.set_interval(self.REFRESH_SECONDS, self.refresh_metrics)
+
+    def refresh_metrics(self):
+        snap = metrics.snapshot()
+        table = self.query_one("#metrics_table", DataTable)
+        table.clear()
+        for name, h in snap["histograms"].items():
+            table.add_row(
+                name, str(h["count"]), f"{h['mean_ms']:.2f}", f"{h['p50_ms']:.2f}", f"{h['p95_ms']:.2f}",
+                f"{h['p99_ms']:.2f}", f"{h['max_ms']:.2f}", f"{h['total_ms'] / 1000:.3f}"
+            )
+        counters = "  ".join(f"{k}={v}" for k, v in snap["counters"].items())
+        self.query_one("#metrics_counters", Static).update(counters or "[dim]No counters yet[/dim]")
+
+    async def on_key(self, event: events.Key):
+        if event.key in ("escape", "f2"):
+            event.stop()
+            self.dismiss()
+
+    CSS = """
+    MetricsScreen {
+        align: center middle;
+    }
+    #metrics_container {
+        width: 90%;
+        height: 80%;
+        border: round $accent;
+        background: $surface;
+        padding: 1 2;
+    }
+    #metrics_title {
+        text-align: center;
+        margin-bottom: 1;
+    }
+    #metrics_table {
+        height: 1fr;
+    }
+    #metrics_counters {
+        margin-top: 1;
+        height: auto;
+    }
+    """
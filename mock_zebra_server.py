@@ -0,0 +1,193 @@
+"""
+Local stand-in for the ZebraAI API.
+
+Implements GET /version, GET /test/whoami, POST /experiment/{id} and POST /chat (question
+answering, see auth_mi.request_answer) with configurable latency, payload size, error and 429
+injection. Experiment responses are synthetic unless a directory of recorded real responses
+(*.json) is given, in which case they are served round-robin.
+
+    python mock_zebra_server.py --port 8765 --latency-ms 200 --throttle-rate 0.05
+    ZEBRA_AI_API_URL=http://127.0.0.1:8765/ python3 ./main_app.py
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from synthetic_data import generate_api_response
+
+class MockConfig:
+    def __init__(self, latency_ms=0, jitter_ms=0, messages=None, questions_per_message=15,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1, recordings=None, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # None means one message per requested case (MaxNumberOfRows)
+        self.messages = messages
+        self.questions_per_message = questions_per_message
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recordings = []
+        if recordings:
+            for path in sorted(Path(recordings).glob("*.json")):
+                self.recordings.append(path.read_bytes())
+        self._recording_cycle = itertools.cycle(self.recordings) if self.recordings else None
+        self._request_counter = itertools.count()
+
+    def random(self):
+        with self.lock:
+            return self.rnd.random()
+
+    def next_recording(self):
+        with self.lock:
+            return next(self._recording_cycle)
+
+    def next_request_number(self):
+        return next(self._request_counter)
+
+EXPERIMENT_PATH = re.compile(r"^/experiment/([^/?]+)$")
+
+class MockZebraHandler(BaseHTTPRequestHandler):
+    server_version = "MockZebraAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, extra_headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self):
+        """
+        Applies latency and fault injection. Returns True when a fault response was already sent.
+        """
+        cfg = self.config
+        delay = cfg.latency_ms
+        if cfg.jitter_ms:
+            delay += cfg.random() * cfg.jitter_ms
+        if delay:
+            time.sleep(delay / 1000.0)
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self.send_json(401, {"error": "missing bearer token"})
+            return True
+        roll = cfg.random()
+        if roll < cfg.throttle_rate:
+            self.send_json(429, {"error": "too many requests"}, {"Retry-After": str(cfg.retry_after)})
+            return True
+        if roll < cfg.throttle_rate + cfg.error_rate:
+            self.send_json(500, {"error": "injected failure"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path not in ("/version", "/test/whoami"):
+            self.send_json(404, {"error": "not found"})
+            return
+        if self.simulate():
+            return
+        if self.path == "/version":
+            self.send_json(200, {"version": "mock-1.0"})
+        else:
+            self.send_json(200, {"user": "mock.user@example.com", "name": "Mock User"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        match = EXPERIMENT_PATH.match(self.path)
+        if not match and self.path != "/chat":
+            self.send_json(404, {"error": "not found"})
+            return
+        if self.simulate():
+            return
+        try:
+            run_model = json.loads(raw or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "invalid JSON body"})
+            return
+        if not match:
+            question = (run_model.get("messages") or [{}])[-1].get("content", "")
+            self.send_json(200, {"chatHistory": {"messages": [
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": f"Mock answer: {question}"},
+            ]}})
+            return
+        cfg = self.config
+        if cfg.recordings:
+            self.send_json(200, cfg.next_recording())
+            return
+        messages = cfg.messages or max(1, int(run_model.get("MaxNumberOfRows", 10)))
+        data = generate_api_response(messages=messages, questions_per_message=cfg.questions_per_message,
+                                     seed=cfg.next_request_number())
+        data["experimentId"] = match.group(1)
+        self.send_json(200, data)
+
+def start_server(config=None, host="127.0.0.1", port=0, verbose=False):
+    """
+    Starts the mock server on a daemon thread. Returns (server, base_url); call server.shutdown() to stop.
+    Port 0 picks a free port.
+    """
+    server = ThreadingHTTPServer((host, port), MockZebraHandler)
+    server.daemon_threads = True
+    server.config = config or MockConfig()
+    server.verbose = verbose
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=0, help="Fixed latency added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform random extra latency")
+    parser.add_argument("--messages", type=int, help="Messages per experiment response (default: MaxNumberOfRows)")
+    parser.add_argument("--questions-per-message", type=int, default=15)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--recordings", help="Directory of recorded experiment responses (*.json) to replay")
+    parser.add_argument("--seed", type=int)
+
+def config_from_args(args):
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        messages=args.messages,
+        questions_per_message=args.questions_per_message,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        recordings=args.recordings,
+        seed=args.seed,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock ZebraAI API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server, url = start_server(config_from_args(args), args.host, args.port, args.verbose)
+    print(f"Mock ZebraAI listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
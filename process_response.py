@@ -1,4 +1,5 @@
 import re
+import metrics
 
 def extract_questions_from_content(content):
     """
@@ -42,6 +43,20 @@ def extract_questions_from_summary_table(content):
                 questions.append(q.lstrip("-").strip())
     return questions
 
+def extract_questions_from_message(msg):
+    """
+    Extracts the questions from one chatHistory message (summary table rows and content lines).
+    """
+    content = msg.get("content", "")
+    questions = []
+    # If it looks like a summary table, extract from table
+    if "| **Category**" in content or "|-" in content:
+        questions += extract_questions_from_summary_table(content)
+    # Otherwise, extract from content
+    questions += extract_questions_from_content(content)
+    return [q.strip() for q in questions if q.strip()]
+
+@metrics.timed("extract.extract_all_questions")
 def extract_all_questions(api_response):
     """
     Given the API response (as a dict), extract all questions from the summary table
@@ -50,21 +65,29 @@ def extract_all_questions(api_response):
     """
     questions = []
 
-    # Extract from summary table (last message, if present)
     messages = api_response.get("chatHistory", {}).get("messages", [])
     for msg in messages:
-        content = msg.get("content", "")
-        # If it looks like a summary table, extract from table
-        if "| **Category**" in content or "|-" in content:
-            questions += extract_questions_from_summary_table(content)
-        # Otherwise, extract from content
-        questions += extract_questions_from_content(content)
+        questions += extract_questions_from_message(msg)
 
-    # Deduplicate and clean
-    questions = [q.strip() for q in questions if q.strip()]
-    questions = list(dict.fromkeys(questions))  # Remove duplicates, preserve order
+    # Deduplicate, preserving order
+    questions = list(dict.fromkeys(questions))
+    metrics.increment("extract.messages", len(messages))
+    metrics.increment("extract.questions", len(questions))
     return questions
 
+def extract_answer(api_response):
+    """
+    The answer text of an answer API response: its "answer" field, or else the content of the
+    last assistant message in chatHistory.messages. Returns "" when there is none.
+    """
+    if api_response.get("answer"):
+        return api_response["answer"].strip()
+    messages = api_response.get("chatHistory", {}).get("messages", [])
+    for msg in reversed(messages):
+        if msg.get("role", "assistant") == "assistant" and msg.get("content"):
+            return msg["content"].strip()
+    return ""
+
 # Example usage:
 # api_response = ... # your API response dict
 # all_questions = extract_all_questions(api_response)
@@ -0,0 +1,225 @@
+"""
+Opt-in SQLite query tracer.
+
+When enabled, db_utils.get_connection() hands out connections whose cursors time every statement
+(execute plus fetches), count rows, capture EXPLAIN QUERY PLAN for statements slower than the
+threshold and flag full table scans. A report ranked by total time is written on exit.
+
+    python3 ./main_app.py --trace-sql --slow-ms 20 --trace-report slow_queries.log
+"""
+import atexit
+import re
+import sqlite3
+import threading
+import time
+import weakref
+
+_lock = threading.Lock()
+_enabled = False
+_slow_ms = 50.0
+_report_path = "slow_queries.log"
+_stats = {}
+_plans = {}
+
+PLAN_PREFIXES = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE", "WITH")
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+
+def enable(slow_ms=50.0, report_path="slow_queries.log"):
+    global _enabled, _slow_ms, _report_path
+    _slow_ms = slow_ms
+    _report_path = report_path
+    if not _enabled:
+        _enabled = True
+        atexit.register(write_report)
+
+def is_enabled():
+    return _enabled
+
+def normalize(sql):
+    return " ".join(sql.split())
+
+class StatementStats:
+    __slots__ = ("sql", "calls", "total_ms", "max_ms", "rows", "slow_calls", "trace_hits")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.trace_hits = 0
+
+def _stats_for(sql):
+    stats = _stats.get(sql)
+    if stats is None:
+        stats = _stats[sql] = StatementStats(sql)
+    return stats
+
+def _on_trace(statement):
+    # set_trace_callback also sees statements issued implicitly (BEGIN/COMMIT, executescript).
+    # Cursor statements are already timed and arrive here with parameters expanded, so skip them.
+    if statement.lstrip().upper().startswith(PLAN_PREFIXES):
+        return
+    with _lock:
+        _stats_for(normalize(statement)).trace_hits += 1
+
+def explain(conn, sql, params):
+    """
+    Returns the EXPLAIN QUERY PLAN detail lines for sql, or [] when it cannot be explained.
+    """
+    if not normalize(sql).upper().startswith(PLAN_PREFIXES):
+        return []
+    try:
+        cur = sqlite3.Cursor(conn)
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+        lines = [row[3] for row in cur.fetchall()]
+        cur.close()
+        return lines
+    except sqlite3.Error:
+        return []
+
+class TracingCursor(sqlite3.Cursor):
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._sql = None
+        self._params = ()
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, params, elapsed_ms, rows = self._sql, self._params, self._elapsed * 1000.0, self._rows
+        self._sql = None
+        key = normalize(sql)
+        capture = False
+        with _lock:
+            stats = _stats_for(key)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            if elapsed_ms >= _slow_ms:
+                stats.slow_calls += 1
+                capture = key not in _plans
+        if capture:
+            plan = explain(self.connection, sql, params)
+            with _lock:
+                _plans[key] = plan
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def execute(self, sql, params=()):
+        self._finish()
+        self._sql, self._params, self._elapsed, self._rows = sql, params, 0.0, 0
+        self._timed(super().execute, sql, params)
+        if self.description is None:
+            # DML/DDL: no rows to fetch, rowcount is final
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        self._sql, self._params, self._elapsed, self._rows = sql, (), 0.0, 0
+        self._timed(super().executemany, sql, seq_of_params)
+        self._rows = max(self.rowcount, 0)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size if size is not None else self.arraysize)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+class TracingConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+        self.set_trace_callback(_on_trace)
+
+    def cursor(self, factory=TracingCursor):
+        cur = super().cursor(factory)
+        if isinstance(cur, TracingCursor):
+            self._cursors.add(cur)
+        return cur
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def close(self):
+        for cur in list(self._cursors):
+            cur._finish()
+        super().close()
+
+def connect(db_file, **kwargs):
+    return sqlite3.connect(db_file, factory=TracingConnection, **kwargs)
+
+def report_lines():
+    with _lock:
+        ranked = sorted(_stats.values(), key=lambda s: s.total_ms, reverse=True)
+        plans = dict(_plans)
+    lines = [f"SQLite query report (slow threshold {_slow_ms:g} ms), ranked by total time", ""]
+    for rank, s in enumerate([s for s in ranked if s.calls], 1):
+        plan = plans.get(s.sql, [])
+        scans = [m.group(1) for m in (FULL_SCAN.match(p) for p in plan) if m]
+        flag = f"  FULL SCAN: {', '.join(scans)}" if scans else ""
+        lines.append(
+            f"#{rank} total {s.total_ms:.1f} ms | calls {s.calls} | mean {s.total_ms / s.calls:.2f} ms | "
+            f"max {s.max_ms:.2f} ms | rows {s.rows} | slow {s.slow_calls}{flag}"
+        )
+        lines.append(f"    {s.sql}")
+        for p in plan:
+            lines.append(f"      plan: {p}")
+        lines.append("")
+    implicit = [s for s in ranked if not s.calls and s.trace_hits]
+    if implicit:
+        lines.append("Statements seen only by the trace callback (implicit transactions, scripts):")
+        for s in sorted(implicit, key=lambda s: s.trace_hits, reverse=True):
+            lines.append(f"    {s.trace_hits:6d}x {s.sql}")
+    return lines
+
+def write_report(path=None):
+    path = path or _report_path
+    if not _stats:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(report_lines()) + "\n")
@@ -0,0 +1,300 @@
+from textual.screen import Screen
+from textual.widgets import Static, Button, Header, Footer, Select, Input, DataTable
+from textual.containers import Container, Horizontal
+from textual.message import Message
+from textual import events, work
+import datetime
+from functools import partial
+import async_db
+from db_utils import (
+    CATEGORIES, UNCATEGORIZED_FILTER, count_questions, get_questions_page, get_distinct_saps,
+    bulk_update_category, bulk_delete_questions,
+)
+
+PAGE_SIZE = 200
+# Start fetching the next page when the viewport is this many rows from the end
+PREFETCH_ROWS = 40
+
+class PagedDataTable(DataTable):
+    """
+    DataTable that asks its screen for more rows when scrolled near the bottom.
+    """
+    class NeedMoreRows(Message):
+        pass
+
+    def watch_scroll_y(self, old_value, new_value):
+        super().watch_scroll_y(old_value, new_value)
+        if new_value >= self.max_scroll_y - PREFETCH_ROWS:
+            self.post_message(self.NeedMoreRows())
+
+    def watch_cursor_coordinate(self, old_value, new_value):
+        super().watch_cursor_coordinate(old_value, new_value)
+        if new_value.row >= self.row_count - PREFETCH_ROWS:
+            self.post_message(self.NeedMoreRows())
+
+class QuestionBrowserScreen(Screen):
+    """
+    Browse, filter and bulk-edit categorized questions. Rows are paged in from SQLite as the
+    table scrolls; filtering happens in SQL and bulk edits are single set-based statements.
+    """
+    BINDINGS = [
+        ("space", "toggle_select", "Select"),
+        ("ctrl+a", "select_loaded", "Select loaded"),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self.filters = {}
+        self.last_id = 0
+        self.exhausted = False
+        self.page_loading = False
+        self.total = 0
+        self.selected = set()
+        # guid -> category label shown in the table, so bulk edits can update loaded rows in place
+        self.loaded = {}
+
+    def compose(self):
+        yield Header()
+        yield Container(
+            Static("Question Browser", classes="title", id="browser_title"),
+            Horizontal(
+                Select(
+                    options=[("Uncategorized", UNCATEGORIZED_FILTER)] + [(cat, cat) for cat in CATEGORIES],
+                    prompt="Any category",
+                    id="filter_category"
+                ),
+                Select(options=[], prompt="Any SAP", id="filter_sap"),
+                Input(placeholder="From YYYY-MM-DD", id="filter_from"),
+                Input(placeholder="To YYYY-MM-DD", id="filter_to"),
+                Button("Filter", id="apply_filter", variant="primary"),
+                id="browser_filters"
+            ),
+            PagedDataTable(id="browser_table", cursor_type="row", zebra_stripes=True),
+            Static("", id="browser_status"),
+            Horizontal(
+                Select(options=[(cat, cat) for cat in CATEGORIES], prompt="Recategorize as", id="bulk_category"),
+                Button("Apply to Selected", id="bulk_apply", variant="success"),
+                Button("Delete Selected", id="bulk_delete", variant="error"),
+                Button("Clear Selection", id="clear_selection", variant="warning"),
+                Button("Back to Menu", id="back_to_menu", variant="primary"),
+                id="browser_actions"
+            ),
+            id="browser_container"
+        )
+        yield Footer()
+
+    def on_mount(self):
+        table = self.query_one("#browser_table", DataTable)
+        table.add_column("", key="sel", width=1)
+        table.add_column("Category", key="category", width=16)
+        table.add_column("SAP", key="sap", width=36)
+        table.add_column("Question", key="question")
+        table.add_column("Timestamp", key="timestamp", width=19)
+        self.load_saps()
+        self.reload()
+
+    @work(group="browser_saps")
+    async def load_saps(self):
+        self.set_sap_options(await async_db.run(get_distinct_saps))
+
+    def set_sap_options(self, saps):
+        self.query_one("#filter_sap", Select).set_options([(sap, sap) for sap in saps])
+
+    def read_filters(self):
+        category = self.query_one("#filter_category", Select)
+        sap = self.query_one("#filter_sap", Select)
+        return {
+            "category": None if category.is_blank() else category.value,
+            "sap": None if sap.is_blank() else sap.value,
+            "date_from": self.query_one("#filter_from", Input).value.strip() or None,
+            "date_to": self.query_one("#filter_to", Input).value.strip() or None,
+        }
+
+    def reload(self):
+        """
+        Clears the table and starts paging from the first row for the current filters.
+        """
+        self.query_one("#browser_table", DataTable).clear()
+        self.last_id = 0
+        self.exhausted = False
+        self.page_loading = False
+        self.loaded = {}
+        self.selected.clear()
+        self.page_loading = True
+        self.fetch_first_page(dict(self.filters))
+
+    @work(exclusive=True, group="browser_page")
+    async def fetch_first_page(self, filters):
+        # The total and the first page in one round trip
+        try:
+            total, rows = await async_db.read_many(
+                partial(count_questions, **filters),
+                partial(get_questions_page, after_id=0, limit=PAGE_SIZE, **filters),
+            )
+        except Exception as e:
+            self.page_failed(filters, e)
+            return
+        self.set_total(total)
+        self.append_rows(0, filters, rows)
+
+    def set_total(self, total):
+        self.total = total
+        self.update_status()
+
+    def load_next_page(self):
+        if self.page_loading or self.exhausted:
+            return
+        self.page_loading = True
+        self.fetch_page(self.last_id, dict(self.filters))
+
+    @work(exclusive=True, group="browser_page")
+    async def fetch_page(self, after_id, filters):
+        try:
+            rows = await async_db.run(get_questions_page, after_id=after_id, limit=PAGE_SIZE, **filters)
+        except Exception as e:
+            self.page_failed(filters, e)
+            return
+        self.append_rows(after_id, filters, rows)
+
+    def page_failed(self, filters, error):
+        # Scrolling retries the page
+        self.page_loading = False
+        if filters == self.filters:
+            self.query_one("#browser_status", Static).update(f"[red]Could not load questions: {error}[/red]")
+
+    def append_rows(self, after_id, filters, rows):
+        self.page_loading = False
+        if filters != self.filters or after_id != self.last_id:
+            # Filters changed while this page was in flight
+            return
+        table = self.query_one("#browser_table", DataTable)
+        for row_id, guid, question, category, sap, timestamp in rows:
+            table.add_row("", category or "", sap or "", question or "", (timestamp or "")[:19], key=guid)
+            self.loaded[guid] = category or ""
+        if rows:
+            self.last_id = rows[-1][0]
+        if len(rows) < PAGE_SIZE:
+            self.exhausted = True
+        self.update_status()
+
+    def update_status(self):
+        more = "" if self.exhausted else " (scroll for more)"
+        self.query_one("#browser_status", Static).update(
+            f"Showing {len(self.loaded)} of {self.total}{more}  |  [bold]{len(self.selected)} selected[/bold]"
+        )
+
+    def on_paged_data_table_need_more_rows(self, message):
+        self.load_next_page()
+
+    def set_selected(self, guid, selected):
+        table = self.query_one("#browser_table", DataTable)
+        if selected:
+            self.selected.add(guid)
+        else:
+            self.selected.discard(guid)
+        table.update_cell(guid, "sel", "✓" if selected else "")
+
+    def action_toggle_select(self):
+        table = self.query_one("#browser_table", DataTable)
+        if not table.row_count:
+            return
+        row_key, _ = table.coordinate_to_cell_key(table.cursor_coordinate)
+        self.set_selected(row_key.value, row_key.value not in self.selected)
+        self.update_status()
+
+    def action_select_loaded(self):
+        for guid in self.loaded:
+            if guid not in self.selected:
+                self.set_selected(guid, True)
+        self.update_status()
+
+    def clear_selected_rows(self):
+        for guid in list(self.selected):
+            self.set_selected(guid, False)
+        self.update_status()
+
+    async def on_button_pressed(self, event: Button.Pressed):
+        if event.button.id == "back_to_menu":
+            from menu_screen import MenuScreen
+            self.app.push_screen(MenuScreen())
+        elif event.button.id == "apply_filter":
+            filters = self.read_filters()
+            try:
+                for key in ("date_from", "date_to"):
+                    if filters[key]:
+                        datetime.date.fromisoformat(filters[key])
+            except ValueError:
+                self.query_one("#browser_status", Static).update("[red]Dates must be YYYY-MM-DD.[/red]")
+                return
+            self.filters = filters
+            self.reload()
+        elif event.button.id == "clear_selection":
+            self.clear_selected_rows()
+        elif event.button.id == "bulk_apply":
+            category_select = self.query_one("#bulk_category", Select)
+            if not self.selected or category_select.is_blank():
+                self.query_one("#browser_status", Static).update("[red]Select rows and a category first.[/red]")
+                return
+            category = category_select.value
+            guids = set(self.selected)
+            updated, leased = await async_db.run(bulk_update_category, guids, category)
+            table = self.query_one("#browser_table", DataTable)
+            for guid in guids.difference(leased):
+                table.update_cell(guid, "category", category)
+                self.loaded[guid] = category
+            self.clear_selected_rows()
+            skipped = f" {len(leased)} skipped: another analyst is categorizing them." if leased else ""
+            self.query_one("#browser_status", Static).update(f"[green]{updated} questions recategorized as {category}.[/green]{skipped}")
+        elif event.button.id == "bulk_delete":
+            if not self.selected:
+                self.query_one("#browser_status", Static).update("[red]Select rows to delete first.[/red]")
+                return
+            guids = set(self.selected)
+            deleted = await async_db.run(bulk_delete_questions, guids)
+            table = self.query_one("#browser_table", DataTable)
+            for guid in guids:
+                table.remove_row(guid)
+                self.loaded.pop(guid, None)
+            self.selected -= guids
+            self.total = max(self.total - deleted, 0)
+            self.update_status()
+            self.query_one("#browser_status", Static).update(f"[red]{deleted} questions deleted.[/red]")
+
+    async def on_key(self, event: events.Key):
+        if event.key == "ctrl+c":
+            await self.app.action_quit()
+
+    CSS = """
+    #browser_container {
+        height: 100%;
+        width: 100%;
+    }
+    #browser_title {
+        text-align: center;
+        margin-bottom: 1;
+    }
+    #browser_filters, #browser_actions {
+        height: auto;
+        align: center middle;
+    }
+    #browser_filters Select {
+        width: 30;
+    }
+    #browser_filters Input {
+        width: 18;
+    }
+    #browser_actions Select {
+        width: 26;
+    }
+    #browser_table {
+        height: 1fr;
+    }
+    #browser_status {
+        margin: 1 0;
+    }
+    Button {
+        margin: 0 1;
+        min-width: 10;
+        padding: 0 1;
+    }
+    """
@@ -1,17 +1,44 @@
 from textual.screen import Screen
 from textual.widgets import Static, Button, Header, Footer
 from textual.containers import Container, Horizontal
-from textual.reactive import reactive
-from textual import events
-from db_utils import CATEGORIES, save_to_db
+from textual import events, work
+from collections import deque
+from functools import partial
+import async_db
+import metrics
+from db_utils import (
+    CATEGORIES, LEASE_SECONDS, UNCATEGORIZED_FILTER, save_to_db, uncategorize_question, count_questions,
+    lease_owner, claim_questions, renew_leases, release_leases,
+)
 import datetime
 
-class QuestionCategorizerScreen(Screen):
-    question_index = reactive(0)
+# Claim another leased batch once fewer than this many questions are prefetched
+REFILL_THRESHOLD = 10
+# Number of categorizations that Backspace / Go Back can undo
+UNDO_DEPTH = 50
+# Hotkeys 1-8 pick CATEGORIES[0..7]
+CATEGORY_KEYS = {str(i + 1): i for i in range(len(CATEGORIES))}
 
+class QuestionCategorizerScreen(Screen):
+    """
+    Categorizes questions leased from the shared database, by button or hotkey (1-8 for the
+    categories, Backspace to undo). Upcoming questions wait in a prefetch buffer that a worker
+    refills with leased batches (see claim_questions), saves are queued on the database writer
+    thread (async_db) and progress counts are kept in memory, so showing the next question never
+    touches the database. Leases are renewed while the screen is open and the unused ones are
+    released when it closes.
+    """
     def __init__(self, questions):
         super().__init__()
-        self.questions = questions
+        self.upcoming = deque(questions)
+        self.current = None
+        self.history = deque(maxlen=UNDO_DEPTH)
+        self.owner = lease_owner()
+        self.claiming = False
+        self.exhausted = False
+        self.categorized = 0
+        self.total = 0
+        self.buttons_enabled = None
 
     def compose(self):
         yield Header()
@@ -21,7 +48,7 @@ class QuestionCategorizerScreen(Screen):
             Static("", id="sap"),
             Static("", id="question"),
             Horizontal(
-                *[Button(cat, id=f"cat_{i}", variant="primary") for i, cat in enumerate(CATEGORIES)],
+                *[Button(f"{i + 1} {cat}", id=f"cat_{i}", variant="primary") for i, cat in enumerate(CATEGORIES)],
                 id="category_buttons"
             ),
             Horizontal(
@@ -29,73 +56,189 @@ class QuestionCategorizerScreen(Screen):
                 Button("Menu", id="menu", variant="primary"),
                 id="nav_buttons"
             ),
+            Static("[dim]Keys: 1-8 categorize, Backspace undo[/dim]", id="key_hint"),
             id="main_container"
         )
         yield Footer()
 
     def on_mount(self):
-        self.update_question()
-
-    def update_question(self):
-        import sqlite3
-        question_obj = self.questions[self.question_index] if self.question_index < len(self.questions) else None
-        sap_widget = self.query_one("#sap", Static)
-        question_widget = self.query_one("#question", Static)
-        progress_widget = self.query_one("#progress", Static)
-        # Count categorized and total questions in the database
-        try:
-            conn = sqlite3.connect("questions.db")
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM questions WHERE category IS NOT NULL AND category != ''")
-            categorized = c.fetchone()[0]
-            c.execute("SELECT COUNT(*) FROM questions")
-            total = c.fetchone()[0]
-            conn.close()
-        except Exception:
-            categorized = sum(1 for q in self.questions if q.get("category"))
-            total = len(self.questions)
-        percent = (categorized / total * 100) if total else 0
-        progress_widget.update(f"[bold green]Categorized:[/bold green] {categorized} / {total}  ([bold]{percent:.1f}%[/bold])")
+        # Looked up once; rendering only updates these
+        self.sap_widget = self.query_one("#sap", Static)
+        self.question_widget = self.query_one("#question", Static)
+        self.progress_widget = self.query_one("#progress", Static)
+        self.category_buttons = [self.query_one(f"#cat_{i}", Button) for i in range(len(CATEGORIES))]
+        self.current = self.upcoming.popleft() if self.upcoming else None
+        self.render_question()
+        self.load_counts()
+        self.set_interval(LEASE_SECONDS / 3, self.renew)
+        self.refill()
+
+    def on_unmount(self):
+        self.release_unused()
+
+    def release_unused(self):
+        # Queued behind any pending saves on the writer thread, so no lease is released under a save
+        unused = [q.guid for q in ([self.current] if self.current else []) + list(self.upcoming) if not q.category]
+        if unused:
+            self.write(release_leases, self.owner, unused)
+
+    def renew(self):
+        self.write(renew_leases, self.owner)
+        # While idle on "all done", look again for questions whose leases other analysts let expire
+        if self.current is None:
+            self.refill()
+
+    def write(self, func, *args, question_obj=None, **kwargs):
+        """
+        Queues a write without waiting for it. Writes are applied in the order they are queued.
+        """
+        async_db.run(func, *args, **kwargs).add_done_callback(partial(self.written, question_obj))
+
+    def written(self, question_obj, future):
+        if future.cancelled():
+            return
+        if future.exception():
+            self.app.notify(f"Could not save: {future.exception()}", severity="error")
+        elif question_obj is not None and not future.result():
+            self.save_failed(question_obj)
+
+    @work(group="counts")
+    async def load_counts(self):
+        total, uncategorized = await async_db.read_many(
+            partial(count_questions), partial(count_questions, category=UNCATEGORIZED_FILTER)
+        )
+        self.set_counts(total - uncategorized, total)
+
+    def set_counts(self, categorized, total):
+        self.categorized = categorized
+        self.total = total
+        self.render_progress()
+
+    def save_failed(self, question_obj):
+        if question_obj.category:
+            question_obj.category = ""
+            self.categorized -= 1
+        if question_obj in self.history:
+            self.history.remove(question_obj)
+        self.app.notify("Your lease on that question expired and another analyst claimed it; skipped.", severity="warning")
+        self.render_progress()
+
+    def refill(self):
+        if self.claiming or len(self.upcoming) >= REFILL_THRESHOLD:
+            return
+        # After an empty claim, wait until the buffer runs out before claiming again; by then
+        # leases held by other analysts may have expired
+        if self.exhausted and (self.upcoming or self.current):
+            return
+        self.claiming = True
+        self.claim_more()
+
+    def questions_available(self):
+        """
+        Called when new questions were imported while this screen is open.
+        """
+        self.exhausted = False
+        self.refill()
+        if self.current is None and self.is_mounted:
+            self.render_question()
+
+    @work(exclusive=True, group="claim")
+    async def claim_more(self):
+        self.add_claimed(await async_db.run(claim_questions, self.owner))
+
+    def add_claimed(self, batch):
+        self.claiming = False
+        known = {q.guid for q in self.upcoming}
+        known.update(q.guid for q in self.history)
+        if self.current:
+            known.add(self.current.guid)
+        batch = [q for q in batch if q.guid not in known]
+        if not batch:
+            self.exhausted = True
+        self.upcoming.extend(batch)
+        if self.current is None and self.upcoming:
+            self.current = self.upcoming.popleft()
+        self.render_question()
+        # Pick up progress made by other analysts meanwhile
+        self.load_counts()
+
+    def render_progress(self):
+        percent = (self.categorized / self.total * 100) if self.total else 0
+        self.progress_widget.update(
+            f"[bold green]Categorized:[/bold green] {self.categorized} / {self.total}  ([bold]{percent:.1f}%[/bold])"
+        )
+
+    def render_question(self):
+        question_obj = self.current
+        self.render_progress()
         if question_obj:
-            sap_text = question_obj.get("sap", "")
-            sap_widget.update(f"[bold light_steel_blue]SAP: {sap_text}[/bold light_steel_blue]")
-            question_widget.update(f"[bold light_steel_blue]{question_obj['question']}[/bold light_steel_blue]\n")
+            self.sap_widget.update(f"[bold light_steel_blue]SAP: {question_obj.sap}[/bold light_steel_blue]")
+            self.question_widget.update(f"[bold light_steel_blue]{question_obj.question}[/bold light_steel_blue]\n")
+        elif self.claiming:
+            self.sap_widget.update("")
+            self.question_widget.update("\n\n[yellow]Claiming more questions...[/yellow]\n")
         else:
-            sap_widget.update("")
-            question_widget.update(
+            self.sap_widget.update("")
+            self.question_widget.update(
                 "\n\n[bold magenta]All questions done! Please press the menu button and add more questions[/bold magenta]\n"
             )
-        for i, cat in enumerate(CATEGORIES):
-            btn = self.query_one(f"#cat_{i}", Button)
-            btn.disabled = question_obj is None
+        enabled = question_obj is not None
+        if enabled != self.buttons_enabled:
+            self.buttons_enabled = enabled
+            for btn in self.category_buttons:
+                btn.disabled = not enabled
+
+    def categorize(self, index):
+        question_obj = self.current
+        if question_obj is None:
+            return
+        category = CATEGORIES[index]
+        if not question_obj.category:
+            self.categorized += 1
+        question_obj.category = category
+        row = [question_obj.guid, question_obj.question, category, "", "", "", "", "", datetime.datetime.now().isoformat()]
+        self.write(save_to_db, row, owner=self.owner, question_obj=question_obj)
+        self.history.append(question_obj)
+        self.current = self.upcoming.popleft() if self.upcoming else None
+        self.refill()
+        self.render_question()
+
+    def undo(self):
+        if not self.history:
+            return
+        question_obj = self.history.pop()
+        if self.current:
+            self.upcoming.appendleft(self.current)
+        if question_obj.category:
+            self.categorized -= 1
+            question_obj.category = ""
+            self.write(uncategorize_question, question_obj.guid, self.owner)
+        self.current = question_obj
+        self.render_question()
 
     async def on_button_pressed(self, event: Button.Pressed):
         if event.button.id == "go_back":
-            if self.question_index > 0:
-                self.question_index -= 1
-                self.update_question()
+            self.undo()
             return
         if event.button.id == "menu":
             from menu_screen import MenuScreen
+            self.release_unused()
             self.app.push_screen(MenuScreen())
             return
-        if self.question_index >= len(self.questions):
-            return
-        category = str(event.button.label)
-        question_obj = self.questions[self.question_index]
-        guid = question_obj["guid"]
-        question = question_obj["question"]
-        timestamp = datetime.datetime.now().isoformat()
-        row = [guid, question, category, "", "", "", "", "", timestamp]
-        save_to_db(row)
-        # Mark this question as categorized in memory for progress bar
-        question_obj["category"] = category
-        self.question_index += 1
-        self.update_question()
+        if event.button.id.startswith("cat_"):
+            self.categorize(int(event.button.id[4:]))
 
     async def on_key(self, event: events.Key):
         if event.key == "ctrl+c":
             await self.app.action_quit()
+        elif event.key in CATEGORY_KEYS:
+            event.stop()
+            with metrics.timer("categorizer.keystroke"):
+                self.categorize(CATEGORY_KEYS[event.key])
+        elif event.key == "backspace":
+            event.stop()
+            with metrics.timer("categorizer.keystroke"):
+                self.undo()
 
     CSS = """
     #main_container {
@@ -126,6 +269,10 @@ class QuestionCategorizerScreen(Screen):
         align: center middle;
         margin-top: 2;
     }
+    #key_hint {
+        text-align: center;
+        margin-top: 1;
+    }
     Button {
         margin: 0 1;
         min-width: 10;
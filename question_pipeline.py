@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+from contextlib import nullcontext
+import auth_mi
+import metrics
+from db_utils import import_questions_list_to_db
+from process_response import extract_questions_from_message
+
+# Bounded hand-off queues between stages: a slow stage blocks the one feeding it
+MESSAGE_QUEUE_SIZE = 16
+QUESTION_QUEUE_SIZE = 512
+# Questions committed per insert transaction; a partial batch is flushed after FLUSH_SECONDS
+IMPORT_BATCH_SIZE = 50
+FLUSH_SECONDS = 1.0
+
+_DONE = object()
+
+class StageStats:
+    """
+    Counters for one pipeline stage. `blocked_seconds` is time spent waiting for the next stage
+    to make room (backpressure); `busy_seconds` is time spent producing items.
+    """
+    __slots__ = ("name", "items", "busy_seconds", "blocked_seconds", "started")
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def throughput(self):
+        elapsed = time.perf_counter() - self.started
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return f"{self.name}: {self.items} ({self.throughput():.1f}/s, blocked {self.blocked_seconds:.1f}s)"
+
+class _Stopped(Exception):
+    pass
+
+def threaded(generator, stats, maxsize, stop, heartbeat=None):
+    """
+    Runs `generator` on its own thread and yields its items through a bounded queue, so the
+    producer runs ahead of the consumer by at most `maxsize` items. Producer errors are re-raised
+    in the consumer; setting `stop` makes the producer give up at its next put. With `heartbeat`,
+    None is yielded whenever no item arrived for that many seconds.
+    """
+    q = queue.Queue(maxsize=maxsize)
+
+    def put(item):
+        start = time.perf_counter()
+        while True:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.blocked_seconds += time.perf_counter() - start
+
+    def run():
+        try:
+            start = time.perf_counter()
+            for item in generator:
+                stats.busy_seconds += time.perf_counter() - start
+                stats.items += 1
+                metrics.increment(f"pipeline.{stats.name}.items")
+                put(item)
+                start = time.perf_counter()
+            put(_DONE)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                put(e)
+            except _Stopped:
+                pass
+
+    threading.Thread(target=run, name=f"pipeline-{stats.name}", daemon=True).start()
+    while True:
+        try:
+            item = q.get(timeout=heartbeat)
+        except queue.Empty:
+            yield None
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+def fetch_messages(sap_full_path, number_of_cases, access_token=None, background=False):
+    """
+    Yields the chatHistory messages of one experiment call for `number_of_cases` cases (in the
+    scheduler's background lane when `background` is set). The experiment API has no offset or
+    continuation token, so the cases cannot be split across several calls without repeating them.
+    """
+    access_token = access_token or auth_mi.get_access_token()
+    filter_str = f"SAPFullPath eq '{sap_full_path}'"
+    max_rows = max(1, number_of_cases)
+    with auth_mi.background() if background else nullcontext():
+        response = auth_mi.request_experiment(access_token, filter_str=filter_str, max_rows=max_rows)
+    auth_mi.archive_experiment_response(response, auth_mi.EXPERIMENT_ID, filter_str, max_rows)
+    yield from response.json().get("chatHistory", {}).get("messages", [])
+
+def extract_questions(messages):
+    """
+    Yields each question once, as soon as the message containing it has been processed.
+    """
+    seen = set()
+    for msg in messages:
+        for question in extract_questions_from_message(msg):
+            if question not in seen:
+                seen.add(question)
+                yield question
+
+class PipelineResult:
+    def __init__(self):
+        self.stages = {name: StageStats(name) for name in ("fetch", "extract", "import")}
+        self.imported = 0
+
+    @property
+    def questions(self):
+        return self.stages["extract"].items
+
+    def summary(self):
+        return ", ".join(stats.summary() for stats in self.stages.values())
+
+@metrics.timed("pipeline.run")
+def run_pipeline(sap_full_path, number_of_cases, batch_size=IMPORT_BATCH_SIZE,
+                 on_batch=None, access_token=None, result=None, background=False, check=None):
+    """
+    Fetches, extracts and imports questions for a SAP as a pipeline of generators connected by
+    bounded queues: questions are extracted from the fetched messages while earlier ones are
+    committed in batches of `batch_size` (or every FLUSH_SECONDS).
+    `on_batch(result, inserted)` is called after every committed batch. `check()` is called after
+    every batch and about every FLUSH_SECONDS while waiting; if it raises, the run is abandoned
+    (the fetch thread drops whatever is still in flight). Returns the PipelineResult.
+    """
+    result = result or PipelineResult()
+    stages = result.stages
+    stop = threading.Event()
+    messages = threaded(
+        fetch_messages(sap_full_path, number_of_cases, access_token, background),
+        stages["fetch"], MESSAGE_QUEUE_SIZE, stop
+    )
+    questions = threaded(extract_questions(messages), stages["extract"], QUESTION_QUEUE_SIZE, stop, heartbeat=FLUSH_SECONDS)
+
+    def flush(batch):
+        start = time.perf_counter()
+        inserted = import_questions_list_to_db(batch, sap_full_path)
+        stages["import"].busy_seconds += time.perf_counter() - start
+        stages["import"].items += len(batch)
+        metrics.increment("pipeline.import.items", len(batch))
+        result.imported += inserted
+        if on_batch:
+            on_batch(result, inserted)
+
+    batch = []
+    batch_started = 0.0
+    try:
+        for question in questions:
+            if question is not None:
+                if not batch:
+                    batch_started = time.perf_counter()
+                batch.append(question)
+            if len(batch) >= batch_size or (batch and time.perf_counter() - batch_started >= FLUSH_SECONDS):
+                flush(batch)
+                batch = []
+                if check:
+                    check()
+            elif question is None and check:
+                check()
+        if batch:
+            flush(batch)
+    finally:
+        stop.set()
+    return result
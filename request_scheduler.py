@@ -0,0 +1,188 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+import metrics
+
+# Priority lanes; lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `burst`.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # Nothing is released before this time (set from Retry-After)
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """
+        Seconds until a token is available (0 if one is available now).
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+class RequestScheduler:
+    """
+    Central gate for outgoing API requests. A request is released when it is the highest-priority
+    waiter (INTERACTIVE before BACKGROUND, FIFO within a lane), a token is available in the rate
+    bucket and fewer than `limit` requests are in flight. The limit adapts AIMD-style: +1 per
+    window of successful requests at normal latency, halved on a 429 or when latency exceeds
+    `latency_factor` times the best latency seen for the same kind of request (endpoints differ
+    too much in latency to share one baseline). 429s are retried after their Retry-After.
+    """
+    def __init__(self, rate=2.0, burst=4, initial_limit=2, max_limit=8, latency_factor=3.0, max_retries=3, window_seconds=60):
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = float(initial_limit)
+        self.max_limit = max_limit
+        self.latency_factor = latency_factor
+        self.max_retries = max_retries
+        self.window_seconds = window_seconds
+        self.cond = threading.Condition()
+        self.waiting = []
+        self.seq = itertools.count()
+        self.in_flight = 0
+        # kind -> best latency seen, in seconds
+        self.best_latency = {}
+        # kind -> time of the last limit decrease that kind caused
+        self.last_decrease = {}
+        self.completed = deque()
+        self.throttled = 0
+        self.lanes = {lane: {"requests": 0, "wait_total": 0.0, "wait_max": 0.0} for lane in LANE_NAMES}
+
+    def acquire(self, lane=INTERACTIVE):
+        """
+        Blocks until the request may be sent. Returns the seconds spent queued.
+        """
+        start = time.monotonic()
+        ticket = (lane, next(self.seq))
+        with self.cond:
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                now = time.monotonic()
+                if self.waiting[0] == ticket and self.in_flight < int(self.limit):
+                    wait = self.bucket.wait_time(now)
+                    if wait == 0.0:
+                        break
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait(0.5)
+            heapq.heappop(self.waiting)
+            self.bucket.take(now)
+            self.in_flight += 1
+            waited = now - start
+            stats = self.lanes[lane]
+            stats["requests"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+            # The next waiter may now be eligible
+            self.cond.notify_all()
+        metrics.observe(f"scheduler.queue_wait.{LANE_NAMES[lane]}", waited * 1000.0)
+        metrics.increment(f"scheduler.requests.{LANE_NAMES[lane]}")
+        return waited
+
+    def release(self, latency, throttled=False, retry_after=None, kind=None):
+        """
+        Reports a finished request: `latency` in seconds, whether the server throttled it and the
+        kind of request (e.g. its endpoint), whose own best latency it is compared with.
+        """
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            self.completed.append(now)
+            while self.completed and now - self.completed[0] > self.window_seconds:
+                self.completed.popleft()
+            best = self.best_latency.get(kind)
+            if throttled:
+                self.throttled += 1
+                self.bucket.pause(retry_after or 1.0)
+                self._decrease(now, kind, best)
+            else:
+                best = latency if best is None else min(best, latency)
+                self.best_latency[kind] = best
+                if latency > best * self.latency_factor:
+                    self._decrease(now, kind, best)
+                else:
+                    # Additive increase: about +1 per `limit` successful requests
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+        if throttled:
+            metrics.increment("scheduler.throttled")
+
+    def _decrease(self, now, kind, best_latency):
+        # At most one cut per latency period for each kind, so a burst of slow replies of one kind
+        # counts as one signal without holding back a signal from another kind
+        if now - self.last_decrease.get(kind, 0.0) >= (best_latency or 1.0):
+            self.limit = max(1.0, self.limit / 2)
+            self.last_decrease[kind] = now
+            metrics.increment("scheduler.limit_decreases")
+
+    def send(self, request, lane=INTERACTIVE, kind=None):
+        """
+        Runs `request()` (returning a requests.Response) under the scheduler, retrying 429s.
+        `kind` groups requests with comparable latency, e.g. one kind per endpoint.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(lane)
+            start = time.monotonic()
+            throttled = False
+            retry_after = None
+            try:
+                response = request()
+                throttled = response.status_code == 429
+                if throttled:
+                    retry_after = _retry_after(response)
+            finally:
+                self.release(time.monotonic() - start, throttled, retry_after, kind)
+            if not throttled or attempt == self.max_retries:
+                return response
+        return response
+
+    def stats(self):
+        with self.cond:
+            now = time.monotonic()
+            recent = [t for t in self.completed if now - t <= self.window_seconds]
+            span = min(self.window_seconds, now - recent[0]) if recent else 0.0
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": len(self.waiting),
+                "rate_limit": self.bucket.rate,
+                "achieved_rate": round(len(recent) / span, 3) if span > 0 else 0.0,
+                "throttled": self.throttled,
+                "lanes": {
+                    LANE_NAMES[lane]: {
+                        "requests": s["requests"],
+                        "mean_wait_ms": round(1000.0 * s["wait_total"] / s["requests"], 1) if s["requests"] else 0.0,
+                        "max_wait_ms": round(1000.0 * s["wait_max"], 1),
+                    }
+                    for lane, s in self.lanes.items()
+                },
+            }
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
@@ -0,0 +1,197 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import db_cache
+import db_utils
+import metrics
+from db_utils import get_connection, import_questions_list_to_db
+from process_response import extract_all_questions
+
+COMPRESSION_LEVEL = 6
+# Archived responses decompressed and extracted per batch; bounds reprocessing memory
+REPROCESS_BATCH_SIZE = 64
+
+SAP_FILTER = re.compile(r"SAPFullPath eq '(.*)'")
+
+def init_archive_db():
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS response_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT UNIQUE,
+            body BLOB,
+            raw_bytes INTEGER,
+            experiment_id TEXT,
+            filter TEXT,
+            max_rows INTEGER,
+            SAPFullPath TEXT,
+            first_seen TEXT,
+            last_seen TEXT,
+            fetch_count INTEGER DEFAULT 1,
+            questions_extracted INTEGER,
+            last_extracted TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+def sap_from_filter(filter_str):
+    match = SAP_FILTER.search(filter_str or "")
+    return match.group(1) if match else None
+
+@metrics.timed("archive.archive_response")
+@db_cache.invalidates("response_archive")
+def archive_response(raw, experiment_id, filter_str, max_rows, questions_extracted=None):
+    """
+    Stores a raw experiment response zlib-compressed, keyed by the SHA-256 of its bytes so an
+    identical response fetched again only bumps fetch_count. Returns the archive row id.
+    """
+    content_hash = hashlib.sha256(raw).hexdigest()
+    now = datetime.datetime.now().isoformat()
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+        INSERT INTO response_archive
+            (content_hash, body, raw_bytes, experiment_id, filter, max_rows, SAPFullPath, first_seen, last_seen, questions_extracted, last_extracted)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET last_seen = excluded.last_seen, fetch_count = fetch_count + 1
+    """, (
+        content_hash, zlib.compress(raw, COMPRESSION_LEVEL), len(raw), experiment_id, filter_str, max_rows,
+        sap_from_filter(filter_str), now, now, questions_extracted, now if questions_extracted is not None else None
+    ))
+    c.execute("SELECT id FROM response_archive WHERE content_hash = ?", (content_hash,))
+    archive_id = c.fetchone()[0]
+    conn.commit()
+    conn.close()
+    metrics.increment("archive.raw_bytes", len(raw))
+    return archive_id
+
+@metrics.timed("archive.archive_stats")
+@db_cache.cached("response_archive")
+def archive_stats():
+    """
+    Returns (responses, raw bytes, compressed bytes, total fetches) for the archive.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(LENGTH(body)), 0), COALESCE(SUM(fetch_count), 0) FROM response_archive")
+    stats = c.fetchone()
+    conn.close()
+    return stats
+
+def load_response(archive_id):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("SELECT body FROM response_archive WHERE id = ?", (archive_id,))
+    row = c.fetchone()
+    conn.close()
+    return json.loads(zlib.decompress(row[0])) if row else None
+
+def _extract(item):
+    # Runs in a worker process: decompress, parse and extract one archived response
+    archive_id, sap, body = item
+    try:
+        return archive_id, sap, extract_all_questions(json.loads(zlib.decompress(body))), None
+    except Exception as e:
+        return archive_id, sap, [], str(e)
+
+class ReprocessResult:
+    def __init__(self):
+        self.responses = 0
+        self.questions_found = 0
+        self.imported = 0
+        # Highest archive id processed; pass as start_after to resume
+        self.last_id = 0
+        # (archive id, error message) for responses the extractor could not handle
+        self.errors = []
+
+def _batches(c, batch_size, last_id=0):
+    while True:
+        c.execute(
+            "SELECT id, SAPFullPath, body FROM response_archive WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        )
+        rows = c.fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+@metrics.timed("archive.reprocess")
+def reprocess(workers=None, batch_size=REPROCESS_BATCH_SIZE, progress=None, start_after=0):
+    """
+    Re-runs the current extractor over every archived response (with id > start_after) on a process
+    pool and imports the questions that are not already in the database. Responses are read in
+    id-ordered batches, so memory stays bounded by `batch_size` compressed bodies.
+    `progress(result)` is called per batch.
+    """
+    init_archive_db()
+    result = ReprocessResult()
+    result.last_id = start_after
+    workers = workers or os.cpu_count() or 1
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rows in _batches(c, batch_size, start_after):
+                extracted = list(pool.map(_extract, rows, chunksize=max(1, len(rows) // (4 * workers))))
+                now = datetime.datetime.now().isoformat()
+                by_sap = {}
+                updates = []
+                for archive_id, sap, questions, error in extracted:
+                    if error:
+                        result.errors.append((archive_id, error))
+                        continue
+                    by_sap.setdefault(sap or "", []).extend(questions)
+                    updates.append((len(questions), now, archive_id))
+                    result.questions_found += len(questions)
+                for sap, questions in by_sap.items():
+                    result.imported += import_questions_list_to_db(questions, sap)
+                c.executemany("UPDATE response_archive SET questions_extracted = ?, last_extracted = ? WHERE id = ?", updates)
+                conn.commit()
+                result.responses += len(rows)
+                result.last_id = rows[-1][0]
+                if progress:
+                    progress(result)
+    finally:
+        conn.close()
+    metrics.increment("archive.reprocessed", result.responses)
+    return result
+
+def format_result(result):
+    text = (
+        f"Reprocessed {result.responses} archived responses: {result.questions_found} questions extracted, "
+        f"{result.imported} new imported"
+    )
+    if result.errors:
+        text += f", {len(result.errors)} responses failed"
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or reprocess archived ZebraAI experiment responses.")
+    parser.add_argument("command", choices=["stats", "reprocess"])
+    parser.add_argument("--db", default=db_utils.DB_FILE)
+    parser.add_argument("--workers", type=int, help="Extractor processes (default: CPU count)")
+    args = parser.parse_args()
+
+    db_utils.DB_FILE = args.db
+    db_utils.init_db()
+    init_archive_db()
+    if args.command == "stats":
+        responses, raw, compressed, fetches = archive_stats()
+        ratio = f"{raw / compressed:.1f}x" if compressed else "n/a"
+        print(f"{responses} responses ({fetches} fetches), {raw} bytes raw, {compressed} bytes stored ({ratio})")
+    else:
+        result = reprocess(workers=args.workers, progress=lambda r: print(f"  {r.responses} responses...", end="\r"))
+        print(format_result(result))
+        for archive_id, error in result.errors[:20]:
+            print(f"  archive {archive_id}: {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+from textual.screen import Screen
+from textual.widgets import Static, Button, Header, Footer, Select, Input, DataTable, Checkbox
+from textual.containers import Container, Horizontal
+from textual import events, work
+import re
+import async_db
+from db_utils import CATEGORIES, get_rules, add_rule, delete_rule, set_rule_enabled, get_saps_from_config
+from auto_categorize import run_rules
+
+class RulesScreen(Screen):
+    """
+    Manage keyword/regex auto-categorization rules, preview their effect and apply them
+    to all uncategorized questions.
+    """
+    def __init__(self):
+        super().__init__()
+        self.hits = {}
+        self.running = False
+
+    def compose(self):
+        yield Header()
+        yield Container(
+            Static("Auto-Categorization Rules", classes="title", id="rules_title"),
+            Horizontal(
+                Input(placeholder="Keyword or regex, e.g. how do i troubleshoot", id="rule_pattern"),
+                Checkbox("Regex", id="rule_is_regex"),
+                Select(options=[(cat, cat) for cat in CATEGORIES], prompt="Category", id="rule_category"),
+                Select(options=[], prompt="All SAPs", id="rule_sap"),
+                Button("Add Rule", id="add_rule", variant="success"),
+                id="rule_form"
+            ),
+            DataTable(id="rules_table", cursor_type="row", zebra_stripes=True),
+            Horizontal(
+                Button("Preview (dry run)", id="preview_rules", variant="primary"),
+                Button("Apply Rules", id="apply_rules", variant="success"),
+                Button("Enable/Disable", id="toggle_rule", variant="warning"),
+                Button("Delete Rule", id="delete_rule", variant="error"),
+                Button("Back to Menu", id="back_to_menu", variant="primary"),
+                id="rules_buttons"
+            ),
+            Static("", id="rules_output"),
+            id="rules_container"
+        )
+        yield Footer()
+
+    async def on_mount(self):
+        table = self.query_one("#rules_table", DataTable)
+        table.add_columns("Id", "Pattern", "Type", "Category", "SAP", "Enabled", "Hits")
+        rules, saps = await async_db.read_many(get_rules, get_saps_from_config)
+        self.query_one("#rule_sap", Select).set_options([(sap, sap) for sap in dict.fromkeys(saps.values()) if sap])
+        self.show_rules(rules)
+
+    async def refresh_rules(self):
+        self.show_rules(await async_db.run(get_rules))
+
+    def show_rules(self, rules):
+        table = self.query_one("#rules_table", DataTable)
+        table.clear()
+        for rule_id, pattern, is_regex, category, sap, enabled in rules:
+            table.add_row(
+                str(rule_id), pattern, "regex" if is_regex else "keyword", category, sap or "All",
+                "yes" if enabled else "no", str(self.hits.get(rule_id, "")), key=str(rule_id)
+            )
+
+    def selected_rule_id(self):
+        table = self.query_one("#rules_table", DataTable)
+        if not table.row_count:
+            return None
+        row_key, _ = table.coordinate_to_cell_key(table.cursor_coordinate)
+        return int(row_key.value)
+
+    @work(thread=True, exclusive=True, group="rules")
+    def execute_rules(self, dry_run):
+        def progress(result):
+            self.app.call_from_thread(
+                self.query_one("#rules_output", Static).update,
+                f"[yellow]Scanned {result.scanned} uncategorized questions, {result.matched} matched...[/yellow]"
+            )
+        try:
+            result = run_rules(dry_run=dry_run, progress=progress)
+        except Exception as e:
+            self.app.call_from_thread(self.show_result, None, str(e))
+            return
+        self.app.call_from_thread(self.show_result, result, None)
+
+    async def show_result(self, result, error):
+        self.running = False
+        output = self.query_one("#rules_output", Static)
+        if error:
+            output.update(f"[red]Error: {error}[/red]")
+            return
+        self.hits = result.hits
+        await self.refresh_rules()
+        verb = "would be categorized" if result.dry_run else "categorized"
+        lines = [f"[green]{result.matched} of {result.scanned} uncategorized questions {verb}.[/green]"]
+        if result.dry_run:
+            for question, sap, category, rule_id in result.preview[:15]:
+                lines.append(f"  [bold]{category}[/bold] (rule {rule_id}): {question}")
+            if result.matched > 15:
+                lines.append(f"  ... and {result.matched - 15} more")
+        output.update("\n".join(lines))
+
+    async def on_button_pressed(self, event: Button.Pressed):
+        output = self.query_one("#rules_output", Static)
+        if event.button.id == "back_to_menu":
+            from menu_screen import MenuScreen
+            self.app.push_screen(MenuScreen())
+        elif event.button.id == "add_rule":
+            pattern = self.query_one("#rule_pattern", Input).value.strip()
+            is_regex = self.query_one("#rule_is_regex", Checkbox).value
+            category = self.query_one("#rule_category", Select)
+            sap = self.query_one("#rule_sap", Select)
+            if not pattern or category.is_blank():
+                output.update("[red]A pattern and a category are required.[/red]")
+                return
+            if is_regex:
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    output.update(f"[red]Invalid regex: {e}[/red]")
+                    return
+            await async_db.run(add_rule, pattern, category.value, is_regex=is_regex, sap=None if sap.is_blank() else sap.value)
+            self.query_one("#rule_pattern", Input).value = ""
+            await self.refresh_rules()
+        elif event.button.id == "delete_rule":
+            rule_id = self.selected_rule_id()
+            if rule_id is not None:
+                await async_db.run(delete_rule, rule_id)
+                await self.refresh_rules()
+        elif event.button.id == "toggle_rule":
+            rule_id = self.selected_rule_id()
+            if rule_id is not None:
+                enabled = {r[0]: r[5] for r in await async_db.run(get_rules)}.get(rule_id)
+                await async_db.run(set_rule_enabled, rule_id, not enabled)
+                await self.refresh_rules()
+        elif event.button.id in ("preview_rules", "apply_rules"):
+            if self.running:
+                return
+            self.running = True
+            output.update("[yellow]Working...[/yellow]")
+            self.execute_rules(dry_run=event.button.id == "preview_rules")
+
+    async def on_key(self, event: events.Key):
+        if event.key == "ctrl+c":
+            await self.app.action_quit()
+
+    CSS = """
+    #rules_container {
+        height: 100%;
+        width: 100%;
+    }
+    #rules_title {
+        text-align: center;
+        margin-bottom: 1;
+    }
+    #rule_form, #rules_buttons {
+        height: auto;
+        align: center middle;
+    }
+    #rule_pattern {
+        width: 1fr;
+    }
+    #rule_form Select {
+        width: 28;
+    }
+    #rules_table {
+        height: 1fr;
+    }
+    #rules_output {
+        margin-top: 1;
+        height: auto;
+        max-height: 20;
+    }
+    Button {
+        margin: 0 1;
+        min-width: 10;
+        padding: 0 1;
+    }
+    """
@@ -0,0 +1,161 @@
+import csv
+import sqlite3
+import random
+import datetime
+import uuid
+import json
+from pathlib import Path
+
+import db_utils
+from db_utils import CATEGORIES
+
+PRODUCTS = [
+    "DDOS Protection", "Virtual Machines", "Storage", "App Service", "SQL Database",
+    "Kubernetes Service", "Virtual Network", "Key Vault", "Monitor", "Functions",
+    "Cosmos DB", "Firewall", "Load Balancer", "Backup", "Entra ID", "Logic Apps",
+]
+SUBCATEGORIES = [
+    "Configuration and setup", "Performance", "Connectivity", "Billing", "Security",
+    "Monitoring and alerts", "Migration", "Scaling",
+]
+VERBS = ["configure", "troubleshoot", "monitor", "scale", "secure", "migrate", "back up", "restore", "deploy", "audit"]
+OBJECTS = [
+    "a policy", "the firewall rules", "diagnostic logs", "a private endpoint", "the SKU",
+    "role assignments", "the quota", "a managed identity", "the retention period", "alerts",
+]
+
+def make_saps(count, seed=0):
+    """
+    Returns `count` distinct SAP full paths shaped like Azure/<product>/<subcategory>.
+    """
+    rnd = random.Random(seed)
+    saps = []
+    for product in PRODUCTS:
+        for sub in SUBCATEGORIES:
+            saps.append(f"Azure/{product}/{sub}")
+    rnd.shuffle(saps)
+    while len(saps) < count:
+        saps.append(f"Azure/{rnd.choice(PRODUCTS)}/{rnd.choice(SUBCATEGORIES)}/Level {len(saps)}")
+    return saps[:count]
+
+def make_question(rnd, n):
+    """
+    Builds a plausible, unique question text for row number `n`.
+    """
+    return f"How do I {rnd.choice(VERBS)} {rnd.choice(OBJECTS)} for resource {n:x} in region {rnd.randint(1, 60)}?"
+
+def generate_questions_db(db_file, rows, sap_count=48, uncategorized_ratio=0.4, seed=0):
+    """
+    Creates a questions.db at `db_file` with `rows` synthetic questions spread over `sap_count`
+    SAPs and all CATEGORIES. Returns the list of SAPs used.
+    """
+    db_file = Path(db_file)
+    if db_file.exists():
+        db_file.unlink()
+    previous = db_utils.DB_FILE
+    db_utils.DB_FILE = str(db_file)
+    try:
+        db_utils.init_db()
+        db_utils.init_config_db()
+    finally:
+        db_utils.DB_FILE = previous
+    rnd = random.Random(seed)
+    saps = make_saps(sap_count, seed)
+    start = datetime.datetime(2024, 1, 1)
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    batch = []
+    for n in range(rows):
+        category = "" if rnd.random() < uncategorized_ratio else rnd.choice(CATEGORIES)
+        timestamp = (start + datetime.timedelta(seconds=n * 37)).isoformat()
+        batch.append((str(uuid.UUID(int=rnd.getrandbits(128))), make_question(rnd, n), category, '', '', '', '', '', rnd.choice(saps), timestamp))
+        if len(batch) >= 10000:
+            c.executemany(
+                "INSERT INTO questions (guid, question, category, aI_response, evaluation_text, extra_column1, extra_column2, extra_column3, SAPFullPath, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+            batch = []
+    if batch:
+        c.executemany(
+            "INSERT INTO questions (guid, question, category, aI_response, evaluation_text, extra_column1, extra_column2, extra_column3, SAPFullPath, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            batch
+        )
+    conn.commit()
+    conn.close()
+    return saps
+
+def generate_questions_csv(csv_file, rows, existing_db=None, existing_ratio=0.5, seed=1):
+    """
+    Writes a one-question-per-line CSV. When `existing_db` is given, roughly `existing_ratio`
+    of the rows are questions already present in that database, to exercise the update path.
+    """
+    rnd = random.Random(seed)
+    existing = []
+    if existing_db:
+        conn = sqlite3.connect(existing_db)
+        existing = [row[0] for row in conn.execute(
+            "SELECT question FROM questions ORDER BY RANDOM() LIMIT ?", (int(rows * existing_ratio),)
+        )]
+        conn.close()
+    questions = existing + [make_question(rnd, 10**9 + n) for n in range(rows - len(existing))]
+    rnd.shuffle(questions)
+    with open(csv_file, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for q in questions:
+            writer.writerow([q])
+    return questions
+
+def generate_api_response(messages=20, questions_per_message=15, seed=2):
+    """
+    Returns a dict shaped like a ZebraAI experiment response: chatHistory.messages with numbered,
+    bulleted and inline questions plus a markdown summary table in the last message.
+    """
+    rnd = random.Random(seed)
+    out = []
+    n = 0
+    for m in range(messages):
+        lines = [f"Case {m}: customer reported an issue with {rnd.choice(PRODUCTS)}.", ""]
+        for i in range(questions_per_message):
+            style = i % 3
+            q = make_question(rnd, n)
+            n += 1
+            if style == 0:
+                lines.append(f"{i + 1}. {q}")
+            elif style == 1:
+                lines.append(f"- {q}")
+            else:
+                lines.append(q)
+            lines.append("Some supporting detail that is not a question.")
+        out.append({"role": "assistant" if m % 2 else "user", "content": "\n".join(lines)})
+    table = ["| **Category** | Question |", "|-|-|"]
+    for cat in CATEGORIES[:4]:
+        table.append(f"| **{cat}** | - {make_question(rnd, n)} |")
+        n += 1
+    out.append({"role": "assistant", "content": "\n".join(table)})
+    return {"chatHistory": {"messages": out}}
+
+def write_api_response(json_file, messages=20, questions_per_message=15, seed=2):
+    data = generate_api_response(messages, questions_per_message, seed)
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return data
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate synthetic questions.db / CSV / ZebraAI response files")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--saps", type=int, default=48)
+    parser.add_argument("--db", default="bench_data/questions.db")
+    parser.add_argument("--csv", help="Also write a CSV with this many rows", type=int)
+    parser.add_argument("--response", help="Also write a synthetic ZebraAI response to this file")
+    args = parser.parse_args()
+    Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+    generate_questions_db(args.db, args.rows, sap_count=args.saps)
+    print(f"Wrote {args.rows} questions to {args.db}")
+    if args.csv:
+        csv_file = Path(args.db).with_suffix(".csv")
+        generate_questions_csv(csv_file, args.csv, existing_db=args.db)
+        print(f"Wrote {args.csv} rows to {csv_file}")
+    if args.response:
+        write_api_response(args.response)
+        print(f"Wrote synthetic response to {args.response}")